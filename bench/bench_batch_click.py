@@ -0,0 +1,104 @@
+"""``BatchClicker`` against looped ``click_at_pixel`` of ``code.py``.
+
+The dwell times are the real ones, so the looped version is timed on a few
+targets only and both rates are extrapolated to 200 targets. Then the
+executor without dwell times, to see what the Python side costs, and the
+travel saved by nearest-neighbour ordering.
+"""
+
+import asyncio
+import random
+import time
+
+import benchutil
+import usb_hid
+from batch_click import NEAREST, BatchClicker, nearest_order
+
+code_driver = benchutil.load_module("code.py", "code_driver")
+
+TIMED_TARGETS = 8
+TARGETS = 200
+
+
+def targets(count, seed=22):
+    generator = random.Random(seed)
+    return [
+        (generator.randrange(code_driver.SCREEN_WIDTH), generator.randrange(code_driver.SCREEN_HEIGHT))
+        for _ in range(count)
+    ]
+
+
+async def looped(mouse, points):
+    start = time.monotonic_ns()
+    for pixel_x, pixel_y in points:
+        await mouse.click_at_pixel(pixel_x, pixel_y)
+    return time.monotonic_ns() - start
+
+
+def travel(positions, order):
+    """Sum of the jumps between consecutive targets, in absolute units."""
+    total = 0
+    for step in range(1, len(order)):
+        a, b = order[step - 1], order[step]
+        dx = positions[2 * a] - positions[2 * b]
+        dy = positions[2 * a + 1] - positions[2 * b + 1]
+        total += int((dx * dx + dy * dy) ** 0.5)
+    return total
+
+
+def check(points):
+    """Two reports per target: press with the move, then release in place."""
+    mouse = code_driver.AbsoluteMouse()
+    clicker = BatchClicker(mouse, code_driver.screen, hold_ns=0, gap_ns=0)
+    usb_hid.reset()
+    usb_hid.recording = True
+    try:
+        clicker.click_all(points)
+    finally:
+        usb_hid.recording = False
+    reports = [report for _, report in usb_hid.ABSOLUTE_MOUSE.reports]
+    assert len(reports) == 2 * len(points) == clicker.reports_sent
+    for index, (pixel_x, pixel_y) in enumerate(points):
+        press, release = reports[2 * index], reports[2 * index + 1]
+        x = code_driver.screen.map_x(pixel_x)
+        y = code_driver.screen.map_y(pixel_y)
+        assert press == bytes([1, x & 0xFF, x >> 8, y & 0xFF, y >> 8, 0])
+        assert release == bytes([0]) + press[1:]
+    assert mouse.report == reports[-1]
+
+
+def main():
+    points = targets(TARGETS)
+    check(points[:50])
+    mouse = code_driver.AbsoluteMouse()
+
+    elapsed = asyncio.run(looped(mouse, points[:TIMED_TARGETS]))
+    looped_rate = TIMED_TARGETS * 1e9 / elapsed
+    clicker = BatchClicker(mouse, code_driver.screen)
+    clicker.click_all(points[:TIMED_TARGETS])
+    assert clicker.late == 0
+    batch_rate = clicker.clicks_per_s
+    benchutil.report("looped click_at_pixel", looped_rate, "clicks/s", 2)
+    benchutil.report("BatchClicker, 50 ms hold + 8 ms gap", batch_rate, "clicks/s", 2)
+    benchutil.report("{} targets, looped click_at_pixel".format(TARGETS), TARGETS / looped_rate, "s", 1)
+    benchutil.report("{} targets, BatchClicker".format(TARGETS), TARGETS / batch_rate, "s", 1)
+
+    fast = BatchClicker(mouse, code_driver.screen, hold_ns=0, gap_ns=0)
+    many = targets(2000, seed=7)
+    fast.click_all(many)
+    benchutil.report("BatchClicker, no dwell, 2000 targets", fast.clicks_per_s, "clicks/s")
+    # Ordering is O(n^2), it dominates without dwell times.
+    fast.click_all(many[:500], order=NEAREST)
+    benchutil.report("BatchClicker, no dwell, 500 targets, nearest", fast.clicks_per_s, "clicks/s")
+
+    positions = code_driver.screen.map_many(points)
+    start = time.perf_counter_ns()
+    order = nearest_order(positions)
+    ordering = time.perf_counter_ns() - start
+    benchutil.report("nearest_order, {} targets".format(TARGETS), ordering / 1000, "us", 1)
+    benchutil.report("travel, given order", travel(positions, range(TARGETS)), "units")
+    benchutil.report("travel, nearest neighbour", travel(positions, order), "units")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Modifier and mouse chords of ``lib/chords.py`` against stock library calls.
+
+Reports per chord for the stock calls, the two device plan and the
+``CHORD_MOUSE`` report, then the time the host gets between the keyboard
+report and the mouse report that depends on it, then chords per second with
+1 ns waits, so only the sending is timed.
+"""
+
+import benchutil
+import usb_hid
+from adafruit_hid.keyboard import Keyboard
+from adafruit_hid.keycode import Keycode
+from chords import ChordPlanner
+from hid_descriptor import CHORD_MOUSE
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+LEFT = 1
+STEPS = 16
+SETTLE_NS = 8_000_000
+
+
+def stock_click(keyboard, mouse, count=1):
+    keyboard.press(Keycode.CONTROL)
+    mouse.move_to(16383, 16383)
+    for _ in range(count):
+        mouse.click(LEFT)
+    keyboard.release(Keycode.CONTROL)
+
+
+def stock_drag(keyboard, mouse):
+    keyboard.press(Keycode.SHIFT)
+    mouse.move_to(1000, 1000)
+    mouse.press(LEFT)
+    for step in range(1, STEPS + 1):
+        mouse.move_to(1000 + 19000 * step // STEPS, 1000 + 11000 * step // STEPS)
+    mouse.release(LEFT)
+    keyboard.release(Keycode.SHIFT)
+
+
+STOCK = {
+    "ctrl-click": stock_click,
+    "ctrl double click": lambda keyboard, mouse: stock_click(keyboard, mouse, 2),
+    "shift-drag": stock_drag,
+}
+
+
+def planned(chords, wait_ns):
+    return {
+        "ctrl-click": chords.click(16383, 16383, Keycode.CONTROL, hold_ns=wait_ns),
+        "ctrl double click": chords.click(
+            16383, 16383, Keycode.CONTROL, count=2, hold_ns=wait_ns, gap_ns=wait_ns
+        ),
+        "shift-drag": chords.drag(
+            1000, 1000, 20000, 12000, Keycode.SHIFT, steps=STEPS, step_ns=wait_ns, hold_ns=wait_ns
+        ),
+    }
+
+
+def recorded(action):
+    """Reports of both devices as ``(timestamp_ns, device, report)``, in sending order."""
+    usb_hid.reset()
+    usb_hid.recording = True
+    try:
+        action()
+    finally:
+        usb_hid.recording = False
+    timeline = [(stamp, "keyboard", report) for stamp, report in usb_hid.Device.KEYBOARD.reports]
+    timeline.extend((stamp, "mouse", report) for stamp, report in usb_hid.ABSOLUTE_MOUSE.reports)
+    timeline.sort(key=lambda entry: entry[0])
+    return timeline
+
+
+def last_mouse(timeline):
+    return [report for _, device, report in timeline if device == "mouse"][-1]
+
+
+def press_margin(timeline, composite=False):
+    """Least time between a modifier going down and a button press under it.
+
+    In a ``CHORD_MOUSE`` report the modifiers arrive with the mouse state, in
+    order, so the margin is the time between the two reports on one endpoint.
+    Fails if a press goes out before its modifier.
+    """
+    modifiers_at = None
+    modifiers = 0
+    buttons = 0
+    margin = None
+    for stamp, device, report in timeline:
+        new_modifiers = report[6] if composite else report[0] if device == "keyboard" else modifiers
+        if new_modifiers != modifiers:
+            assert not (composite and report[0] != buttons), "modifiers and buttons in one report"
+            modifiers = new_modifiers
+            modifiers_at = stamp
+        if device == "mouse":
+            if report[0] & ~buttons:
+                assert modifiers, "press without its modifier"
+                gap = stamp - modifiers_at
+                margin = gap if margin is None else min(margin, gap)
+            buttons = report[0]
+    return margin
+
+
+def main():
+    keyboard = Keyboard(usb_hid.devices)
+    mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+    chord_mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices, layout=CHORD_MOUSE.layout())
+    two_devices = ChordPlanner(mouse, keyboard, settle_ns=SETTLE_NS)
+    composite = ChordPlanner(chord_mouse)
+    handles = planned(two_devices, 1)
+    composite_handles = planned(composite, 1)
+    for name, handle in handles.items():
+        mouse.move_to(0, 0)
+        stock = recorded(lambda: STOCK[name](keyboard, mouse))
+        planner = recorded(lambda: two_devices.play(handle))
+        single = recorded(lambda: composite.play(composite_handles[name]))
+        assert keyboard.report == bytearray(8) and mouse.report[0] == 0 and chord_mouse.report[6] == 0
+        # Same end state as the stock calls.
+        assert last_mouse(planner) == last_mouse(stock) == last_mouse(single)[:6]
+        benchutil.report("{}: reports, stock calls".format(name), len(stock), "reports")
+        benchutil.report("{}: reports, keyboard + mouse plan".format(name), len(planner), "reports")
+        benchutil.report("{}: reports, CHORD_MOUSE".format(name), len(single), "reports")
+        benchutil.report(
+            "{}: modifier to press, stock calls".format(name), press_margin(stock) / 1000, "us", 1
+        )
+        benchutil.report(
+            "{}: modifier to press, keyboard + mouse plan".format(name),
+            press_margin(planner) / 1000,
+            "us",
+            1,
+        )
+        benchutil.report(
+            "{}: modifier to press, CHORD_MOUSE".format(name),
+            press_margin(single, composite=True) / 1000,
+            "us",
+            1,
+        )
+
+    # A mouse that stops taking reports mid-chord leaves no modifier held.
+    def stalled_click():
+        usb_hid.ABSOLUTE_MOUSE.stall(10_000_000_000)
+        two_devices.play(handles["ctrl-click"])
+
+    failed = False
+    try:
+        recorded(stalled_click)
+    except OSError:
+        failed = True
+    usb_hid.ABSOLUTE_MOUSE.refuse_until_ns = 0
+    assert failed and keyboard.report == bytearray(8), "modifier held after a failed chord"
+    assert usb_hid.Device.KEYBOARD.reports[-1][1][0] == 0, "no modifier release sent"
+
+    fast = ChordPlanner(mouse, keyboard, settle_ns=1)
+    fast_handles = planned(fast, 1)
+    count = 20000
+    for name, handle in fast_handles.items():
+        call = STOCK[name]
+
+        def by_calls(total):
+            for _ in range(total):
+                call(keyboard, mouse)
+
+        def by_handle(total):
+            for _ in range(total):
+                fast.play(handle)
+
+        def by_composite(total):
+            for _ in range(total):
+                composite.play(composite_handles[name])
+
+        benchutil.report("{}: stock calls".format(name), benchutil.rate(by_calls, count // 4), "chords/s")
+        benchutil.report("{}: play(handle)".format(name), benchutil.rate(by_handle, count), "chords/s")
+        benchutil.report(
+            "{}: play(handle), CHORD_MOUSE".format(name), benchutil.rate(by_composite, count), "chords/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Commands per second through ``CommandReceiver``.
+
+Runs the parser and dispatcher against an in-memory stream and against a pty,
+with the ``lib/absolute_mouse.py`` driver on the fake ``usb_hid`` device.
+"""
+
+import io
+import os
+import threading
+import time
+import tty
+
+import benchutil
+import usb_hid
+import command_protocol
+from command_protocol import CommandReceiver, encode_frame
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+COMMANDS = 20000
+
+
+class MemoryPort(io.BytesIO):
+    """In-memory stand-in for ``usb_cdc.data`` that discards acknowledgements."""
+
+    def write(self, data):
+        return len(data)
+
+
+def command_stream(count):
+    stream = bytearray(count * command_protocol.FRAME_SIZE)
+    opcodes = (command_protocol.MOVE, command_protocol.PRESS, command_protocol.RELEASE)
+    for i in range(count):
+        encode_frame(opcodes[i % 3], i, 1, (i * 7) & 0x7FFF, (i * 3) & 0x7FFF, stream, i * 9)
+    return bytes(stream)
+
+
+def memory_rate(stream, ack):
+    mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+    receiver = CommandReceiver(MemoryPort(stream), mouse, ack=ack)
+    start = time.perf_counter_ns()
+    while receiver.poll():
+        pass
+    elapsed = time.perf_counter_ns() - start
+    assert receiver.received == COMMANDS and receiver.crc_errors == 0
+    return receiver.received * 1_000_000_000 / elapsed
+
+
+def pty_rate(stream):
+    host, device = os.openpty()
+    tty.setraw(device)
+    port = os.fdopen(device, "r+b", buffering=0)
+    mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+    receiver = CommandReceiver(port, mouse, ack=False)
+
+    def writer():
+        view = memoryview(stream)
+        while view:
+            written = os.write(host, view[:4096])
+            view = view[written:]
+
+    thread = threading.Thread(target=writer)
+    start = time.perf_counter_ns()
+    thread.start()
+    while receiver.received < COMMANDS:
+        receiver.poll()
+    elapsed = time.perf_counter_ns() - start
+    thread.join()
+    port.close()
+    os.close(host)
+    return receiver.received * 1_000_000_000 / elapsed
+
+
+def main():
+    stream = command_stream(COMMANDS)
+    benchutil.report("in-memory stream, no acks", memory_rate(stream, False), "commands/s")
+    benchutil.report("in-memory stream, with acks", memory_rate(stream, True), "commands/s")
+    benchutil.report("pty, no acks", pty_rate(stream), "commands/s")
+
+
+if __name__ == "__main__":
+    main()
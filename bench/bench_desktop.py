@@ -0,0 +1,80 @@
+"""Multi-monitor conversions of ``desktop`` against the single screen ``ScreenMapper``."""
+
+import benchutil
+import usb_hid
+from desktop import Desktop, Monitor
+from screen_mapper import ScreenMapper
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+CONVERSIONS = 100000
+POINTS = [(x * 7 % 2560, x * 3 % 1440) for x in range(1000)]
+
+
+def main():
+    screen = ScreenMapper(2560, 1440)
+    desktop = Desktop(
+        [
+            Monitor("main", 0, 0, 2560, 1440),
+            Monitor("side", 2560, -240, 1080, 1920, 100, 90),
+            Monitor("laptop", -1920, 0, 2880, 1800, 150),
+        ]
+    )
+    main_monitor = desktop["main"]
+    side = desktop["side"]
+    # Sizes as displayed: the portrait side monitor is 1080 wide.
+    assert (desktop.left, desktop.width, desktop.top, desktop.height) == (-1920, 5560, -240, 2040)
+    # Its unrotated top left corner is displayed at the top right.
+    assert side.map(0, 0) == ((3639 + 1920) * 32767 // 5560, 0)
+
+    def screen_mapper(count):
+        map_x = screen.map_x
+        map_y = screen.map_y
+        for i in range(count):
+            map_x(i & 2047)
+            map_y(i & 1023)
+
+    def monitor(target):
+        def run(count):
+            map_x = target.map_x
+            map_y = target.map_y
+            for i in range(count):
+                map_x(i & 2047, i & 1023)
+                map_y(i & 2047, i & 1023)
+
+        return run
+
+    def by_name(count):
+        for i in range(count):
+            desktop.map("side", i & 1023, i & 1023)
+
+    for name, run in (
+        ("ScreenMapper map_x + map_y, one screen", screen_mapper),
+        ("Monitor map_x + map_y, not rotated", monitor(main_monitor)),
+        ("Monitor map_x + map_y, rotated 90", monitor(side)),
+        ("Desktop.map by monitor name", by_name),
+    ):
+        benchutil.report(name, benchutil.rate(run, CONVERSIONS), "points/s")
+
+    out = desktop.map_many("main", POINTS)
+
+    def batch(count):
+        for _ in range(count // len(POINTS)):
+            desktop.map_many("main", POINTS, out)
+
+    rate = benchutil.rate(batch, CONVERSIONS)
+    benchutil.report("Desktop.map_many, 1000 points per call", rate, "points/s")
+    assert list(out[:2]) == list(main_monitor.map(*POINTS[0]))
+
+    mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+
+    def move(count):
+        for i in range(count):
+            desktop.move_to_pixel(mouse, "side", i & 1023, 500)
+
+    benchutil.report("Desktop.move_to_pixel", benchutil.rate(move, CONVERSIONS), "moves/s")
+    print("desktop {}x{} at ({}, {})".format(desktop.width, desktop.height, desktop.left, desktop.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Compare the three absolute mouse drivers on the simulated hardware.
+
+* ``code.py``: ``AbsoluteMouse``
+* ``lib/absolute_mouse.py``: ``AbsoluteMouse``
+* ``lib/absolute_mouse/__init__.py``: ``Mouse``
+
+For each driver: moves per second, bytes allocated per move (``tracemalloc``
+peak) and reports emitted per high-level action.
+"""
+
+import tracemalloc
+
+import benchutil
+import usb_hid
+from alloc_guard import AllocationError, guard_moves
+
+code_driver = benchutil.load_module("code.py", "code_driver")
+single_driver = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+import absolute_mouse as package_driver  # pylint: disable=wrong-import-position
+
+LEFT = 1
+MOVES = 20000
+
+
+class CodeAdapter:
+    """``code.py``'s mouse, which only knows its global ``usb_hid.devices``."""
+
+    name = "code.py AbsoluteMouse"
+
+    def __init__(self):
+        self.mouse = code_driver.AbsoluteMouse()
+        self.move = self.mouse.move_to
+        self.press = self.mouse.press
+        self.release = self.mouse.release
+        self.click = self.mouse.click
+
+    def scroll(self, x, y, wheel):
+        self.mouse.move_to(x, y, wheel)
+
+    def done(self):
+        pass
+
+
+class SingleAdapter:
+    name = "lib/absolute_mouse.py AbsoluteMouse"
+
+    def __init__(self):
+        self.mouse = single_driver.AbsoluteMouse(usb_hid.devices)
+        self.move = self.mouse.move_to
+        self.press = self.mouse.press
+        self.release = self.mouse.release
+        self.click = self.mouse.click
+
+    def scroll(self, x, y, wheel):
+        self.mouse.move_to(x, y, wheel)
+
+    def done(self):
+        self.mouse.flush()
+
+
+class PackageAdapter:
+    name = "lib/absolute_mouse Mouse"
+
+    def __init__(self):
+        self.mouse = package_driver.Mouse(usb_hid.devices)
+        self.move = self.mouse.move
+        self.press = self.mouse.press
+        self.release = self.mouse.release
+        self.click = self.mouse.click
+
+    def scroll(self, x, y, wheel):
+        self.mouse.move(x, y, wheel)
+
+    def done(self):
+        pass
+
+
+def move_rate(driver):
+    move = driver.move
+
+    def run(count):
+        for i in range(count):
+            move(i & 0x7FFF, (count - i) & 0x7FFF)
+
+    return benchutil.rate(run, MOVES)
+
+
+def allocated_per_move(driver, count=200):
+    move = driver.move
+    move(1, 1)
+    tracemalloc.start()
+    total = 0
+    for i in range(count):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        move(i * 100, i * 50)
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / count
+
+
+def guarded_failures(driver, count=200):
+    """Moves that ``alloc_guard`` flags as allocating."""
+    guard_moves(driver.mouse)
+    move = getattr(driver.mouse, "move_to", None) or driver.mouse.move
+    failures = 0
+    for i in range(count):
+        try:
+            move(i * 100, i * 50, 0)
+        except AllocationError:
+            failures += 1
+    return failures
+
+
+ACTIONS = (
+    ("move", lambda d: d.move(1000, 2000)),
+    ("click at position", lambda d: (d.move(3000, 4000), d.click(LEFT))),
+    ("drag", lambda d: (d.move(100, 100), d.press(LEFT), d.move(5000, 5000), d.release(LEFT))),
+    ("scroll 300", lambda d: d.scroll(6000, 6000, 300)),
+)
+
+
+def reports_per_action(driver, action):
+    device = driver.mouse._mouse_device  # pylint: disable=protected-access
+    usb_hid.recording = True
+    device.reports.clear()
+    action(driver)
+    driver.done()
+    usb_hid.recording = False
+    return len(device.reports)
+
+
+def main():
+    for adapter in (CodeAdapter, SingleAdapter, PackageAdapter):
+        driver = adapter()
+        benchutil.report(driver.name + ": move", move_rate(driver), "reports/s")
+        benchutil.report(driver.name + ": move allocations", allocated_per_move(driver), "bytes/op", digits=1)
+        for name, action in ACTIONS:
+            benchutil.report(
+                "{}: {}".format(driver.name, name), reports_per_action(driver, action), "reports"
+            )
+        benchutil.report(driver.name + ": guarded moves that allocated", guarded_failures(driver), "moves")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Bytes per event and decode throughput of ``event_codec`` against raw records."""
+
+import io
+import time
+
+import benchutil
+import macro
+from event_codec import EventDecoder, EventEncoder
+
+EVENTS = 20000
+
+
+def events():
+    """A drag-like recording: 1 ms motion, clicks and idle stretches."""
+    x, y, t = 1000, 1000, 0
+    result = []
+    for i in range(EVENTS):
+        t += 1000
+        phase = i % 400
+        if phase < 300:
+            x += (i % 7) - 2
+            y += (i % 5) - 1
+        buttons = 1 if 100 <= phase < 200 else 0
+        result.append((t, buttons, x, y, 0))
+    return result
+
+
+def raw_stream(recorded):
+    stream = bytearray(len(recorded) * macro.RECORD_SIZE)
+    previous = 0
+    for index, (t, buttons, x, y, wheel) in enumerate(recorded):
+        offset = index * macro.RECORD_SIZE
+        delta = t - previous
+        previous = t
+        stream[offset : offset + 4] = delta.to_bytes(4, "little")
+        stream[offset + 4] = macro.MOUSE
+        stream[offset + 5] = 6
+        stream[offset + 6 : offset + 12] = bytes((buttons, x & 0xFF, x >> 8, y & 0xFF, y >> 8, wheel & 0xFF))
+    return bytes(stream)
+
+
+def main():
+    recorded = events()
+    compressed = io.BytesIO()
+    encoder = EventEncoder(compressed)
+    for event in recorded:
+        encoder.add(*event)
+    encoder.close()
+    raw = raw_stream(recorded)
+
+    # Round trip check
+    compressed.seek(0)
+    decoder = EventDecoder(compressed)
+    for t, buttons, x, y, wheel in recorded:
+        assert decoder.next() is not None
+        assert decoder.time_us == t
+        assert bytes(decoder.report) == bytes((buttons, x & 0xFF, x >> 8, y & 0xFF, y >> 8, 0))
+    assert decoder.next() is None
+
+    def decode_compressed():
+        compressed.seek(0)
+        decoder = EventDecoder(compressed)
+        count = 0
+        while decoder.next() is not None:
+            count += 1
+        return count
+
+    def decode_raw():
+        stream = io.BytesIO(raw)
+        chunk = bytearray(macro.RECORD_SIZE * 32)
+        view = memoryview(chunk)
+        count = 0
+        while True:
+            length = stream.readinto(chunk)
+            if not length:
+                return count
+            for offset in range(0, length, macro.RECORD_SIZE):
+                report = view[offset + 6 : offset + 12]
+                count += 1
+
+    for name, size, decode in (
+        ("raw macro records", len(raw), decode_raw),
+        ("delta/varint stream", encoder.size, decode_compressed),
+    ):
+        start = time.perf_counter_ns()
+        count = decode()
+        elapsed = time.perf_counter_ns() - start
+        benchutil.report(name + ", size", size / EVENTS, "bytes/event", digits=2)
+        benchutil.report(name + ", decode", count * 1_000_000_000 / elapsed, "events/s")
+
+
+if __name__ == "__main__":
+    main()
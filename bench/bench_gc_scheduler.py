@@ -0,0 +1,74 @@
+"""Where garbage collections land during a run of clicks, with ``GCScheduler``.
+
+A background task makes cyclic garbage while ``ActionScheduler`` clicks, so
+the desktop collector runs every few milliseconds, like the board's does once
+its heap fills. Each report sent is a burst; the collections inside one are
+the pauses that would delay a press or a release.
+"""
+
+import asyncio
+import gc
+import time
+
+import benchutil
+import usb_hid
+from gc_scheduler import BURST, GCScheduler
+from mouse_scheduler import ActionScheduler, AsyncMouse
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+CLICKS = 60
+HOLD_NS = 2_000_000
+SETTLE_NS = 8_000_000
+
+
+async def clicks_with_churn(collector):
+    mouse = AsyncMouse(
+        absolute_mouse.AbsoluteMouse(usb_hid.devices), hold_ns=HOLD_NS, settle_ns=SETTLE_NS
+    )
+    scheduler = ActionScheduler(mouse, capacity=3 * CLICKS, collector=collector)
+    for index in range(CLICKS):
+        scheduler.click_at(index * 200, index * 100)
+    done = False
+
+    async def churn():
+        while not done:
+            for _ in range(20):
+                cycle = []
+                cycle.append(cycle)
+            await asyncio.sleep(0.0002)
+
+    async def clicks():
+        nonlocal done
+        await scheduler.run(stop_when_idle=True)
+        done = True
+
+    await asyncio.gather(clicks(), churn())
+
+
+def run(name, collector):
+    gc.collect()
+    start = time.perf_counter_ns()
+    try:
+        asyncio.run(clicks_with_churn(collector))
+    finally:
+        collector.close()
+    elapsed = time.perf_counter_ns() - start
+    burst_pauses = [duration for _, duration, placement in collector.pauses() if placement == BURST]
+    benchutil.report(name + ": collections in report sends", collector.counts[BURST], "collections")
+    benchutil.report(name + ": collections in idle time", collector.counts[0], "collections")
+    benchutil.report(name + ": automatic, outside report sends", collector.counts[2], "collections")
+    benchutil.report(name + ": longest pause in a report send", max(burst_pauses, default=0), "us")
+    benchutil.report(name + ": run time", elapsed / 1e6, "ms", 1)
+    return collector
+
+
+def main():
+    run("record only", GCScheduler(collect_when_idle=False))
+    run("collect when idle", GCScheduler())
+    disabled = run("idle + disabled in bursts", GCScheduler(disable_in_bursts=True))
+    assert disabled.counts[BURST] == 0 and gc.isenabled()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Gestures of ``lib/gestures.py`` against the same gestures as driver calls.
+
+Reports per gesture with real timings, then gestures per second with 1 ns
+waits, so only the sending is timed and every report is kept.
+"""
+
+import time
+
+import benchutil
+import usb_hid
+from gestures import GestureComposer
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+LEFT = 1
+RIGHT = 2
+STEPS = 16
+
+
+def called_drag(mouse, buttons=LEFT):
+    mouse.move_to(1000, 1000)
+    mouse.press(buttons)
+    for step in range(1, STEPS + 1):
+        mouse.move_to(1000 + 19000 * step // STEPS, 1000 + 11000 * step // STEPS)
+    mouse.release(buttons)
+
+
+def called_chord_drag(mouse):
+    mouse.move_to(1000, 1000)
+    mouse.press(LEFT)
+    mouse.press(RIGHT)
+    for step in range(1, STEPS + 1):
+        mouse.move_to(1000 + 19000 * step // STEPS, 1000 + 11000 * step // STEPS)
+    mouse.release(RIGHT)
+    mouse.release(LEFT)
+
+
+def called_double_click(mouse):
+    mouse.move_to(16383, 16383)
+    mouse.click(LEFT)
+    mouse.click(LEFT)
+
+
+def called_triple_click(mouse):
+    called_double_click(mouse)
+    mouse.click(LEFT)
+
+
+def compose(gestures, wait_ns):
+    return {
+        "drag": gestures.drag(1000, 1000, 20000, 12000, steps=STEPS, step_ns=wait_ns, hold_ns=wait_ns),
+        "chord drag": gestures.chord_drag(
+            1000, 1000, 20000, 12000, (LEFT, RIGHT), steps=STEPS, step_ns=wait_ns, hold_ns=wait_ns
+        ),
+        "double click": gestures.click(16383, 16383, count=2, hold_ns=wait_ns, gap_ns=wait_ns),
+        "triple click": gestures.click(16383, 16383, count=3, hold_ns=wait_ns, gap_ns=wait_ns),
+    }
+
+
+CALLED = {
+    "drag": called_drag,
+    "chord drag": called_chord_drag,
+    "double click": called_double_click,
+    "triple click": called_triple_click,
+}
+
+
+def recorded(action):
+    usb_hid.reset()
+    usb_hid.recording = True
+    try:
+        action()
+    finally:
+        usb_hid.recording = False
+    return [report for _, report in usb_hid.ABSOLUTE_MOUSE.reports]
+
+
+def is_subsequence(short, long):
+    remaining = iter(long)
+    return all(any(report == other for other in remaining) for report in short)
+
+
+def main():
+    mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+    gestures = GestureComposer(mouse)
+    timed = compose(gestures, 8_000_000)
+    fast = compose(gestures, 1)
+    for name, handle in timed.items():
+        called = recorded(lambda: CALLED[name](mouse))
+        mouse.release_all()
+        played = recorded(lambda: gestures.play(fast[name]))
+        # Same end state, and the host goes through no state the driver
+        # calls would not produce, in the same order: reports are only dropped.
+        assert played[-1] == called[-1] and mouse.report == called[-1]
+        assert is_subsequence(played, called), name
+        benchutil.report("{}: reports, driver calls".format(name), len(called), "reports")
+        benchutil.report(
+            "{}: reports, compiled".format(name), len(gestures.gestures[handle]), "reports"
+        )
+
+    jump = gestures.drag(1000, 1000, 20000, 12000, steps=STEPS, step_ns=0)
+    benchutil.report("drag without step waits: reports, compiled", len(gestures.gestures[jump]), "reports")
+
+    count = 20000
+    for name, handle in fast.items():
+        call = CALLED[name]
+
+        def by_calls(total):
+            for _ in range(total):
+                call(mouse)
+
+        def by_handle(total):
+            for _ in range(total):
+                gestures.play(handle)
+
+        benchutil.report(
+            "{}: driver calls".format(name), benchutil.rate(by_calls, count // 4), "gestures/s"
+        )
+        benchutil.report("{}: play(handle)".format(name), benchutil.rate(by_handle, count), "gestures/s")
+
+    start = time.perf_counter_ns()
+    for _ in range(count):
+        gestures.drag(1000, 1000, 20000, 12000, steps=STEPS, step_ns=1, hold_ns=1)
+    benchutil.report("drag, cached compile", (time.perf_counter_ns() - start) / count / 1000, "us", 2)
+    start = time.perf_counter_ns()
+    for index in range(200):
+        gestures.drag(index, 1000, 20000, 12000, steps=STEPS, step_ns=1, hold_ns=1)
+    benchutil.report("drag, first compile", (time.perf_counter_ns() - start) / 200 / 1000, "us", 2)
+
+
+if __name__ == "__main__":
+    main()
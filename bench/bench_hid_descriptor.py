@@ -0,0 +1,42 @@
+"""Descriptor sizes and the speed of the field packers of ``hid_descriptor``.
+
+``tests/test_hid_descriptor.py`` checks the bytes and the layouts.
+"""
+
+import benchutil
+from hid_descriptor import ABSOLUTE_MOUSE, Descriptor, Report, axes, buttons, pan, wheel
+
+def main():
+    layout = ABSOLUTE_MOUSE.layout()
+    benchutil.report("ABSOLUTE_MOUSE descriptor", len(ABSOLUTE_MOUSE.report_descriptor), "bytes")
+
+    extended = Descriptor(
+        (
+            Report(
+                11,
+                (
+                    buttons(8),
+                    axes("x", "y", minimum=0, maximum=32767, bits=16),
+                    wheel(bits=16),
+                    pan(bits=16),
+                ),
+            ),
+        )
+    )
+    benchutil.report("8 buttons, 16 bit wheel and pan: descriptor", len(extended.report_descriptor), "bytes")
+    benchutil.report("8 buttons, 16 bit wheel and pan: report", extended.layout().length, "bytes")
+
+    report = layout.new_report()
+    pack_x = layout.packer("x")
+    pack_buttons = layout.packer("buttons")
+
+    def packers(count):
+        for i in range(count):
+            pack_x(report, i & 0x7FFF)
+            pack_buttons(report, i & 0x1F)
+
+    benchutil.report("packers (x + buttons)", benchutil.rate(packers, 100000), "reports/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Cost of ``hid_stats`` instrumentation on the ``lib/absolute_mouse.py`` driver."""
+
+import benchutil
+import usb_hid
+from hid_stats import ReportStats, SNAPSHOT_SIZE
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+MOVES = 20000
+
+
+def move_rate(mouse):
+    def run(count):
+        for i in range(count):
+            mouse.move_to(i & 0x7FFF, 100)
+
+    return benchutil.rate(run, MOVES)
+
+
+def main():
+    mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+    benchutil.report("move_to, not instrumented", move_rate(mouse), "reports/s")
+    stats = ReportStats()
+    stats.instrument(mouse)
+    benchutil.report("move_to, instrumented", move_rate(mouse), "reports/s")
+    benchutil.report("snapshot size", len(stats.snapshot()), "bytes")
+    assert len(stats.snapshot()) == SNAPSHOT_SIZE
+    print(stats.format())
+
+    # The probe of a driver created on wrapped devices is counted, and every
+    # refused report that goes through later counts as retried, not only the
+    # first success after a failure.
+    usb_hid.reset()
+    usb_hid.ABSOLUTE_MOUSE.stall(10_000_000_000)
+    stats = ReportStats()
+    mouse = absolute_mouse.AbsoluteMouse(stats.instrument_devices(usb_hid.devices))
+    assert stats.failed == 1, "probe not counted"
+    for x in (100, 200):
+        try:
+            mouse.move_to(x, 100)
+        except OSError:
+            pass
+    usb_hid.ABSOLUTE_MOUSE.refuse_until_ns = 0
+    mouse.move_to(300, 100)
+    for report in (bytes((0, 100, 0, 100, 0, 0)), bytes((0, 200, 0, 100, 0, 0))):
+        mouse._mouse_device.send_report(report)  # pylint: disable=protected-access
+    assert (stats.failed, stats.retried, stats.sent) == (3, 2, 3), stats.format()
+
+
+if __name__ == "__main__":
+    main()
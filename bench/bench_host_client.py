@@ -0,0 +1,142 @@
+"""End to end: the ``host/pico_client`` client against ``CommandReceiver`` over a pty.
+
+The device side runs in a thread with the ``lib/absolute_mouse.py`` driver on
+the fake ``usb_hid`` device. Every command is acknowledged, so the window
+decides how many are in flight.
+"""
+
+import asyncio
+import fcntl
+import os
+import select
+import struct
+import sys
+import termios
+import threading
+import time
+import tty
+
+import benchutil
+import usb_hid
+from command_protocol import CommandReceiver
+from hid_stats import ReportStats
+
+sys.path.insert(0, os.path.join(benchutil.ROOT, "host"))
+
+from pico_client import AsyncClient, Client  # pylint: disable=wrong-import-position
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+COMMANDS = 5000
+
+
+class PtyPort:
+    """The board end of the pty, with ``in_waiting`` like ``usb_cdc.Serial``."""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self._count = bytearray(4)
+
+    @property
+    def in_waiting(self):
+        fcntl.ioctl(self.fd, termios.FIONREAD, self._count)
+        return struct.unpack("i", self._count)[0]
+
+    def readinto(self, buffer):
+        return os.readv(self.fd, [buffer])
+
+    def write(self, data):
+        return os.write(self.fd, data)
+
+
+class Board:
+    """``CommandReceiver`` polling the device end of a fresh pty in a thread."""
+
+    def __init__(self):
+        self.host, device = os.openpty()
+        tty.setraw(device)
+        self.device = device
+        self.mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+        self.stats = ReportStats()
+        self.stats.instrument(self.mouse)
+        self.receiver = CommandReceiver(PtyPort(device), self.mouse, stats=self.stats)
+        self._stop = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stop:
+                if not self.receiver.poll():
+                    select.select([self.device], [], [], 0.01)
+        except OSError:
+            pass  # The client closed its end of the pty.
+
+    def stop(self):
+        self._stop = True
+        self._thread.join()
+        os.close(self.device)
+
+
+def position(index):
+    return index * 7 & 0x7FFF, index * 3 & 0x7FFF
+
+
+async def run_async(board, window):
+    client = await AsyncClient.open(board.host, window=window)
+    start = time.perf_counter_ns()
+    for index in range(COMMANDS):
+        x, y = position(index)
+        await client.submit(1, 0, x, y)
+    failed = await client.drain()
+    elapsed = time.perf_counter_ns() - start
+    stats = await client.stats()
+    await client.close()
+    return elapsed, client.latency, failed, stats
+
+
+def run_sync(board, window):
+    with Client(board.host, window=window) as client:
+        start = time.perf_counter_ns()
+        for index in range(COMMANDS):
+            client.move(*position(index))
+        client.drain()
+        elapsed = time.perf_counter_ns() - start
+        latency = client.latency
+    return elapsed, latency
+
+
+def check(board):
+    # Every frame arrived in order and the pointer ended where the last move said.
+    receiver = board.receiver
+    assert receiver.crc_errors == 0 and receiver.sequence_gaps == 0
+    x, y = position(COMMANDS - 1)
+    report = board.mouse.report
+    assert report[1] | report[2] << 8 == x and report[3] | report[4] << 8 == y
+
+
+def main():
+    for window in (1, 8, 32, 128):
+        board = Board()
+        elapsed, latency, failed, stats = asyncio.run(run_async(board, window))
+        board.stop()
+        check(board)
+        assert failed == 0 and latency.count == COMMANDS + 1
+        assert board.receiver.received == COMMANDS + 1
+        # The first move goes to (0, 0), where the driver already is.
+        assert stats["sent"] == COMMANDS - board.mouse.reports_suppressed
+        name = "AsyncClient, window {}".format(window)
+        benchutil.report(name, COMMANDS * 1e9 / elapsed, "commands/s")
+        benchutil.report(name + ": p50 latency", latency.percentile_ns(50) / 1000, "us", 1)
+        benchutil.report(name + ": p99 latency", latency.percentile_ns(99) / 1000, "us", 1)
+
+    board = Board()
+    elapsed, latency = run_sync(board, 32)
+    board.stop()
+    check(board)
+    benchutil.report("Client (blocking wrapper), window 32", COMMANDS * 1e9 / elapsed, "commands/s")
+    print(latency.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Named hotspots from ``hotspots`` against converting pixels on every click."""
+
+import os
+import tempfile
+import time
+
+import benchutil
+import usb_hid
+from hotspots import Hotspots
+from screen_mapper import ScreenMapper
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+TARGETS = 500
+CLICKS = 20000
+
+
+def write_targets(path):
+    with open(path, "w") as target_file:
+        target_file.write("# name x y\n")
+        for index in range(TARGETS):
+            target_file.write("target{} {} {}\n".format(index, index * 5 % 2560, index * 3 % 1440))
+
+
+def main():
+    screen = ScreenMapper(2560, 1440)
+    mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+    hotspots = Hotspots(mouse, screen)
+    pixels = [(index * 5 % 2560, index * 3 % 1440) for index in range(TARGETS)]
+    names = ["target{}".format(index) for index in range(TARGETS)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "hotspots.txt")
+        write_targets(path)
+        start = time.perf_counter_ns()
+        hotspots.load(path)
+        elapsed = time.perf_counter_ns() - start
+        benchutil.report("load and compile {} targets".format(TARGETS), elapsed / 1e6, "ms", 2)
+
+        def reload(count):
+            for _ in range(count):
+                hotspots.reload()
+
+        benchutil.report("reload, file unchanged", benchutil.rate(reload, 10000), "calls/s")
+
+        def converted(count):
+            for index in range(count):
+                pixel_x, pixel_y = pixels[index % TARGETS]
+                mouse.move_to(screen.map_x(pixel_x), screen.map_y(pixel_y))
+                mouse.click(1)
+
+        def by_name(count):
+            for index in range(count):
+                hotspots.click_target(names[index % TARGETS])
+
+        def by_id(count):
+            for index in range(count):
+                hotspots.click_target(index % TARGETS)
+
+        benchutil.report("map pixel + move_to + click", benchutil.rate(converted, CLICKS), "clicks/s")
+        benchutil.report("click_target by name", benchutil.rate(by_name, CLICKS), "clicks/s")
+        benchutil.report("click_target by id", benchutil.rate(by_id, CLICKS), "clicks/s")
+
+        usb_hid.reset()
+        usb_hid.recording = True
+        hotspots.click_target("target7")
+        mouse.click(1)
+        usb_hid.recording = False
+        sent = [report for _, report in usb_hid.ABSOLUTE_MOUSE.reports]
+        x, y = screen.map(*pixels[7])
+        assert sent[0] == bytes((0, x & 0xFF, x >> 8, y & 0xFF, y >> 8, 0))
+        assert sent[1][0] == 1 and sent[1][1:] == sent[0][1:]
+        # The driver continues from the target, not from its previous position.
+        assert sent[3] == sent[1] and sent[4] == sent[0]
+
+        time.sleep(0.01)
+        with open(path, "a") as target_file:
+            target_file.write("extra 10 10\n")
+        assert hotspots.reload() and "extra" in hotspots and len(hotspots) == TARGETS + 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Per-click latency of ``code.py``'s mouse with ``print()`` against ``ring_log``."""
+
+import contextlib
+import io
+import time
+
+import benchutil
+from ring_log import INFO, OFF
+
+code_driver = benchutil.load_module("code.py", "code_driver")
+
+CLICKS = 5000
+BACKED_UP_NS = 200_000
+
+
+class BackedUpConsole(io.StringIO):
+    """Console whose writes wait, like a USB serial port the host is slow to read."""
+
+    def write(self, text):
+        deadline = time.perf_counter_ns() + BACKED_UP_NS
+        while time.perf_counter_ns() < deadline:
+            pass
+        return super().write(text)
+
+
+def print_click(mouse, pixel_x, pixel_y):
+    """The click of ``code.py`` before the logger: formatted and printed inline."""
+    abs_x = code_driver.screen.map_x(pixel_x)
+    abs_y = code_driver.screen.map_y(pixel_y)
+    print(f"Moving to pixel ({pixel_x}, {pixel_y}) = absolute ({abs_x}, {abs_y})")
+    mouse.move_to(abs_x, abs_y)
+    print("Performing left click...")
+    mouse.click(1)
+
+
+def logged_click(mouse, pixel_x, pixel_y):
+    """The click of ``code.py`` now: ``move_to_pixel`` logs to the ring."""
+    mouse.move_to_pixel(pixel_x, pixel_y)
+    code_driver.log.info(code_driver.LOG_CLICKING)
+    mouse.click(1)
+
+
+def latency(click, mouse):
+    """Mean and worst latency of one click, in microseconds."""
+    total = 0
+    worst = 0
+    for index in range(CLICKS):
+        start = time.perf_counter_ns()
+        click(mouse, index & 2047, index & 1023)
+        elapsed = time.perf_counter_ns() - start
+        total += elapsed
+        if elapsed > worst:
+            worst = elapsed
+    return total / CLICKS / 1000, worst / 1000
+
+
+def main():
+    mouse = code_driver.AbsoluteMouse()
+    log = code_driver.log
+    cases = (
+        ("print, console keeping up", print_click, io.StringIO, None),
+        ("print, console backed up", print_click, BackedUpConsole, None),
+        ("ring_log INFO", logged_click, BackedUpConsole, INFO),
+        ("ring_log OFF", logged_click, BackedUpConsole, OFF),
+    )
+    for name, click, console, level in cases:
+        if level is not None:
+            log.set_level(level)
+        with contextlib.redirect_stdout(console()):
+            mean, worst = latency(click, mouse)
+            log.flush()
+        benchutil.report(name + ": mean click", mean, "us", 2)
+        benchutil.report(name + ": worst click", worst, "us", 2)
+        if level == INFO:
+            with contextlib.redirect_stdout(console()):
+                start = time.perf_counter_ns()
+                for index in range(32):
+                    logged_click(mouse, index, index)
+                click_time = time.perf_counter_ns() - start
+                start = time.perf_counter_ns()
+                log.flush()
+                flush_time = time.perf_counter_ns() - start
+            benchutil.report(name + ": 32 clicks, then flush", click_time / 1000, "us", 1)
+            benchutil.report(name + ": the flush, outside the clicks", flush_time / 1000, "us", 1)
+    log.set_level(INFO)
+
+
+if __name__ == "__main__":
+    main()
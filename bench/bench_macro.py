@@ -0,0 +1,66 @@
+"""Record a macro to a local directory standing in for ``/sd`` and play it back.
+
+Prints the playback timing error and the peak memory used while playing.
+"""
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+import benchutil
+import usb_hid
+from macro import MOUSE, MacroPlayer, MacroRecorder, RecordingDevice, macro_path
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+EVENTS = 500
+INTERVAL_NS = 2_000_000
+
+
+def record(path):
+    mouse_device = absolute_mouse.find_device(usb_hid.devices, usage_page=0x1, usage=0x02)
+    with MacroRecorder(path) as recorder:
+        mouse = absolute_mouse.AbsoluteMouse(RecordingDevice(mouse_device, recorder, MOUSE))
+        deadline = time.monotonic_ns()
+        for i in range(EVENTS):
+            deadline += INTERVAL_NS
+            while time.monotonic_ns() < deadline:
+                pass
+            mouse.move_to(i * 64, i * 32)
+        return recorder.count
+
+
+def main():
+    with tempfile.TemporaryDirectory() as sd:
+        path = macro_path("bench.mac", root=sd)
+        recorded = record(path)
+        mouse_device = absolute_mouse.find_device(usb_hid.devices, usage_page=0x1, usage=0x02)
+        player = MacroPlayer(path, (mouse_device, None))
+        tracemalloc.start()
+        player.play()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        benchutil.report("recorded events", recorded, "events")
+        benchutil.report("file size", os.stat(path).st_size, "bytes")
+        benchutil.report("played reports", player.played, "reports")
+        benchutil.report("mean timing error", player.mean_error_ns / 1000, "us")
+        benchutil.report("max timing error", player.max_error_ns / 1000, "us")
+        benchutil.report("peak memory while playing", peak, "bytes")
+
+        # A cut record or another file version is refused, not played in part silently.
+        with open(path, "rb") as file:
+            data = bytearray(file.read())
+        for name, broken in (("cut.mac", data[:-3]), ("version.mac", data[:4] + b"\x09" + data[5:])):
+            broken_path = macro_path(name, root=sd)
+            with open(broken_path, "wb") as file:
+                file.write(broken)
+            try:
+                MacroPlayer(broken_path, (None, None)).play(speed_percent=100_000)
+            except ValueError:
+                continue
+            raise AssertionError("{} played".format(name))
+
+
+if __name__ == "__main__":
+    main()
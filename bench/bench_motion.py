@@ -0,0 +1,59 @@
+"""Achieved frame rate and jitter of ``MotionEngine`` on the simulated mouse."""
+
+import asyncio
+import time
+
+import benchutil
+import usb_hid
+from motion import MotionEngine, bezier, eased, linear
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+DURATION_NS = 400_000_000
+
+
+class SlowMouse:
+    """Mouse whose reports take 3 ms, to show frames being dropped."""
+
+    def __init__(self, mouse):
+        self.mouse = mouse
+
+    def move_to(self, x, y):
+        deadline = time.monotonic_ns() + 3_000_000
+        while time.monotonic_ns() < deadline:
+            pass
+        self.mouse.move_to(x, y)
+
+
+def show(name, engine):
+    benchutil.report(name + ": achieved rate", engine.achieved_rate_hz, "Hz")
+    benchutil.report(name + ": frames sent / dropped", engine.frames_sent, "/ {}".format(engine.frames_dropped))
+    benchutil.report(name + ": mean jitter", engine.mean_jitter_ns / 1000, "us", digits=1)
+    benchutil.report(name + ": max jitter", engine.max_jitter_ns / 1000, "us", digits=1)
+
+
+def path_rate():
+    def run(count):
+        for _ in range(count // 1000):
+            bezier(((0, 0), (30000, 0), (0, 30000), (32767, 32767)), 1000)
+
+    return benchutil.rate(run, 20000)
+
+
+def main():
+    mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+    for rate in (125, 1000):
+        engine = MotionEngine(mouse, rate_hz=rate)
+        engine.play(eased(0, 0, 32767, 20000, engine.frames_for(DURATION_NS)))
+        show("eased, {} Hz".format(rate), engine)
+    engine = MotionEngine(mouse, rate_hz=125)
+    asyncio.run(engine.play_async(linear(32767, 0, 0, 32767, engine.frames_for(DURATION_NS))))
+    show("linear, 125 Hz, asyncio", engine)
+    engine = MotionEngine(SlowMouse(mouse), rate_hz=1000)
+    engine.play(linear(0, 0, 32767, 32767, engine.frames_for(DURATION_NS)))
+    show("linear, 1000 Hz, 3 ms reports", engine)
+    benchutil.report("bezier path generation", path_rate(), "points/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Reports per second of ``move_path``/``send_frames`` against looped ``move_to``."""
+
+import benchutil
+import usb_hid
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+POINTS = 1000
+
+
+def main():
+    mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+    points = [(i * 32, (POINTS - i) * 32) for i in range(POINTS)]
+    frames = [(0, x, y, 0) for x, y in points]
+    buffer = mouse.encode_frames(frames)
+
+    def per_call(count):
+        for _ in range(count // POINTS):
+            for x, y in points:
+                mouse.move_to(x, y)
+
+    def move_path(count):
+        for _ in range(count // POINTS):
+            mouse.move_path(points)
+
+    def replay(count):
+        for _ in range(count // POINTS):
+            mouse.send_frames(buffer)
+
+    total = POINTS * 50
+    benchutil.report("move_to per point", benchutil.rate(per_call, total), "reports/s")
+    benchutil.report("move_path (encode + send)", benchutil.rate(move_path, total), "reports/s")
+    benchutil.report("send_frames (pre-encoded replay)", benchutil.rate(replay, total), "reports/s")
+
+
+if __name__ == "__main__":
+    main()
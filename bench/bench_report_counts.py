@@ -0,0 +1,45 @@
+"""Reports sent per high-level action by ``lib/absolute_mouse.py``."""
+
+import benchutil
+import usb_hid
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+LEFT = absolute_mouse.AbsoluteMouse.LEFT_BUTTON
+
+
+def count(mouse, action):
+    before = mouse.reports_sent
+    action(mouse)
+    mouse.flush()
+    return mouse.reports_sent - before
+
+
+def click_at(mouse):
+    mouse.move_to(1000, 2000)
+    mouse.click(LEFT)
+
+
+def repeated_move(mouse):
+    for _ in range(10):
+        mouse.move_to(3000, 3000)
+
+
+def drag(mouse):
+    mouse.move_to(100, 100)
+    mouse.press(LEFT)
+    mouse.move_to(5000, 5000)
+    mouse.release(LEFT)
+
+
+def main():
+    actions = (("click at position", click_at), ("same move x10", repeated_move), ("drag", drag))
+    for coalesce in (False, True):
+        mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices, coalesce=coalesce)
+        mode = "coalesce" if coalesce else "state diff"
+        for name, action in actions:
+            benchutil.report("{}, {}".format(name, mode), count(mouse, action), "reports")
+
+
+if __name__ == "__main__":
+    main()
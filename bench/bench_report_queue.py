@@ -0,0 +1,167 @@
+"""Sending through ``report_queue`` while the simulated host stalls for 200 ms."""
+
+import time
+
+import benchutil
+import usb_hid
+from report_queue import BLOCK, COALESCE, DROP_OLDEST, queue_mouse
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+MOVES = 20000
+STREAM_NS = 500_000_000
+PERIOD_NS = 1_000_000
+STALL_NS = 200_000_000
+
+
+class SleepAndRetry:
+    """The old handling: sleep a second after an ``OSError`` and try once more."""
+
+    def __init__(self, device):
+        self.device = device
+        self.usage_page = device.usage_page
+        self.usage = device.usage
+
+    def send_report(self, report, report_id=None):
+        try:
+            self.device.send_report(report)
+        except OSError:
+            time.sleep(1)
+            self.device.send_report(report)
+
+
+def move_rate(mouse):
+    def run(count):
+        for i in range(count):
+            mouse.move_to(i & 0x7FFF, 100)
+
+    return benchutil.rate(run, MOVES)
+
+
+def stream(mouse, drain=None):
+    """One move per millisecond, with the host stalled from 100 ms to 300 ms.
+
+    Returns the longest single ``move_to`` call and the number of moves made.
+    """
+    device = usb_hid.ABSOLUTE_MOUSE
+    start = time.monotonic_ns()
+    deadline = start
+    stalled = False
+    longest = 0
+    moves = 0
+    while True:
+        now = time.monotonic_ns()
+        if now - start >= STREAM_NS:
+            break
+        if not stalled and now - start >= 100_000_000:
+            device.stall(STALL_NS)
+            stalled = True
+        if now >= deadline:
+            call = time.monotonic_ns()
+            mouse.move_to(moves & 0x7FFF, 100)
+            call = time.monotonic_ns() - call
+            if call > longest:
+                longest = call
+            moves += 1
+            deadline += PERIOD_NS
+        if drain is not None:
+            drain()
+    return longest, moves
+
+
+def main():
+    mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+    benchutil.report("move_to, direct", move_rate(mouse), "reports/s")
+    queued = absolute_mouse.AbsoluteMouse(usb_hid.devices, queue_size=32)
+    benchutil.report("move_to, through a 32 report queue", move_rate(queued), "reports/s")
+
+    usb_hid.reset()
+    mouse._mouse_device = SleepAndRetry(usb_hid.ABSOLUTE_MOUSE)
+    longest, moves = stream(mouse)
+    benchutil.report("stall, sleep and retry: longest call", longest / 1e3, "us")
+    benchutil.report("stall, sleep and retry: moves made in 500 ms", moves, "moves")
+
+    for name, policy in (("drop oldest", DROP_OLDEST), ("coalesce", COALESCE), ("block", BLOCK)):
+        usb_hid.reset()
+        mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+        queue = queue_mouse(mouse, 32, policy)
+        usb_hid.recording = True
+        longest, moves = stream(mouse, queue.drain)
+        assert queue.flush(1_000_000_000)
+        usb_hid.recording = False
+        # Whatever was dropped or merged, the host ends up at the last position.
+        last = usb_hid.ABSOLUTE_MOUSE.last_report
+        assert last[1] | last[2] << 8 == (moves - 1) & 0x7FFF
+        prefix = "stall, queue {}: ".format(name)
+        benchutil.report(prefix + "longest call", longest / 1e3, "us")
+        benchutil.report(prefix + "moves made in 500 ms", moves, "moves")
+        benchutil.report(
+            prefix + "sent / dropped / coalesced",
+            queue.sent,
+            "/ {} / {}".format(queue.dropped, queue.coalesced),
+        )
+        benchutil.report(prefix + "attempts refused", queue.failed, "attempts")
+    print(queue.format())
+
+    # Clicks between the moves: the queue drops moves, never a press or a release.
+    # The ring holds every button change of the burst, 25 clicks.
+    for name, policy in (("drop oldest", DROP_OLDEST), ("coalesce", COALESCE), ("block", BLOCK)):
+        usb_hid.reset()
+        mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+        queue = queue_mouse(mouse, 64, policy)
+        usb_hid.recording = True
+        usb_hid.ABSOLUTE_MOUSE.stall(STALL_NS // 4)
+        clicks = 0
+        for i in range(200):
+            mouse.move_to(i, 100)
+            if i % 8 == 7:
+                mouse.click(1)
+                clicks += 1
+        assert queue.flush(1_000_000_000)
+        usb_hid.recording = False
+        presses = 0
+        buttons = 0
+        for _, report in usb_hid.ABSOLUTE_MOUSE.reports:
+            if report[0] and not buttons:
+                presses += 1
+            buttons = report[0]
+        assert presses == clicks and not buttons
+        benchutil.report(
+            "stall with clicks, queue {}: clicks seen / moves dropped".format(name),
+            presses,
+            "/ {}".format(queue.dropped),
+        )
+
+    # A ring full of button changes: only BLOCK waits for the host, the
+    # others refuse the new report at once.
+    for name, policy in (("drop oldest", DROP_OLDEST), ("coalesce", COALESCE), ("block", BLOCK)):
+        usb_hid.reset()
+        mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+        queue = queue_mouse(mouse, 8, policy, block_timeout_ns=STALL_NS // 4)
+        usb_hid.ABSOLUTE_MOUSE.stall(STALL_NS)
+        report = mouse.layout.new_report()
+        for i in range(queue.capacity):
+            report[0] = (i + 1) & 1
+            queue.enqueue(report)
+        report[0] = 1
+        call = time.monotonic_ns()
+        try:
+            queue.enqueue(report)
+        except OSError:
+            pass
+        else:
+            raise AssertionError("a full ring of button changes took a report")
+        call = time.monotonic_ns() - call
+        if policy == BLOCK:
+            assert call >= STALL_NS // 4
+        else:
+            assert call < STALL_NS // 40
+        benchutil.report(
+            "full of button changes, queue {}: refused after".format(name), call / 1e3, "us"
+        )
+    # End the stall, so the benchmarks after this one see a ready host.
+    usb_hid.reset()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Actions per second through ``ActionScheduler`` on the fake ``usb_hid`` device.
+
+Also compares a run of clicks with a concurrent LED blinker against the same
+work done with blocking ``time.sleep`` calls.
+"""
+
+import asyncio
+import time
+
+import benchutil
+import usb_hid
+from mouse_scheduler import ActionScheduler, AsyncMouse, MOVE, PRESS, RELEASE
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+CLICKS = 10
+HOLD_NS = 20_000_000
+SETTLE_NS = 20_000_000
+
+
+def throughput():
+    """Scheduler overhead alone, with no delays between reports."""
+    mouse = AsyncMouse(absolute_mouse.AbsoluteMouse(usb_hid.devices), hold_ns=0, settle_ns=0)
+    scheduler = ActionScheduler(mouse, capacity=3000)
+    for i in range(1000):
+        scheduler.submit(MOVE, i * 32, i * 16)
+        scheduler.submit(PRESS, 1)
+        scheduler.submit(RELEASE, 1)
+    start = time.perf_counter_ns()
+    asyncio.run(scheduler.run(stop_when_idle=True))
+    elapsed = time.perf_counter_ns() - start
+    return scheduler.completed * 1_000_000_000 / elapsed
+
+
+def blocking_clicks(mouse):
+    for i in range(CLICKS):
+        mouse.move_to(i * 1000, i * 1000)
+        time.sleep(SETTLE_NS / 1e9)
+        mouse.press(1)
+        time.sleep(HOLD_NS / 1e9)
+        mouse.release(1)
+    for _ in range(CLICKS):
+        time.sleep(HOLD_NS / 1e9)
+
+
+async def async_clicks(mouse):
+    scheduler = ActionScheduler(AsyncMouse(mouse, hold_ns=HOLD_NS, settle_ns=SETTLE_NS))
+    for i in range(CLICKS):
+        scheduler.click_at(i * 1000, i * 1000)
+
+    async def blinker():
+        for _ in range(CLICKS):
+            await asyncio.sleep(HOLD_NS / 1e9)
+
+    await asyncio.gather(scheduler.run(stop_when_idle=True), blinker())
+
+
+def main():
+    benchutil.report("ActionScheduler, no delays", throughput(), "actions/s")
+    mouse = absolute_mouse.AbsoluteMouse(usb_hid.devices)
+    start = time.perf_counter_ns()
+    blocking_clicks(mouse)
+    blocking = (time.perf_counter_ns() - start) / 1e6
+    start = time.perf_counter_ns()
+    asyncio.run(async_clicks(mouse))
+    interleaved = (time.perf_counter_ns() - start) / 1e6
+    benchutil.report("{} clicks + LED, blocking sleeps".format(CLICKS), blocking, "ms")
+    benchutil.report("{} clicks + LED, scheduler".format(CLICKS), interleaved, "ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Conversions per second of ``ScreenMapper`` against the float ``pixel_to_absolute``."""
+
+import benchutil
+from screen_mapper import ScreenMapper
+
+WIDTH = 2560
+HEIGHT = 1440
+
+
+def pixel_to_absolute(pixel_x, pixel_y, screen_width=WIDTH, screen_height=HEIGHT):
+    """The float conversion ``code.py`` used before ``ScreenMapper``."""
+    abs_x = int((pixel_x / screen_width) * 32767)
+    abs_y = int((pixel_y / screen_height) * 32767)
+    abs_x = max(0, min(32767, abs_x))
+    abs_y = max(0, min(32767, abs_y))
+    return abs_x, abs_y
+
+
+def main():
+    points = [(i % WIDTH, (i * 7) % HEIGHT) for i in range(1000)]
+    tables = ScreenMapper(WIDTH, HEIGHT)
+    scaled = ScreenMapper(WIDTH, HEIGHT, tables=False)
+
+    mismatches = sum(
+        1 for x, y in points if abs(tables.map_x(x) - pixel_to_absolute(x, y)[0]) > 1
+    )
+    assert mismatches == 0, "ScreenMapper disagrees with pixel_to_absolute"
+
+    def float_path(count):
+        for _ in range(count // len(points)):
+            for x, y in points:
+                pixel_to_absolute(x, y)
+
+    def per_axis(mapper):
+        map_x = mapper.map_x
+        map_y = mapper.map_y
+
+        def run(count):
+            for _ in range(count // len(points)):
+                for x, y in points:
+                    map_x(x)
+                    map_y(y)
+
+        return run
+
+    out = tables.map_many(points)
+
+    def bulk(count):
+        for _ in range(count // len(points)):
+            tables.map_many(points, out)
+
+    total = len(points) * 200
+    benchutil.report("pixel_to_absolute (float)", benchutil.rate(float_path, total), "points/s")
+    benchutil.report("ScreenMapper lookup tables", benchutil.rate(per_axis(tables), total), "points/s")
+    benchutil.report("ScreenMapper integer scale", benchutil.rate(per_axis(scaled), total), "points/s")
+    benchutil.report("ScreenMapper.map_many", benchutil.rate(bulk, total), "points/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Scrolling with ``lib/scroll.py``: reports per scroll, scroll rate and lost counts.
+
+The old wheel loop of ``move_to`` sent the wheel before the coordinates and
+left it in the report, so the move scrolled once more. It is reproduced here
+for comparison.
+"""
+
+import random
+
+import benchutil
+import usb_hid
+from hid_descriptor import ABSOLUTE_MOUSE, SCROLL_MOUSE
+from scroll import WHEEL_DELTA, ScrollEngine
+
+absolute_mouse = benchutil.load_module("lib/absolute_mouse.py", "absolute_mouse_single")
+
+DETENTS = 40
+RATE_HZ = 125
+
+
+def wheel_of(report, layout):
+    """Signed wheel counts of a recorded report."""
+    bit_offset, bits = layout.fields["wheel"][:2]
+    start = bit_offset // 8
+    return int.from_bytes(report[start:start + bits // 8], "little", signed=True)
+
+
+def old_move_to(device, report, x, y, wheel):
+    """The wheel loop of ``move_to`` before the scroll engine."""
+    while wheel != 0:
+        partial = max(-127, min(127, wheel))
+        report[5] = partial & 0xFF
+        device.send_report(report)
+        wheel -= partial
+    report[1] = x & 0xFF
+    report[2] = x >> 8
+    report[3] = y & 0xFF
+    report[4] = y >> 8
+    device.send_report(report)
+
+
+def recorded(action):
+    """Reports ``action`` sent to the absolute mouse device."""
+    usb_hid.reset()
+    usb_hid.recording = True
+    try:
+        action()
+    finally:
+        usb_hid.recording = False
+    return [report for _, report in usb_hid.ABSOLUTE_MOUSE.reports]
+
+
+def new_mouse(layout, multiplier=None):
+    usb_hid.reset()
+    if multiplier:
+        # The host enabled the resolution multiplier of both axes.
+        usb_hid.ABSOLUTE_MOUSE.received[layout.report_id] = bytes([1, 1])
+    return absolute_mouse.AbsoluteMouse(usb_hid.devices, layout=layout)
+
+
+def ghost_scroll():
+    """Wheel counts the host sees for ``move_to(wheel=300)`` then a plain move."""
+    layout = ABSOLUTE_MOUSE.layout()
+    old = recorded(
+        lambda: (
+            old_move_to(usb_hid.ABSOLUTE_MOUSE, bytearray(6), 100, 100, 300),
+            old_move_to(usb_hid.ABSOLUTE_MOUSE, bytearray(6), 200, 200, 0),
+        )
+    )
+    mouse = new_mouse(layout)
+    new = recorded(lambda: (mouse.move_to(100, 100, 300), mouse.move_to(200, 200)))
+    assert new[-1][5] == 0 and mouse.report[5] == 0
+    assert len(new) == 4  # three wheel reports, the first one with the move, then the move
+    return sum(wheel_of(report, layout) for report in old), sum(wheel_of(r, layout) for r in new)
+
+
+def lossless(layout, multiplier):
+    """Random fractional input: every whole count of the sum goes out, no more.
+
+    ``multiplier`` is what the host set, ``None`` when it left the default.
+    """
+    mouse = new_mouse(layout, multiplier)
+    engine = ScrollEngine(mouse, rate_hz=1_000_000)
+    assert engine.multiplier == (multiplier or 1)
+    generator = random.Random(20)
+    amounts = [generator.randint(-45, 60) for _ in range(5000)]
+
+    def feed():
+        for amount in amounts:
+            engine.add(amount)
+            engine.step()
+
+    reports = recorded(feed)
+    expected = sum(amounts) * engine.multiplier // WHEEL_DELTA
+    sent = sum(wheel_of(report, layout) for report in reports)
+    assert sent == expected, (sent, expected)
+    return len(reports)
+
+
+def paced_scroll(layout, multiplier, detents, duration_ns=0):
+    """Reports of one paced scroll, and detents per second at the host polling rate.
+
+    The rate counts one polling interval per report, the time the host needs
+    to read them all.
+    """
+    mouse = new_mouse(layout, multiplier)
+    engine = ScrollEngine(mouse, rate_hz=RATE_HZ)
+    reports = recorded(lambda: engine.scroll(-detents * WHEEL_DELTA, duration_ns=duration_ns))
+    assert sum(wheel_of(report, layout) for report in reports) == -detents * engine.multiplier
+    assert engine.last_reports == len(reports)
+    return len(reports), detents * RATE_HZ / len(reports)
+
+
+def main():
+    old, new = ghost_scroll()
+    benchutil.report("move_to(wheel=300) + move: counts scrolled, old loop", old, "counts")
+    benchutil.report("move_to(wheel=300) + move: counts scrolled, now", new, "counts")
+
+    cases = (
+        ("8 bit wheel", ABSOLUTE_MOUSE.layout(), 1),
+        ("16 bit wheel, multiplier off", SCROLL_MOUSE.layout(), None),
+        ("16 bit wheel, multiplier 8", SCROLL_MOUSE.layout(), 8),
+    )
+    old_reports = len(
+        recorded(lambda: old_move_to(usb_hid.ABSOLUTE_MOUSE, bytearray(6), 0, 0, -2000))
+    )
+    benchutil.report("2000 detents, old move_to loop", old_reports, "reports")
+    for name, layout, multiplier in cases:
+        reports, _ = paced_scroll(layout, multiplier, DETENTS)
+        benchutil.report("{} detents, {}".format(DETENTS, name), reports, "reports")
+    for name, layout, multiplier in cases:
+        reports, rate = paced_scroll(layout, multiplier, 2000)
+        benchutil.report(
+            "2000 detents at {} Hz, {}: {} reports".format(RATE_HZ, name, reports), rate, "detents/s"
+        )
+    for name, layout, multiplier in cases:
+        reports, _ = paced_scroll(layout, multiplier, 10, duration_ns=50_000_000)
+        benchutil.report("10 detents smoothed over 50 ms, {}".format(name), reports, "reports")
+    for name, layout, multiplier in cases:
+        reports = lossless(layout, multiplier)
+        benchutil.report("5000 fractional adds, {}: lossless".format(name), reports, "reports")
+
+
+if __name__ == "__main__":
+    main()
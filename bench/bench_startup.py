@@ -0,0 +1,74 @@
+"""Time from startup to the first accepted report, fixed sleeps against polling."""
+
+import os
+import tempfile
+import time
+
+import benchutil
+import supervisor
+import usb_hid
+from startup import StartupProfiler, wait_for_report, wait_for_usb
+
+TIMEOUT_NS = 3_000_000_000
+# The HID endpoint takes reports a little after usb_connected turns True.
+ENDPOINT_LAG_NS = 20_000_000
+
+
+def plug_in(enumeration_ns):
+    """Simulate a host that enumerates the board ``enumeration_ns`` from now."""
+    usb_hid.reset()
+    supervisor.runtime.connect_after(enumeration_ns)
+    usb_hid.ABSOLUTE_MOUSE.stall(enumeration_ns + ENDPOINT_LAG_NS)
+
+
+def probe():
+    usb_hid.ABSOLUTE_MOUSE.send_report(bytes(6))
+
+
+def fixed_sleeps():
+    """The old startup: sleep 1 s, probe, sleep 0.5 s and probe again on failure."""
+    time.sleep(1)
+    try:
+        probe()
+    except OSError:
+        time.sleep(0.5)
+        probe()
+
+
+def polled(profile):
+    wait_for_usb(TIMEOUT_NS)
+    profile.mark("usb")
+    wait_for_report(probe, TIMEOUT_NS)
+    profile.mark("first_report")
+
+
+def main():
+    for enumeration_ms in (50, 400, 1200):
+        name = "host enumerates after {} ms".format(enumeration_ms)
+        plug_in(enumeration_ms * 1_000_000)
+        start = time.monotonic_ns()
+        try:
+            fixed_sleeps()
+            elapsed = (time.monotonic_ns() - start) / 1e6
+            benchutil.report(name + ", fixed sleeps: first report", elapsed, "ms")
+        except OSError:
+            elapsed = (time.monotonic_ns() - start) / 1e6
+            benchutil.report(name + ", fixed sleeps: gave up after", elapsed, "ms")
+
+        plug_in(enumeration_ms * 1_000_000)
+        profile = StartupProfiler()
+        polled(profile)
+        elapsed = profile.elapsed_ns("first_report") / 1e6
+        benchutil.report(name + ", polling: first report", elapsed, "ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "startup.log")
+        assert profile.save(path) and profile.save(path)
+        with open(path) as log:
+            lines = log.read().splitlines()
+    assert len(lines) == 2
+    print(lines[-1])
+
+
+if __name__ == "__main__":
+    main()
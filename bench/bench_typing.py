@@ -0,0 +1,49 @@
+"""Characters per second of ``TypingEngine`` against ``KeyboardLayoutUS.write``."""
+
+import benchutil
+import usb_hid
+from adafruit_hid.keyboard import Keyboard
+from adafruit_hid.keyboard_layout_us import KeyboardLayoutUS
+from typing_engine import TypingEngine
+
+TEXT = "The quick brown fox jumps over the lazy dog. Hello, World! 0123456789\n" * 4
+
+
+def main():
+    keyboard = Keyboard(usb_hid.devices)
+    layout = KeyboardLayoutUS(keyboard)
+    engine = TypingEngine(keyboard, layout)
+    device = keyboard._keyboard_device  # pylint: disable=protected-access
+
+    def stock(count):
+        for _ in range(count // len(TEXT)):
+            layout.write(TEXT)
+
+    def uncached(count):
+        for _ in range(count // len(TEXT)):
+            engine.send(engine._compile(TEXT))  # pylint: disable=protected-access
+
+    def cached(count):
+        for _ in range(count // len(TEXT)):
+            engine.type(TEXT)
+
+    def rollover(count):
+        for _ in range(count // len(TEXT)):
+            combined.type(TEXT)
+
+    combined = TypingEngine(keyboard, layout, rollover=True)
+    total = len(TEXT) * 50
+    for name, run in (
+        ("KeyboardLayoutUS.write", stock),
+        ("TypingEngine, compiled every time", uncached),
+        ("TypingEngine, cached", cached),
+        ("TypingEngine, cached, rollover", rollover),
+    ):
+        benchutil.report(name, benchutil.rate(run, total), "chars/s")
+        before = device.report_count
+        run(len(TEXT))
+        benchutil.report(name, (device.report_count - before) / len(TEXT), "reports/char", digits=2)
+
+
+if __name__ == "__main__":
+    main()
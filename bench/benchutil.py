@@ -0,0 +1,55 @@
+"""
+Helpers shared by the host-side benchmarks.
+
+Importing this module puts ``sim`` and ``lib`` on ``sys.path`` so the drivers
+run unchanged on a desktop Python.
+"""
+
+import importlib.util
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIM = os.path.join(ROOT, "sim")
+LIB = os.path.join(ROOT, "lib")
+
+for path in (LIB, SIM):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import usb_hid  # pylint: disable=wrong-import-position
+
+# Copying every report would dominate the throughput numbers, benchmarks that
+# need the recorded reports turn this back on.
+usb_hid.recording = False
+
+
+def load_module(relative_path, name):
+    """Load a source file as a module under ``name``.
+
+    ``lib/absolute_mouse.py`` is shadowed by the ``lib/absolute_mouse`` package,
+    so it cannot be reached with a plain import.
+    """
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def rate(function, count, repeat=3):
+    """Best rate in calls per second of ``function`` run ``count`` times."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        function(count)
+        elapsed = time.perf_counter_ns() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return count * 1_000_000_000 / best
+
+
+def report(name, value, unit, digits=0):
+    """Print one benchmark result line."""
+    print("{:<64} {:>14,.{}f} {}".format(name, value, digits, unit))
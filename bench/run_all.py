@@ -0,0 +1,37 @@
+"""Run every ``bench_*.py`` benchmark and write the results to ``bench_output.txt``."""
+
+import contextlib
+import importlib
+import io
+import os
+import sys
+import time
+
+import benchutil
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+OUTPUT = os.path.join(benchutil.ROOT, "bench_output.txt")
+
+
+def main(names=None):
+    if not names:
+        names = sorted(
+            name[:-3]
+            for name in os.listdir(BENCH)
+            if name.startswith("bench_") and name.endswith(".py")
+        )
+    with open(OUTPUT, "w") as output:
+        output.write("Host-side benchmarks, {}\n".format(time.strftime("%Y-%m-%d %H:%M:%S")))
+        output.write("Python {}\n".format(sys.version.split()[0]))
+        for name in names:
+            captured = io.StringIO()
+            with contextlib.redirect_stdout(captured):
+                importlib.import_module(name).main()
+            section = "\n== {} ==\n{}".format(name, captured.getvalue())
+            output.write(section)
+            print(section, end="")
+    print("\nResults written to {}".format(OUTPUT))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
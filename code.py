@@ -1,14 +1,19 @@
 import time
-import board
-import digitalio
+from startup import StartupProfiler, wait_for_report, wait_for_usb
+
+# Phase timestamps of this boot, appended to startup.log
+profile = StartupProfiler()
+
+import os
 import usb_hid
+from hid_descriptor import mouse_descriptor
+from hid_util import setting
 
-# LED for visual feedback
-led = digitalio.DigitalInOut(board.LED)
-led.direction = digitalio.Direction.OUTPUT
+# Only what the first report needs is imported here, the rest once it is out
+profile.mark("import")
 
-# Wait for USB host to recognize the device
-time.sleep(1)
+# How long to wait for the USB host to recognize the device
+STARTUP_TIMEOUT_NS = setting("STARTUP_TIMEOUT_MS", 3000) * 1_000_000
 
 
 SCREEN_WIDTH = 2560   # Change to your screen width
@@ -20,17 +25,10 @@ SCREEN_HEIGHT = 1440  # Change to your screen height
 # 3840x2160 (4K)
 # 1366x768 (Common laptop)
 
-def pixel_to_absolute(pixel_x, pixel_y, screen_width=SCREEN_WIDTH, screen_height=SCREEN_HEIGHT):
-    """Convert pixel coordinates to absolute mouse coordinates (0-32767)."""
-    # Calculate the proportion and scale to 0-32767
-    abs_x = int((pixel_x / screen_width) * 32767)
-    abs_y = int((pixel_y / screen_height) * 32767)
-    
-    # Clamp to valid range
-    abs_x = max(0, min(32767, abs_x))
-    abs_y = max(0, min(32767, abs_y))
-    
-    return abs_x, abs_y
+# Target of the startup click, a name from hotspots.txt (see lib/hotspots.py).
+# Without the file, it is the pixel below.
+CLICK_TARGET = "start"
+CLICK_PIXEL = (500, 1400)
 
 def find_device(devices, *, usage_page, usage):
     """Find a device with the specified usage page and usage."""
@@ -54,17 +52,14 @@ class AbsoluteMouse:
             print("Mouse device not found!")
             return
         
-        # HID report: [buttons, x_low, x_high, y_low, y_high, wheel]
-        self.report = bytearray(6)
-        
-        # Test if device is ready
-        try:
-            self._send_report()
-        except OSError:
-            time.sleep(0.5)
-            self._send_report()
+        # HID report: [buttons, x_low, x_high, y_low, y_high, wheel], plus
+        # pan with the high resolution scroll descriptor of boot.py
+        self.layout = mouse_descriptor().layout()
+        self.report = self.layout.new_report()
+        self._pack_wheel = self.layout.packer("wheel")
+        self._max_wheel = self.layout.fields["wheel"][3]
     
-    def move_to(self, x, y):
+    def move_to(self, x, y, wheel=0):
         """Move mouse to absolute coordinates (0-32767 for both x and y)."""
         if self._mouse_device is None:
             return
@@ -73,85 +68,218 @@ class AbsoluteMouse:
         x = max(0, min(32767, x))
         y = max(0, min(32767, y))
         
-        # Convert to little-endian bytes
-        x_bytes = x.to_bytes(2, 'little')
-        y_bytes = y.to_bytes(2, 'little')
-        
-        # Build report: [buttons, x_low, x_high, y_low, y_high, wheel]
-        self.report[0] = 0  # No buttons pressed
-        self.report[1] = x_bytes[0]  # X low byte
-        self.report[2] = x_bytes[1]  # X high byte
-        self.report[3] = y_bytes[0]  # Y low byte
-        self.report[4] = y_bytes[1]  # Y high byte
-        self.report[5] = 0  # No wheel movement
+        # Build report in place: [buttons, x_low, x_high, y_low, y_high, wheel].
+        # The buttons stay as they are, so a move between press and release drags.
+        self.report[1] = x & 0xFF  # X low byte
+        self.report[2] = x >> 8  # X high byte
+        self.report[3] = y & 0xFF  # Y low byte
+        self.report[4] = y >> 8  # Y high byte
+        self._pack_wheel(self.report, max(-self._max_wheel, min(self._max_wheel, wheel)))
         
         self._send_report()
+        self._pack_wheel(self.report, 0)
         
+    def press(self, buttons):
+        """Press the given buttons, keeping the current position."""
+        if self._mouse_device is None:
+            return
+        self.report[0] |= buttons
+        self._send_report()
+
+    def release(self, buttons):
+        """Release the given buttons, keeping the current position."""
+        if self._mouse_device is None:
+            return
+        self.report[0] &= ~buttons
+        self._send_report()
+
+    def click(self, buttons):
+        """Press and release the given buttons, keeping the current position."""
+        self.press(buttons)
+        self.release(buttons)
+
     def move_to_pixel(self, pixel_x, pixel_y):
         """Move mouse to specific pixel coordinates."""
-        abs_x, abs_y = pixel_to_absolute(pixel_x, pixel_y)
-        print(f"Moving to pixel ({pixel_x}, {pixel_y}) = absolute ({abs_x}, {abs_y})")
+        abs_x = screen.map_x(pixel_x)
+        abs_y = screen.map_y(pixel_y)
+        log.info(LOG_MOVING, pixel_x, pixel_y, abs_x, abs_y)
         self.move_to(abs_x, abs_y)
     
-    def left_click(self):
-        """Perform a left mouse click at current position."""
+    async def left_click(self):
+        """Perform a left mouse click at current position, without blocking other tasks."""
         if self._mouse_device is None:
             return
         
-        print("Performing left click...")
+        log.info(LOG_CLICKING)
         
         # Press left button
-        self.report[0] = self.LEFT_BUTTON
-        self._send_report()
-        
-        # Small delay to ensure click is registered
-        time.sleep(0.05)
-        
-        # Release left button
-        self.report[0] = 0
-        self._send_report()
+        self.press(self.LEFT_BUTTON)
+        try:
+            # Small delay to ensure click is registered
+            await sleep_until(time.monotonic_ns() + 50_000_000)
+        finally:
+            # Release left button
+            self.release(self.LEFT_BUTTON)
     
-    def click_at_pixel(self, pixel_x, pixel_y):
-        """Move to pixel coordinates and perform left click."""
+    async def click_at_pixel(self, pixel_x, pixel_y):
+        """Move to pixel coordinates and perform left click, without blocking other tasks."""
         self.move_to_pixel(pixel_x, pixel_y)
-        time.sleep(0.1)  # Small delay after movement
-        self.left_click()
+        await sleep_until(time.monotonic_ns() + 100_000_000)  # Small delay after movement
+        await self.left_click()
         
     def _send_report(self):
         """Send the current report to the host."""
         if self._mouse_device:
             self._mouse_device.send_report(self.report)
 
-# Initialize mouse
-print(f"Screen resolution set to: {SCREEN_WIDTH}x{SCREEN_HEIGHT}")
-print("Initializing absolute mouse...")
-mouse = AbsoluteMouse()
-
-# Blink LED to show we're starting
-led.value = True
-time.sleep(0.2)
-led.value = False
-
-print("Moving mouse to your requested position and clicking...")
-# Move to your specific pixel coordinates and left click: 2500, 1400
-mouse.click_at_pixel(500, 1400)
-
-# Wait and blink to show click completed
-time.sleep(1)
-led.value = True
-time.sleep(0.1)
-led.value = False
-
-# Final blink sequence to show completion
-time.sleep(0.5)
-for i in range(3):
-    led.value = True
-    time.sleep(0.1)
-    led.value = False
-    time.sleep(0.1)
+# CircuitPython runs code.py as __main__, the host-side benchmarks import it
+if __name__ == "__main__":
+    # Initialize mouse
+    print(f"Screen resolution set to: {SCREEN_WIDTH}x{SCREEN_HEIGHT}")
+    # Poll instead of sleeping a fixed time: on with the click as soon as the host is ready
+    if wait_for_usb(STARTUP_TIMEOUT_NS):
+        profile.mark("usb")
 
+    print("Initializing absolute mouse...")
+    mouse = AbsoluteMouse()
+    profile.mark("device")
+
+    # Per-report latency statistics, readable with the STATS command,
+    # the reports probing the host below included.
+    # Off unless settings.toml has HID_STATS = 1, so reports go out unwrapped.
+    stats = None
+    if setting("HID_STATS"):
+        from hid_stats import ReportStats
+        stats = ReportStats()
+        stats.instrument(mouse)
+
+    # The HID endpoint can lag a little behind the USB connection
+    if mouse._mouse_device is not None and wait_for_report(mouse._send_report, STARTUP_TIMEOUT_NS):
+        profile.mark("first_report")
+
+# The host has the mouse: now the modules of the click and the LED.
+# asyncio is not built into CircuitPython: install it and adafruit_ticks from
+# the library bundle with "circup install asyncio" (see README.md).
+try:
+    import asyncio
+except ImportError:
+    print("code.py needs the asyncio library: circup install asyncio")
+    raise
+import board
+import digitalio
+from screen_mapper import ScreenMapper
+from mouse_scheduler import ActionScheduler, AsyncMouse, sleep_until
+from ring_log import INFO, RingLogger
+
+# LED for visual feedback
+led = digitalio.DigitalInOut(board.LED)
+led.direction = digitalio.Direction.OUTPUT
+
+# Messages of the mouse actions are buffered and printed by a background task,
+# never in the middle of a click. LOG_LEVEL in settings.toml: 10 for debug,
+# 20 for info, 100 for none.
+log = RingLogger(level=setting("LOG_LEVEL", INFO))
+LOG_MOVING = log.message("Moving to pixel ({}, {}) = absolute ({}, {})")
+LOG_CLICKING = log.message("Performing left click...")
+
+# Pixel to absolute coordinate conversion, precomputed once for this resolution
+screen = ScreenMapper(SCREEN_WIDTH, SCREEN_HEIGHT)
+
+# Several monitors: list them in settings.toml (see lib/desktop.py), then
+# desktop.move_to_pixel(mouse, "name", x, y) targets a pixel of one of them
+desktop = None
+if os.getenv("MONITORS"):
+    from desktop import Desktop
+    desktop = Desktop.from_settings()
+
+async def blink(times=1, on_ns=100_000_000, off_ns=100_000_000):
+    """Blink the LED without blocking the mouse actions."""
+    for _ in range(times):
+        led.value = True
+        await sleep_until(time.monotonic_ns() + on_ns)
+        led.value = False
+        await sleep_until(time.monotonic_ns() + off_ns)
+
+async def main():
+    # Send the reports the host was not ready for in the background
+    if queue is not None:
+        asyncio.create_task(queue.run())
+    # Print the buffered log lines when nothing else is going on
+    asyncio.create_task(log.run())
+
+    scheduler = ActionScheduler(AsyncMouse(mouse), collector=collector)
+
+    print("Moving mouse to your requested position and clicking...")
+    # Move to the target and left click
+    target = hotspots.id(CLICK_TARGET)
+    scheduler.click_at(*hotspots.position(target))
+
+    # Blink LED to show we're starting, while the click goes out
+    await asyncio.gather(
+        blink(on_ns=200_000_000, off_ns=0),
+        scheduler.run(stop_when_idle=True),
+    )
+
+    # Wait and blink to show click completed
+    await sleep_until(time.monotonic_ns() + 1_000_000_000)
+    await blink(off_ns=0)
+
+    # Final blink sequence to show completion
+    await sleep_until(time.monotonic_ns() + 500_000_000)
+    await blink(3)
     led.value = True
 
-print("Mouse movement and click sequence complete!")
-print(f"Clicked at pixel coordinates (2500, 1400) on {SCREEN_WIDTH}x{SCREEN_HEIGHT} screen")
-print("If the position is wrong, update SCREEN_WIDTH and SCREEN_HEIGHT at the top of the code")
+    log.flush()
+    print("Mouse movement and click sequence complete!")
+    print(collector.format())
+    pixel_x = hotspots.pixels[2 * target]
+    pixel_y = hotspots.pixels[2 * target + 1]
+    print(f"Clicked {CLICK_TARGET} at pixel coordinates ({pixel_x}, {pixel_y}) on {SCREEN_WIDTH}x{SCREEN_HEIGHT} screen")
+    print("If the position is wrong, update SCREEN_WIDTH and SCREEN_HEIGHT at the top of the code")
+
+    # Take commands from the host on the data serial port, if boot.py enabled it
+    import usb_cdc
+    if usb_cdc.data is not None:
+        from command_protocol import CommandReceiver
+        from adafruit_hid.keyboard import Keyboard
+        # KEY commands go to the keyboard that boot.py enables with the mouse
+        try:
+            keyboard = Keyboard(usb_hid.devices)
+        except ValueError:
+            print("Keyboard device not found, KEY commands are refused")
+            keyboard = None
+        print("Listening for commands on the usb_cdc data port...")
+        await CommandReceiver(usb_cdc.data, mouse, keyboard, stats=stats).run_async(collector)
+
+if __name__ == "__main__":
+    profile.mark("setup")
+
+    # Reports wait in a ring buffer while the host is busy, instead of the
+    # script sleeping or stopping on OSError.
+    queue = None
+    if mouse._mouse_device is not None:
+        from report_queue import queue_mouse
+        queue = queue_mouse(mouse, capacity=32)
+
+    # Named click targets, converted to reports once
+    from hotspots import Hotspots
+    hotspots = Hotspots(mouse, screen, desktop)
+    try:
+        hotspots.load()
+    except OSError:
+        print("No hotspots.txt found, using the default click target")
+    if CLICK_TARGET not in hotspots:
+        hotspots.add(CLICK_TARGET, CLICK_PIXEL[0], CLICK_PIXEL[1])
+
+    if setting("STARTUP_LOG"):
+        profile.save()
+    print("Startup:", profile.format())
+
+    # Garbage is collected while waiting on deadlines, a click's hold included
+    # when the collection fits in it, not while a report goes out.
+    # GC_DISABLE_IN_BURSTS in settings.toml also keeps the automatic collector
+    # off while reports go out.
+    from gc_scheduler import GCScheduler
+    collector = GCScheduler(disable_in_bursts=bool(setting("GC_DISABLE_IN_BURSTS")))
+
+    asyncio.run(main())
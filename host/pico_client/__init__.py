@@ -0,0 +1,41 @@
+"""
+Host-side client for the binary command port of the board.
+
+Runs on a desktop Python, talks to ``usb_cdc.data`` (``/dev/ttyACM1`` on
+Linux, usually) with the frames of ``lib/command_protocol.py``. Commands are
+pipelined: up to ``window`` of them are in flight, and acknowledgements come
+back asynchronously, so throughput is not bound by the USB round trip.
+
+Examples::
+
+    import asyncio
+    from pico_client import AsyncClient
+
+    async def main():
+        board = await AsyncClient.open("/dev/ttyACM1", window=32)
+        await asyncio.gather(*(board.move(x, 16384) for x in range(0, 32768, 64)))
+        print(board.latency.summary())
+        await board.close()
+
+    asyncio.run(main())
+"""
+
+from .client import (
+    MAX_WINDOW,
+    AsyncClient,
+    Client,
+    CommandError,
+    open_port,
+    parse_stats,
+)
+from .latency import LatencyStats
+
+__all__ = [
+    "MAX_WINDOW",
+    "AsyncClient",
+    "Client",
+    "CommandError",
+    "LatencyStats",
+    "open_port",
+    "parse_stats",
+]
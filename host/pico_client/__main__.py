@@ -0,0 +1,32 @@
+"""Measure commands per second against a board: ``python -m pico_client /dev/ttyACM1``."""
+
+import argparse
+import asyncio
+import time
+
+from .client import AsyncClient
+
+
+async def measure(port, count, window):
+    board = await AsyncClient.open(port, window=window)
+    start = time.perf_counter_ns()
+    for index in range(count):
+        await board.submit(1, 0, index * 7 & 0x7FFF, index * 3 & 0x7FFF)
+    await board.drain()
+    elapsed = time.perf_counter_ns() - start
+    print("{} moves, window {}: {:,.0f} commands/s".format(count, window, count * 1e9 / elapsed))
+    print(board.latency.summary())
+    await board.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("port", help="serial device of the board's data port")
+    parser.add_argument("--count", type=int, default=10000, help="number of moves to send")
+    parser.add_argument("--window", type=int, default=32, help="commands in flight")
+    arguments = parser.parse_args()
+    asyncio.run(measure(arguments.port, arguments.count, arguments.window))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""Pipelined clients for the command port of the board.
+
+Frames are encoded with ``command_protocol`` from the board's ``lib`` folder,
+so both ends always agree on the format.
+"""
+
+import asyncio
+import os
+import struct
+import threading
+import time
+import tty
+
+from .latency import LatencyStats
+
+try:
+    import command_protocol
+except ImportError:
+    import sys
+
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "lib"))
+    import command_protocol
+
+from command_protocol import (  # pylint: disable=wrong-import-position
+    ACK_SIZE,
+    ACK_SYNC,
+    CLICK,
+    FRAME_SIZE,
+    KEY,
+    MOVE,
+    PRESS,
+    RELEASE,
+    STATS,
+    STATUS_OK,
+    WHEEL,
+    crc8,
+    encode_frame,
+)
+
+MAX_WINDOW = 128
+"""Largest window: half the sequence space, so an acknowledgement is never ambiguous."""
+
+STATS_FIELDS = ("sent", "failed", "retried", "max_stall_us", "gc_seen", "gc_gap_us")
+_STATS_HEADER = "<IIIIII"
+STATS_SIZE = struct.calcsize(_STATS_HEADER) + 4 * 16
+"""Size of the ``STATS`` answer, ``hid_stats.SNAPSHOT_SIZE`` on the board."""
+
+
+class CommandError(Exception):
+    """The board answered a command with an error status."""
+
+    def __init__(self, sequence, status):
+        super().__init__("command {} failed with status {}".format(sequence, status))
+        self.sequence = sequence
+        self.status = status
+
+
+def parse_stats(snapshot):
+    """Decode the answer of a ``STATS`` command into a dict, histogram included."""
+    values = struct.unpack_from(_STATS_HEADER, snapshot)
+    result = dict(zip(STATS_FIELDS, values))
+    offset = struct.calcsize(_STATS_HEADER)
+    result["histogram"] = list(struct.unpack_from("<16I", snapshot, offset))
+    return result
+
+
+def open_port(port):
+    """Open a serial device path (or take an open file descriptor) in raw mode."""
+    if isinstance(port, int):
+        fd = port
+    else:
+        fd = os.open(port, os.O_RDWR | os.O_NOCTTY)
+    tty.setraw(fd)
+    return fd
+
+
+class AsyncClient:
+    """``asyncio`` client that keeps up to ``window`` commands in flight.
+
+    :param reader: ``asyncio.StreamReader`` receiving the acknowledgements.
+    :param writer: ``asyncio.StreamWriter`` (or anything with ``write()``) for frames.
+    :param window: most commands sent but not acknowledged yet, 1 to ``MAX_WINDOW``.
+        With 1, every command waits for the previous one, like a naive script.
+    :param timeout: seconds before a command without acknowledgement fails with
+        ``asyncio.TimeoutError``. Its sequence number and its place in the
+        window stay taken until the late acknowledgement arrives or another
+        ``timeout`` passes, so that acknowledgement cannot be taken for a newer
+        command.
+
+    Frames submitted in the same event loop iteration go out in one write.
+    ``await client.move(x, y)`` waits for the acknowledgement; to pipeline, use
+    ``submit()`` or run several commands with ``asyncio.gather()``.
+    """
+
+    def __init__(self, reader, writer, *, window=32, timeout=1.0):
+        if not 1 <= window <= MAX_WINDOW:
+            raise ValueError("window must be 1 to {}".format(MAX_WINDOW))
+        self.reader = reader
+        self.writer = writer
+        self.window = window
+        self.timeout = timeout
+        self.latency = LatencyStats()
+        """Round trip of every acknowledged command."""
+        self._slots = asyncio.Semaphore(window)
+        self._sequence = 0
+        self._pending = {}
+        self._outgoing = bytearray()
+        self._flush_scheduled = False
+        self._loop = asyncio.get_running_loop()
+        self._reader_task = self._loop.create_task(self._read_acks())
+        self._read_transport = None
+
+    @classmethod
+    async def open(cls, port, **kwargs):
+        """Connect to a serial device path, like ``/dev/ttyACM1``, or an open descriptor."""
+        fd = open_port(port)
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        read_transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, "rb", buffering=0)
+        )
+        transport, protocol = await loop.connect_write_pipe(
+            asyncio.Protocol, os.fdopen(os.dup(fd), "wb", buffering=0)
+        )
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+        client = cls(reader, writer, **kwargs)
+        client._read_transport = read_transport  # pylint: disable=protected-access
+        return client
+
+    @property
+    def in_flight(self):
+        """Commands sent and not acknowledged yet, timed out ones included."""
+        return len(self._pending)
+
+    async def submit(self, opcode, arg=0, x=0, y=0):
+        """Send one command as soon as the window has room.
+
+        :return: a future with the result of the command: ``None``, or the
+            answer bytes for ``STATS``. It fails with ``CommandError`` on an
+            error status.
+        """
+        await self._slots.acquire()
+        sequence = self._sequence
+        # Skip the numbers of timed out commands whose acknowledgement may
+        # still come; the window keeps fewer than half of them taken.
+        while sequence in self._pending:
+            sequence = (sequence + 1) & 0xFF
+        self._sequence = (sequence + 1) & 0xFF
+        offset = len(self._outgoing)
+        self._outgoing.extend(bytes(FRAME_SIZE))
+        encode_frame(opcode, sequence, arg, x, y, self._outgoing, offset)
+        future = self._loop.create_future()
+        future.add_done_callback(self._finished)
+        timer = self._loop.call_later(self.timeout, self._expire, sequence)
+        self._pending[sequence] = (future, time.perf_counter_ns(), opcode, timer)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._loop.call_soon(self._flush)
+        return future
+
+    async def command(self, opcode, arg=0, x=0, y=0):
+        """Send one command and wait for its result."""
+        return await (await self.submit(opcode, arg, x, y))
+
+    async def move(self, x, y):
+        """Move the pointer to absolute coordinates."""
+        return await self.command(MOVE, 0, x, y)
+
+    async def press(self, buttons):
+        """Press ``buttons`` where the pointer is."""
+        return await self.command(PRESS, buttons)
+
+    async def release(self, buttons):
+        """Release ``buttons`` where the pointer is."""
+        return await self.command(RELEASE, buttons)
+
+    async def click(self, x, y, buttons=1):
+        """Move to absolute coordinates and click ``buttons``."""
+        return await self.command(CLICK, buttons, x, y)
+
+    async def wheel(self, x, y, amount):
+        """Move to absolute coordinates and turn the wheel, -127 to 127."""
+        return await self.command(WHEEL, amount & 0xFF, x, y)
+
+    async def key(self, keycode, modifier=0):
+        """Tap ``keycode``, with ``modifier`` held if given."""
+        return await self.command(KEY, keycode, modifier)
+
+    async def stats(self):
+        """Report statistics of the board as a dict, see ``parse_stats()``."""
+        return parse_stats(await self.command(STATS))
+
+    async def drain(self):
+        """Wait until every command sent so far is acknowledged or failed.
+
+        :return: the number of commands that failed so far.
+        """
+        while True:
+            futures = [entry[0] for entry in self._pending.values() if not entry[0].done()]
+            if not futures:
+                return self.latency.failed
+            await asyncio.wait(futures)
+
+    async def close(self):
+        """Stop reading and close the port, failing the commands still in flight."""
+        self._reader_task.cancel()
+        try:
+            await self._reader_task
+        except asyncio.CancelledError:
+            pass
+        for sequence in list(self._pending):
+            self._fail(sequence, asyncio.CancelledError())
+        self.writer.close()
+        if self._read_transport is not None:
+            self._read_transport.close()
+
+    def _flush(self):
+        self._flush_scheduled = False
+        if self._outgoing:
+            self.writer.write(bytes(self._outgoing))
+            self._outgoing.clear()
+
+    def _finished(self, future):
+        # Failures are counted here, so nobody has to await every future.
+        if future.cancelled() or future.exception() is not None:
+            self.latency.failed += 1
+
+    def _fail(self, sequence, error):
+        future, _, _, timer = self._pending.pop(sequence)
+        timer.cancel()
+        self._slots.release()
+        if not future.done():
+            future.set_exception(error)
+
+    def _expire(self, sequence):
+        entry = self._pending.get(sequence)
+        if entry is None:
+            return
+        future, sent, opcode, _ = entry
+        if future.done():
+            # Second timeout: the acknowledgement is not coming.
+            self._fail(sequence, None)
+            return
+        future.set_exception(asyncio.TimeoutError())
+        timer = self._loop.call_later(self.timeout, self._expire, sequence)
+        self._pending[sequence] = (future, sent, opcode, timer)
+
+    async def _read_acks(self):
+        buffer = bytearray()
+        while True:
+            data = await self.reader.read(4096)
+            if not data:
+                return
+            buffer.extend(data)
+            start = 0
+            while len(buffer) - start >= ACK_SIZE:
+                if buffer[start] != ACK_SYNC or crc8(buffer, start, start + 3) != buffer[start + 3]:
+                    start += 1
+                    continue
+                sequence = buffer[start + 1]
+                status = buffer[start + 2]
+                entry = self._pending.get(sequence)
+                if entry is not None and entry[2] == STATS and status == STATUS_OK:
+                    if len(buffer) - start < ACK_SIZE + STATS_SIZE:
+                        break
+                    payload = bytes(buffer[start + ACK_SIZE:start + ACK_SIZE + STATS_SIZE])
+                    start += ACK_SIZE + STATS_SIZE
+                else:
+                    payload = None
+                    start += ACK_SIZE
+                if entry is not None:
+                    self._acknowledged(sequence, status, payload)
+            del buffer[:start]
+
+    def _acknowledged(self, sequence, status, payload):
+        future, sent, _, timer = self._pending.pop(sequence)
+        timer.cancel()
+        self._slots.release()
+        if future.done():
+            return
+        if status == STATUS_OK:
+            self.latency.add(time.perf_counter_ns() - sent)
+            future.set_result(payload)
+        else:
+            future.set_exception(CommandError(sequence, status))
+
+
+class Client:
+    """Blocking wrapper of ``AsyncClient``, for plain scripts.
+
+    :param port: serial device path or open descriptor.
+
+    The event loop runs in a background thread. The command methods return as
+    soon as the frame is queued, so a loop of ``move()`` calls is pipelined; they
+    only block while the window is full. ``drain()`` waits for the
+    acknowledgements and raises ``CommandError`` if any command failed.
+
+    Examples::
+
+        with Client("/dev/ttyACM1", window=32) as board:
+            for x in range(0, 32768, 64):
+                board.move(x, 16384)
+            board.drain()
+            print(board.latency.summary())
+    """
+
+    def __init__(self, port, **kwargs):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._client = self._call(self._open(port, kwargs))
+        # The window is enforced on this side too, so queueing a command is one
+        # wake-up of the loop thread instead of a round trip to it.
+        self._window = threading.Semaphore(self._client.window)
+        self._reported_failures = 0
+
+    @staticmethod
+    async def _open(port, kwargs):
+        return await AsyncClient.open(port, **kwargs)
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    @property
+    def latency(self):
+        """``LatencyStats`` of the acknowledged commands."""
+        return self._client.latency
+
+    def submit(self, opcode, arg=0, x=0, y=0):
+        """Queue one command without waiting for its acknowledgement."""
+        self._window.acquire()
+        self._loop.call_soon_threadsafe(self._start, opcode, arg, x, y)
+
+    def _start(self, opcode, arg, x, y):
+        task = self._loop.create_task(self._client.submit(opcode, arg, x, y))
+        task.add_done_callback(self._submitted)
+
+    def _submitted(self, task):
+        if task.cancelled() or task.exception() is not None:
+            # Never sent: give its place back, and let drain() report it.
+            self._client.latency.failed += 1
+            self._window.release()
+            return
+        task.result().add_done_callback(self._acknowledged)
+
+    def _acknowledged(self, _):
+        self._window.release()
+
+    def move(self, x, y):
+        """Queue a move to absolute coordinates."""
+        self.submit(MOVE, 0, x, y)
+
+    def press(self, buttons):
+        """Queue a press of ``buttons``."""
+        self.submit(PRESS, buttons)
+
+    def release(self, buttons):
+        """Queue a release of ``buttons``."""
+        self.submit(RELEASE, buttons)
+
+    def click(self, x, y, buttons=1):
+        """Queue a move and a click of ``buttons``."""
+        self.submit(CLICK, buttons, x, y)
+
+    def wheel(self, x, y, amount):
+        """Queue a move and a turn of the wheel."""
+        self.submit(WHEEL, amount & 0xFF, x, y)
+
+    def key(self, keycode, modifier=0):
+        """Queue a tap of ``keycode``."""
+        self.submit(KEY, keycode, modifier)
+
+    def stats(self):
+        """Report statistics of the board as a dict, waits for the answer."""
+        return self._call(self._client.stats())
+
+    def drain(self):
+        """Wait for every queued command, raise ``CommandError`` on new failures."""
+        failed = self._call(self._client.drain())
+        if failed > self._reported_failures:
+            count = failed - self._reported_failures
+            self._reported_failures = failed
+            raise CommandError(None, "{} commands failed".format(count))
+
+    def close(self):
+        """Close the port and stop the event loop thread."""
+        self._call(self._client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
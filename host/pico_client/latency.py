@@ -0,0 +1,53 @@
+"""Round-trip latency statistics of the commands sent by the client."""
+
+
+class LatencyStats:
+    """Latencies of acknowledged commands, in nanoseconds.
+
+    Every sample is kept until ``reset()``, so percentiles are exact. At 8 bytes a
+    sample that is a few megabytes for a million commands, fine on a host.
+    """
+
+    def __init__(self):
+        self.samples = []
+        self.failed = 0
+        """Commands answered with an error status or never answered."""
+
+    def reset(self):
+        """Forget every sample."""
+        self.samples = []
+        self.failed = 0
+
+    def add(self, latency_ns):
+        """Record the latency of one acknowledged command."""
+        self.samples.append(latency_ns)
+
+    @property
+    def count(self):
+        """Number of acknowledged commands."""
+        return len(self.samples)
+
+    def mean_ns(self):
+        """Mean latency, 0 without samples."""
+        if not self.samples:
+            return 0
+        return sum(self.samples) / len(self.samples)
+
+    def percentile_ns(self, percent):
+        """Latency below which ``percent`` percent of the commands were acknowledged."""
+        if not self.samples:
+            return 0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, (len(ordered) * percent + 99) // 100 - 1))
+        return ordered[index]
+
+    def summary(self):
+        """Count, failures, mean, p50, p99 and max as one line of text."""
+        return "count={} failed={} mean={:.1f}us p50={:.1f}us p99={:.1f}us max={:.1f}us".format(
+            self.count,
+            self.failed,
+            self.mean_ns() / 1000,
+            self.percentile_ns(50) / 1000,
+            self.percentile_ns(99) / 1000,
+            max(self.samples, default=0) / 1000,
+        )
@@ -9,8 +9,10 @@
 
 * Author(s): Dan Halbert, Bitboy, Neradoc
 """
-import time
 import usb_hid
+from hid_descriptor import mouse_descriptor
+from hid_util import limit_coord
+from report_queue import queue_mouse
 
 def find_device(devices, *, usage_page, usage):
     """Find a device in the provided list with the specified usage page and usage."""
@@ -31,33 +33,88 @@ class AbsoluteMouse:
     MIDDLE_BUTTON = 4
     """Middle mouse button."""
 
-    def __init__(self, devices=None):
+    REPORT_LENGTH = mouse_descriptor().layout().length
+    """Size in bytes of the default report: buttons, x (2 bytes), y (2 bytes), wheel."""
+
+    def __init__(self, devices=None, coalesce=False, layout=None, queue_size=0):
         """Create an AbsoluteMouse object that will send USB mouse HID reports.
 
         Devices can be a list of devices that includes a mouse device or a mouse device
         itself. A device is any object that implements ``send_report()``, ``usage_page`` and
         ``usage``.
+
+        Reports that would not change anything on the host are not sent. With
+        ``coalesce`` set, ``move_to`` only updates the report and the move goes out
+        together with the next button change, or with ``flush()``.
+
+        ``layout`` is the ``hid_descriptor.Layout`` of the report that ``boot.py``
+        declared, ``hid_descriptor.mouse_descriptor()`` by default. It needs
+        ``buttons``, ``x``, ``y`` and ``wheel`` fields, byte aligned; a ``pan``
+        field is used by ``scroll()``, any other field stays zero.
+
+        With ``queue_size`` set, reports go through a ``report_queue.ReportQueue``
+        of that many reports: sending never waits for a host that is not ready, and
+        raises ``OSError`` only when the queue is full of button changes. Run
+        ``mouse.queue.run()`` as an ``asyncio`` task, or call
+        ``mouse.queue.drain()`` from the main loop, to send what is left.
         """
         if devices is None:
             devices = usb_hid.devices
         self._mouse_device = find_device(devices, usage_page=0x1, usage=0x02)
-        
-        # Reuse this bytearray to send mouse reports.
+        # Wrappers replace _mouse_device; feature reports are read from the device itself.
+        self._hid_device = self._mouse_device
+
+        if layout is None:
+            layout = mouse_descriptor().layout()
+        self.layout = layout
+        self.report_length = layout.length
+        """Size in bytes of one report."""
+        # Field positions, looked up once so sending needs no layout math.
+        self._buttons_offset = layout.offset("buttons")
+        self._x_offset = layout.offset("x")
+        self._y_offset = layout.offset("y")
+        self._pack_wheel = layout.packer("wheel")
+        self._max_wheel = layout.fields["wheel"][3]
+        self._pack_pan = None
+        self._max_pan = 0
+        if "pan" in layout.fields:
+            self._pack_pan = layout.packer("pan")
+            self._max_pan = layout.fields["pan"][3]
+
+        # Reuse this bytearray to send mouse reports. With the default layout:
         # report[0] buttons pressed (LEFT, MIDDLE, RIGHT)
         # report[1] x1 movement
         # report[2] x2 movement
         # report[3] y1 movement
         # report[4] y2 movement
         # report[5] wheel movement
-        self.report = bytearray(6)
+        self.report = layout.new_report()
+        # Last report the host received, to skip the ones that change nothing.
+        self._last_report = layout.new_report()
+        # Report slices of the last buffer given to send_frames(), and the
+        # buffer move_path() encodes into, both reused by later calls.
+        self._frames_buffer = None
+        self._frames = ()
+        self._path_buffer = bytearray(0)
+
+        self.coalesce = coalesce
+        self._pending = False
+        self.reports_sent = 0
+        """Number of reports sent to the host."""
+        self.reports_suppressed = 0
+        """Number of reports skipped because they were identical to the last one."""
+
+        self.queue = None
+        """The ``ReportQueue`` in front of the device, if ``queue_size`` was given."""
+        if queue_size:
+            self.queue = queue_mouse(self, queue_size)
 
-        # Do a no-op to test if HID device is ready.
-        # If not, wait a bit and try once more.
+        # Do a no-op to test if HID device is ready. If not, the next report
+        # tries again, or the queue does.
         try:
-            self._send_no_move()
+            self._send_report(force=True)
         except OSError:
-            time.sleep(1)
-            self._send_no_move()
+            pass
 
     def press(self, buttons):
         """Press the given mouse buttons.
@@ -73,8 +130,8 @@ class AbsoluteMouse:
         # Press the left and right buttons simultaneously.
         m.press(AbsoluteMouse.LEFT_BUTTON | AbsoluteMouse.RIGHT_BUTTON)
         """
-        self.report[0] |= buttons
-        self._send_no_move()
+        self.report[self._buttons_offset] |= buttons
+        self._send_report()
 
     def release(self, buttons):
         """Release the given mouse buttons.
@@ -82,13 +139,16 @@ class AbsoluteMouse:
         :param buttons: a bitwise-or'd combination of ``LEFT_BUTTON``,
         ``MIDDLE_BUTTON``, and ``RIGHT_BUTTON``.
         """
-        self.report[0] &= ~buttons
-        self._send_no_move()
+        # A held back move must land before the buttons go up, or drags end early.
+        self.flush()
+        self.report[self._buttons_offset] &= ~buttons
+        self._send_report()
 
     def release_all(self):
         """Release all the mouse buttons."""
-        self.report[0] = 0
-        self._send_no_move()
+        self.flush()
+        self.report[self._buttons_offset] = 0
+        self._send_report()
 
     def click(self, buttons):
         """Press and release the given mouse buttons.
@@ -108,11 +168,13 @@ class AbsoluteMouse:
         self.press(buttons)
         self.release(buttons)
 
-    def move_to(self, x=0, y=0, wheel=0):
+    def move_to(self, x=None, y=None, wheel=0):
         """Move the mouse to absolute coordinates and turn the wheel as directed.
 
-        :param x: Set pointer on x axis. 32767 = 100% to the right
-        :param y: Set pointer on y axis. 32767 = 100% to the bottom
+        :param x: Set pointer on x axis. 32767 = 100% to the right. ``None`` keeps
+        the current position, so ``move_to(wheel=1)`` does not jump mid-gesture.
+        :param y: Set pointer on y axis. 32767 = 100% to the bottom. ``None`` keeps
+        the current position.
         :param wheel: Rotate the wheel this amount. Negative is toward the user, positive
         is away from the user. The scrolling effect depends on the host.
 
@@ -126,38 +188,221 @@ class AbsoluteMouse:
         # Roll the mouse wheel away from the user.
         m.move_to(wheel=1)
         """
+        # Coordinates, written in place as little endian
+        report = self.report
+        if x is not None:
+            x = limit_coord(x)
+            report[self._x_offset] = x & 0xFF
+            report[self._x_offset + 1] = x >> 8
+        if y is not None:
+            y = limit_coord(y)
+            report[self._y_offset] = y & 0xFF
+            report[self._y_offset + 1] = y >> 8
+        if wheel:
+            # The move rides along with the first wheel report.
+            self.scroll(wheel)
+        elif self.coalesce:
+            self._pending = True
+        else:
+            self._send_report()
+
+    def scroll(self, wheel, pan=0):
+        """Turn the wheel by ``wheel`` counts and pan by ``pan``, where the pointer is.
+
+        Each report carries as much as the wheel field holds: 127 counts with an
+        8 bit wheel, 32767 with a 16 bit one, so a large turn takes one report
+        instead of one per 127 counts. ``pan`` is ignored without a ``pan`` field.
+
+        The wheel and pan are relative, so they are cleared after the last
+        report; the next report only moves or clicks.
+
+        :return: the number of reports sent.
+        """
+        report = self.report
+        if self._pack_pan is None:
+            pan = 0
+        sent = 0
+        try:
+            while wheel or pan:
+                partial_wheel = self._limit(wheel)
+                self._pack_wheel(report, partial_wheel)
+                wheel -= partial_wheel
+                if self._pack_pan is not None:
+                    partial_pan = self._limit_pan(pan)
+                    self._pack_pan(report, partial_pan)
+                    pan -= partial_pan
+                self._send_report(force=True)
+                sent += 1
+        finally:
+            self._clear_relative()
+        return sent
+
+    def _clear_relative(self):
+        """Zero the wheel and pan of the current and last reports, so nothing scrolls again."""
+        self._pack_wheel(self.report, 0)
+        self._pack_wheel(self._last_report, 0)
+        if self._pack_pan is not None:
+            self._pack_pan(self.report, 0)
+            self._pack_pan(self._last_report, 0)
+
+    def wheel_resolution(self):
+        """Wheel counts per detent: the resolution multiplier once the host set it, else 1.
+
+        Hosts that understand the multiplier of ``SCROLL_MOUSE`` write its feature
+        report when the device is configured. Others, and plain 8 bit wheels,
+        read every count as a whole detent.
+        """
+        field = self.layout.feature_fields.get("wheel_multiplier")
+        if field is None:
+            return 1
+        getter = getattr(self._hid_device, "get_last_received_report", None)
+        feature = getter(self.layout.report_id) if getter is not None else None
+        if not feature:
+            return 1
+        bit_offset, bits, low, high = field
+        if feature[bit_offset // 8] >> (bit_offset % 8) & ((1 << bits) - 1):
+            return high
+        return low
+
+    def flush(self):
+        """Send a move that ``coalesce`` mode is still holding back."""
+        if self._pending:
+            self._send_report()
+
+    def encode_frames(self, frames, buffer=None):
+        """Encode a sequence of reports into one contiguous buffer.
+
+        :param frames: an iterable of ``(buttons, x, y, wheel)`` tuples.
+        :param buffer: optional preallocated bytearray to fill. It must hold at
+        least ``report_length * len(frames)`` bytes. A new one is allocated if not given.
+        :return: the filled buffer, ready for ``send_frames()``.
+
+        Coordinates and wheel are clamped the same way ``move_to`` does it, so the
+        buffer can be replayed any number of times without further conversion.
+        """
+        step = self.report_length
+        if buffer is None:
+            buffer = bytearray(len(frames) * step)
+        offset = 0
+        for buttons, x, y, wheel in frames:
+            self._encode_frame(buffer, offset, buttons, x, y, wheel)
+            offset += step
+        return buffer
+
+    def _encode_frame(self, buffer, offset, buttons, x, y, wheel):
+        """Write one clamped report into ``buffer`` at ``offset``."""
+        x = limit_coord(x)
+        y = limit_coord(y)
+        buffer[offset + self._buttons_offset] = buttons & 0xFF
+        x_offset = offset + self._x_offset
+        buffer[x_offset] = x & 0xFF
+        buffer[x_offset + 1] = x >> 8
+        y_offset = offset + self._y_offset
+        buffer[y_offset] = y & 0xFF
+        buffer[y_offset + 1] = y >> 8
+        self._pack_wheel(buffer, self._limit(wheel), offset)
+
+    def send_frames(self, buffer, length=None):
+        """Send reports previously encoded with ``encode_frames()`` back to back.
+
+        :param buffer: a bytearray holding consecutive reports.
+        :param length: number of bytes of ``buffer`` to send, defaults to all of it.
+            Must be a whole number of reports.
+
+        The memoryview slices of a buffer are built on its first call and kept
+        for the next calls with the same buffer, so nothing is allocated between
+        two sends, nor when a buffer is replayed. While they are kept the buffer
+        cannot be resized. The last frame becomes the current report, so later
+        ``press()`` or ``move_to()`` calls continue from there, without its
+        wheel: it was relative and has been sent.
+        """
+        if length is None:
+            length = len(buffer)
+        step = self.report_length
+        if length % step or length > len(buffer):
+            raise ValueError("length must be a whole number of reports in the buffer")
+        count = length // step
+        frames = self._frames
+        if buffer is not self._frames_buffer:
+            view = memoryview(buffer)
+            frames = [view[start:start + step] for start in range(0, len(buffer) - step + 1, step)]
+            self._frames = frames
+            self._frames_buffer = buffer
+        send_report = self._mouse_device.send_report
+        for index in range(count):
+            send_report(frames[index])
+        self.reports_sent += count
+        if count:
+            last = frames[count - 1]
+            self.report[:] = last
+            self._last_report[:] = last
+            self._clear_relative()
+            self._pending = False
+
+    def move_path(self, points, buttons=0):
+        """Move the mouse through a list of absolute coordinates in one burst.
+
+        :param points: a sequence of ``(x, y)`` tuples, 0 to 32767 on both axes.
+        :param buttons: buttons held down along the whole path, for drags.
+
+        The reports are encoded into a buffer kept for the next paths, so only a
+        path longer than all the previous ones allocates.
+
+        Examples::
+
+        # Drag from the top left corner to the center of the screen.
+        m.move_path([(0, 0), (8192, 8192), (16383, 16383)], AbsoluteMouse.LEFT_BUTTON)
+        """
+        step = self.report_length
+        length = len(points) * step
+        buffer = self._path_buffer
+        if len(buffer) < length:
+            # The slices of the old buffer would keep it alive.
+            if buffer is self._frames_buffer:
+                self._frames_buffer = None
+                self._frames = ()
+            buffer = self._path_buffer = bytearray(length)
+        offset = 0
+        for x, y in points:
+            self._encode_frame(buffer, offset, buttons, x, y, 0)
+            offset += step
+        self.send_frames(buffer, length)
+
+    def _send_report(self, force=False):
+        """Send the report, unless the host already has the same state.
+
+        Reports that turn the wheel pass ``force``, since the wheel is relative.
+        """
+        report = self.report
+        if not force and report == self._last_report:
+            self.reports_suppressed += 1
+            return
+        self._mouse_device.send_report(report)
+        # Byte by byte: a slice assignment would allocate a slice object.
+        # Every layout has at least buttons, x, y and wheel: 6 bytes.
+        last = self._last_report
+        last[0] = report[0]
+        last[1] = report[1]
+        last[2] = report[2]
+        last[3] = report[3]
+        last[4] = report[4]
+        last[5] = report[5]
+        if self.report_length > 6:
+            for index in range(6, self.report_length):
+                last[index] = report[index]
+        self.reports_sent += 1
+        self._pending = False
+
+    def _limit(self, dist):
+        if dist > self._max_wheel:
+            return self._max_wheel
+        if dist < -self._max_wheel:
+            return -self._max_wheel
+        return dist
 
-        # Wheel
-        while wheel != 0:
-            partial_wheel = self._limit(wheel)
-            self.report[5] = partial_wheel & 0xFF
-            self._mouse_device.send_report(self.report)
-            wheel -= partial_wheel
-
-        # Coordinates
-        x = self._limit_coord(x)
-        y = self._limit_coord(y)
-        # HID reports use little endian
-        x1, x2 = (x & 0xFFFFFFFF).to_bytes(2, 'little')
-        y1, y2 = (y & 0xFFFFFFFF).to_bytes(2, 'little')
-        self.report[1] = x1
-        self.report[2] = x2
-        self.report[3] = y1
-        self.report[4] = y2
-        self._mouse_device.send_report(self.report)
-
-    def _send_no_move(self):
-        """Send a button-only report."""
-        self.report[1] = 0
-        self.report[2] = 0
-        self.report[3] = 0
-        self.report[4] = 0
-        self._mouse_device.send_report(self.report)
-
-    @staticmethod
-    def _limit(dist):
-        return min(127, max(-127, dist))
-
-    @staticmethod
-    def _limit_coord(coord):
-        return min(32767, max(0, coord)) 
\ No newline at end of file
+    def _limit_pan(self, dist):
+        if dist > self._max_pan:
+            return self._max_pan
+        if dist < -self._max_pan:
+            return -self._max_pan
+        return dist
@@ -21,14 +21,14 @@ Implementation Notes
   https://circuitpython.org/downloads
 """
 
-import time
 import struct
 from adafruit_hid import find_device
+from hid_descriptor import mouse_descriptor
+from hid_util import limit_coord
 
 __version__ = "0.0.0+auto.0"
 __repo__ = "https://github.com/Neradoc/CircuitPython_absolute_mouse.git"
 
-
 class Mouse:
     """Send USB HID mouse reports."""
 
@@ -39,22 +39,36 @@ class Mouse:
     MIDDLE_BUTTON = 4
     """Middle mouse button."""
 
-    def __init__(self, devices):
+    def __init__(self, devices, layout=None):
         """Create a Mouse object that will send USB mouse HID reports.
 
         Devices can be a list of devices that includes a keyboard device or a keyboard device
         itself. A device is any object that implements ``send_report()``, ``usage_page`` and
         ``usage``.
+
+        ``layout`` is the ``hid_descriptor.Layout`` of the report that ``boot.py``
+        declared, ``hid_descriptor.mouse_descriptor()`` by default, so the longer
+        reports of ``HID_HIGH_RES_SCROLL`` and ``HID_CHORD_MOUSE`` work too. Fields
+        other than the buttons, x, y and wheel stay zero.
         """
         self._mouse_device = find_device(devices, usage_page=0x1, usage=0x02)
-        # Reuse this bytearray to send mouse reports.
+        if layout is None:
+            layout = mouse_descriptor().layout()
+        self.layout = layout
+        # Field positions, looked up once so sending needs no layout math.
+        self._buttons_offset = layout.offset("buttons")
+        self._x_offset = layout.offset("x")
+        self._y_offset = layout.offset("y")
+        self._pack_wheel = layout.packer("wheel")
+        self._max_wheel = layout.fields["wheel"][3]
+        # Reuse this bytearray to send mouse reports. With the default layout:
         # report[0] buttons pressed (LEFT, MIDDLE, RIGHT)
         # report[1] x1 movement
         # report[2] x2 movement
         # report[3] y1 movement
         # report[4] y2 movement
         # report[5] wheel movement
-        self.report = bytearray(6)
+        self.report = layout.new_report()
 
     def press(self, buttons):
         """Press the given mouse buttons.
@@ -70,7 +84,7 @@ class Mouse:
             # Press the left and right buttons simultaneously.
             m.press(Mouse.LEFT_BUTTON | Mouse.RIGHT_BUTTON)
         """
-        self.report[0] |= buttons
+        self.report[self._buttons_offset] |= buttons
         self._mouse_device.send_report(self.report)
 
     def release(self, buttons):
@@ -79,12 +93,12 @@ class Mouse:
         :param buttons: a bitwise-or'd combination of ``LEFT_BUTTON``,
             ``MIDDLE_BUTTON``, and ``RIGHT_BUTTON``.
         """
-        self.report[0] &= ~buttons
+        self.report[self._buttons_offset] &= ~buttons
         self._mouse_device.send_report(self.report)
 
     def release_all(self):
         """Release all the mouse buttons."""
-        self.report[0] = 0
+        self.report[self._buttons_offset] = 0
         self._mouse_device.send_report(self.report)
 
     def click(self, buttons):
@@ -128,27 +142,27 @@ class Mouse:
             m.move(wheel=1)
         """
 
-        # Coordinates
+        # Coordinates, packed in place so that moving does not allocate
         if x is not None:
-            x = self._limit_coord(x)
-            self.report[1:3] = struct.pack("<H", x)
+            struct.pack_into("<H", self.report, self._x_offset, limit_coord(int(x)))
         if y is not None:
-            y = self._limit_coord(y)
-            self.report[3:5] = struct.pack("<H", y)
-        if (x, y) != (None, None):
+            struct.pack_into("<H", self.report, self._y_offset, limit_coord(int(y)))
+        if x is not None or y is not None:
             self._mouse_device.send_report(self.report)
 
         # Wheel
         while wheel != 0:
             partial_wheel = self._limit(wheel)
-            self.report[5] = partial_wheel & 0xFF
+            self._pack_wheel(self.report, partial_wheel)
             self._mouse_device.send_report(self.report)
             wheel -= partial_wheel
-
-    @staticmethod
-    def _limit(dist):
-        return min(127, max(-127, int(dist)))
-
-    @staticmethod
-    def _limit_coord(coord):
-        return min(32767, max(0, int(coord)))
+        # The wheel is relative: a later move must not scroll again.
+        self._pack_wheel(self.report, 0)
+
+    def _limit(self, dist):
+        dist = int(dist)
+        if dist > self._max_wheel:
+            return self._max_wheel
+        if dist < -self._max_wheel:
+            return -self._max_wheel
+        return dist
@@ -0,0 +1,82 @@
+"""
+`alloc_guard`
+====================================================
+
+Debug helper that fails a move as soon as it allocates heap memory.
+
+On CircuitPython any allocation shows up as ``gc.mem_alloc()`` growth until
+the next collection, so a hot path that allocates will eventually pay for a
+GC pause. ``guard_moves()`` wraps a driver's move method and raises
+``AllocationError`` when a call grows the heap.
+
+On a desktop Python, where ``gc.mem_alloc()`` does not exist, memory is
+measured with ``tracemalloc`` instead. Integers are heap objects there (the
+board stores small ones inline), so counter updates show up as a few dozen
+bytes of churn; ``DESKTOP_TOLERANCE`` absorbs them. Objects freed before the
+call returns are not seen there either, so the guard is only exact on the board.
+
+Examples::
+
+    mouse = AbsoluteMouse(usb_hid.devices)
+    guard_moves(mouse)
+    mouse.move_to(1000, 2000)  # raises AllocationError if move_to allocates
+"""
+
+import gc
+
+DESKTOP_TOLERANCE = 64
+"""Bytes of growth ignored per call when measuring with ``tracemalloc``."""
+
+try:
+    mem_alloc = gc.mem_alloc
+    _DEFAULT_TOLERANCE = 0
+except AttributeError:
+    _DEFAULT_TOLERANCE = DESKTOP_TOLERANCE
+    import tracemalloc
+
+    def mem_alloc():
+        """Bytes of heap in use, from ``tracemalloc`` on a desktop Python."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return tracemalloc.get_traced_memory()[0]
+
+
+class AllocationError(AssertionError):
+    """A guarded call allocated heap memory."""
+
+
+def _measurement_overhead():
+    # What measuring nothing costs: zero on the board, a few objects on a desktop.
+    overhead = 0
+    for _ in range(4):
+        before = mem_alloc()
+        overhead = max(overhead, mem_alloc() - before)
+    return overhead
+
+
+def guard_moves(mouse, method_name=None, tolerance=None):
+    """Replace the move method of ``mouse`` with an allocation-checking one.
+
+    :param mouse: any of the absolute mouse drivers.
+    :param method_name: method to guard, ``move_to`` or ``move`` by default,
+        whichever the driver has.
+    :param tolerance: bytes of growth allowed per call, 0 on the board and
+        ``DESKTOP_TOLERANCE`` on a desktop by default.
+    :return: the original method.
+    """
+    if method_name is None:
+        method_name = "move_to" if hasattr(mouse, "move_to") else "move"
+    move = getattr(mouse, method_name)
+    if tolerance is None:
+        tolerance = _DEFAULT_TOLERANCE
+    overhead = _measurement_overhead() + tolerance
+
+    def checked_move(x, y, wheel=0):
+        before = mem_alloc()
+        move(x, y, wheel)
+        grown = mem_alloc() - before - overhead
+        if grown > 0:
+            raise AllocationError("{} allocated {} bytes".format(method_name, grown))
+
+    setattr(mouse, method_name, checked_move)
+    return move
@@ -0,0 +1,458 @@
+"""
+`chords`
+====================================================
+
+Keyboard modifiers and mouse buttons planned as one report sequence.
+
+Ctrl-click with the stock libraries is a ``Keyboard.press()``, a move, a
+press, a release and a ``Keyboard.release()``: five reports on two devices,
+sent with no time between them. The keyboard and the mouse reports go out on
+different endpoints, and a host that polls both in the same frame may handle
+the click before the modifier. ``ChordPlanner`` compiles a chord once into
+the fewest reports, in an order that holds:
+
+* modifiers go down in a keyboard report before the mouse report that needs
+  them, and come up after the mouse report that releases the buttons;
+* a move rides along with the press, as the pointer is absolute;
+* wherever the next report is on the other device, at least ``settle_ns``
+  passes first, one host polling interval by default, so the host has taken
+  the earlier report before the later one is there.
+
+Ctrl-click is then four reports. With ``HID_CHORD_MOUSE`` in
+``settings.toml``, the mouse report of ``boot.py`` carries the modifier byte
+itself (``hid_descriptor.CHORD_MOUSE``): everything goes through one endpoint,
+in order, with no settle time, and a modifier change rides along with a move.
+A report never changes the modifiers and the buttons together, so the host
+cannot apply them in the wrong order. Only Linux takes modifiers from a mouse
+report, Windows and macOS ignore them: given a keyboard, the planner sends the
+modifiers through it unless told otherwise.
+
+Like ``gestures.GestureComposer``, the planner keeps only the ``cache_size``
+chords compiled or asked for most recently, so ctrl-clicking at ever new
+points does not fill the heap; the handle of an evicted chord is not valid
+any more.
+
+If a report fails to go out, ``play()`` lifts the buttons and the modifiers
+before the error reaches the caller, so nothing stays held.
+
+Examples::
+
+    chords = ChordPlanner(mouse, keyboard)
+    ctrl_click = chords.click(16383, 16383, Keycode.CONTROL)
+    shift_drag = chords.drag(1000, 1000, 20000, 12000, Keycode.SHIFT)
+    chords.play(ctrl_click)
+    chords.play(shift_drag)
+"""
+
+import time
+from array import array
+
+from hid_descriptor import mouse_descriptor
+from hid_util import HandleCache, follow, limit_coord, wait_until
+
+LEFT_BUTTON = 1
+"""Left mouse button."""
+RIGHT_BUTTON = 2
+"""Right mouse button."""
+MIDDLE_BUTTON = 4
+"""Middle mouse button."""
+
+MOUSE = 0
+"""Device of a step: the mouse."""
+KEYBOARD = 1
+"""Device of a step: the keyboard."""
+
+HOLD_NS = 50_000_000
+"""Default time buttons stay down in a click."""
+GAP_NS = 80_000_000
+"""Default time between the clicks of a double click."""
+SETTLE_NS = 8_000_000
+"""Default time between reports on different devices, one full-speed polling interval."""
+
+KEYBOARD_REPORT_LENGTH = 8
+_FIRST_MODIFIER = 0xE0
+_LAST_MODIFIER = 0xE7
+
+
+def modifier_mask(keycodes):
+    """Modifier byte of one keycode or a sequence of them, like ``Keycode.CONTROL``."""
+    if isinstance(keycodes, int):
+        keycodes = (keycodes,)
+    mask = 0
+    for keycode in keycodes:
+        if not _FIRST_MODIFIER <= keycode <= _LAST_MODIFIER:
+            raise ValueError("{:#x} is not a modifier key".format(keycode))
+        mask |= 1 << (keycode - _FIRST_MODIFIER)
+    return mask
+
+
+class Chord:
+    """A compiled chord: reports, the device of each and the wait after it.
+
+    :ivar devices: ``MOUSE`` or ``KEYBOARD`` per report.
+    :ivar waits: ``array('l')`` of nanoseconds to wait after each report.
+    :ivar count: number of reports.
+    :ivar mouse_reports: how many of them go to the mouse.
+    """
+
+    def __init__(self, devices, waits, views):
+        self.devices = devices
+        self.waits = waits
+        self.count = len(waits)
+        self.mouse_reports = self.count - sum(devices)
+        self._views = views
+        # The reports the drivers follow after a play, found once.
+        self._last_mouse = None
+        self._last_keyboard = None
+        for index in range(self.count - 1, -1, -1):
+            if devices[index] == MOUSE:
+                if self._last_mouse is None:
+                    self._last_mouse = views[index]
+            elif self._last_keyboard is None:
+                self._last_keyboard = views[index]
+
+    @property
+    def duration_ns(self):
+        """Time from the first report to the end of the last wait."""
+        return sum(self.waits)
+
+    def __len__(self):
+        return self.count
+
+
+class ChordPlanner:
+    """Compile modifier and mouse chords and replay them by handle.
+
+    :param mouse: the mouse driver, any of them. Its ``report`` (and
+        ``_last_report`` if it keeps one) follows the last mouse report of
+        each chord, so later calls continue from there.
+    :param keyboard: an ``adafruit_hid.keyboard.Keyboard``. Not needed when
+        the mouse report has a ``modifiers`` field. Its ``report`` follows the
+        last keyboard report; keys held with it are released by a chord.
+    :param hold_ns: default time the buttons stay down in a click.
+    :param gap_ns: default time between two clicks of a multi-click.
+    :param settle_ns: least time between two reports on different devices.
+    :param composite: send the modifiers in the mouse report. By default only
+        when it has a ``modifiers`` field and no keyboard is given, as Windows
+        and macOS ignore that field.
+    :param cache_size: number of compiled chords to keep.
+    """
+
+    def __init__(
+        self,
+        mouse,
+        keyboard=None,
+        *,
+        hold_ns=HOLD_NS,
+        gap_ns=GAP_NS,
+        settle_ns=SETTLE_NS,
+        composite=None,
+        cache_size=32,
+    ):
+        self.mouse = mouse
+        self.keyboard = keyboard
+        self.hold_ns = hold_ns
+        self.gap_ns = gap_ns
+        self.settle_ns = settle_ns
+        layout = getattr(mouse, "layout", None) or mouse_descriptor().layout()
+        self.report_length = layout.length
+        self._buttons_offset = layout.offset("buttons")
+        self._x_offset = layout.offset("x")
+        self._y_offset = layout.offset("y")
+        if composite is None:
+            composite = keyboard is None and "modifiers" in layout.fields
+        self.composite = composite
+        """Whether the modifiers travel in the mouse report."""
+        if composite:
+            self._modifiers_offset = layout.offset("modifiers")
+        elif keyboard is None:
+            raise ValueError("A keyboard is needed when the mouse report has no modifiers")
+        self.cache_size = cache_size
+        self._compiled = HandleCache(cache_size)
+        self.chords = self._compiled.items
+        """Compiled ``Chord`` objects by handle, the ``cache_size`` most recently used."""
+        # The send_report of each device, rebuilt only when a wrapper replaces one.
+        self._senders_mouse = None
+        self._senders_keyboard = None
+        self._send = ()
+        self._senders()
+
+    def compile(self, frames, key=None):
+        """Compile ``(modifiers, buttons, x, y, wait_ns)`` frames into a chord, return its handle.
+
+        ``modifiers`` is a modifier byte, see ``modifier_mask()``. The chord
+        starts with no modifiers and no buttons down.
+
+        :param key: cache key. A chord compiled with the same key before is
+            returned as is.
+        """
+        handle = self._compiled.lookup(key)
+        if handle is not None:
+            return handle
+        steps = self._merge(self._expand(frames))
+        if not self.composite:
+            for index in range(len(steps)):
+                last = index == len(steps) - 1
+                if (last and steps[index][0] == KEYBOARD) or (
+                    not last and steps[index + 1][0] != steps[index][0]
+                ):
+                    # The keyboard report at the end settles too, before the
+                    # next mouse call of the caller.
+                    steps[index][5] = max(steps[index][5], self.settle_ns)
+        return self._compiled.store(self._encode(steps), key)
+
+    def _expand(self, frames):
+        """Steps ``[device, modifiers, buttons, x, y, wait]``, one per changed report."""
+        composite = self.composite
+        modifiers_device = MOUSE if composite else KEYBOARD
+        steps = []
+        modifiers = 0
+        buttons = 0
+        x = y = -1
+        for frame_modifiers, frame_buttons, frame_x, frame_y, wait in frames:
+            frame_modifiers &= 0xFF
+            frame_buttons &= 0xFF
+            frame_x = limit_coord(frame_x)
+            frame_y = limit_coord(frame_y)
+            emitted = len(steps)
+            moved = frame_x != x or frame_y != y
+            x = frame_x
+            y = frame_y
+            held = modifiers | frame_modifiers
+            if held != modifiers:
+                # Modifiers go down before the buttons that need them. In one
+                # report with the mouse, the move rides along.
+                modifiers = held
+                steps.append([modifiers_device, modifiers, buttons, x, y, 0])
+                moved = moved and not composite
+            if moved or frame_buttons != buttons:
+                buttons = frame_buttons
+                steps.append([MOUSE, modifiers, buttons, x, y, 0])
+            if frame_modifiers != modifiers:
+                # ...and come up after the buttons released under them.
+                modifiers = frame_modifiers
+                steps.append([modifiers_device, modifiers, buttons, x, y, 0])
+            if len(steps) > emitted:
+                steps[-1][5] = wait
+            elif steps:
+                steps[-1][5] += wait
+        return steps
+
+    def _merge(self, steps):
+        """Drop a pure move with no wait after it when the next mouse report carries it.
+
+        Only a report that changes nothing but the position is dropped, and
+        not before a release: a press, a release or a modifier change always
+        goes out where it was planned.
+        """
+        composite = self.composite
+        merged = []
+        for step in steps:
+            if merged:
+                last = merged[-1]
+                if last[0] == MOUSE and step[0] == MOUSE and not last[5]:
+                    before = (MOUSE, 0, 0)
+                    for index in range(len(merged) - 2, -1, -1):
+                        if merged[index][0] == MOUSE:
+                            before = merged[index]
+                            break
+                    if (
+                        last[2] == before[2]
+                        and (not composite or last[1] == before[1])
+                        and step[2] & last[2] == last[2]
+                        and (not composite or step[1] & last[1] == last[1])
+                        and not (composite and step[1] != before[1] and step[2] != before[2])
+                    ):
+                        merged[-1] = step
+                        continue
+            merged.append(step)
+        return merged
+
+    def _encode(self, steps):
+        mouse_count = 0
+        for step in steps:
+            if step[0] == MOUSE:
+                mouse_count += 1
+        mouse_reports = memoryview(bytearray(mouse_count * self.report_length))
+        keyboard_reports = memoryview(
+            bytearray((len(steps) - mouse_count) * KEYBOARD_REPORT_LENGTH)
+        )
+        devices = bytearray(len(steps))
+        waits = array("l", [0] * len(steps))
+        views = []
+        mouse_offset = 0
+        keyboard_offset = 0
+        for index, (device, modifiers, buttons, x, y, wait) in enumerate(steps):
+            devices[index] = device
+            waits[index] = wait
+            if device == KEYBOARD:
+                view = keyboard_reports[keyboard_offset:keyboard_offset + KEYBOARD_REPORT_LENGTH]
+                keyboard_offset += KEYBOARD_REPORT_LENGTH
+                view[0] = modifiers
+            else:
+                view = mouse_reports[mouse_offset:mouse_offset + self.report_length]
+                mouse_offset += self.report_length
+                view[self._buttons_offset] = buttons
+                view[self._x_offset] = x & 0xFF
+                view[self._x_offset + 1] = x >> 8
+                view[self._y_offset] = y & 0xFF
+                view[self._y_offset + 1] = y >> 8
+                if self.composite:
+                    view[self._modifiers_offset] = modifiers
+            views.append(view)
+        return Chord(devices, waits, views)
+
+    def click(self, x, y, modifiers, buttons=LEFT_BUTTON, count=1, hold_ns=None, gap_ns=None):
+        """Click ``count`` times at ``(x, y)`` with ``modifiers`` held.
+
+        :param modifiers: a modifier keycode or a sequence of them, like
+            ``Keycode.CONTROL`` or ``(Keycode.CONTROL, Keycode.SHIFT)``.
+        """
+        hold_ns = self.hold_ns if hold_ns is None else hold_ns
+        gap_ns = self.gap_ns if gap_ns is None else gap_ns
+        mask = modifier_mask(modifiers)
+        key = ("click", x, y, mask, buttons, count, hold_ns, gap_ns)
+        handle = self._compiled.lookup(key)
+        if handle is not None:
+            return handle
+        frames = [(mask, 0, x, y, 0)]
+        for index in range(count):
+            frames.append((mask, buttons, x, y, hold_ns))
+            frames.append((mask, 0, x, y, gap_ns if index < count - 1 else 0))
+        frames.append((0, 0, x, y, 0))
+        return self.compile(frames, key)
+
+    def drag(
+        self, x0, y0, x1, y1, modifiers, buttons=LEFT_BUTTON, steps=8, step_ns=8_000_000, hold_ns=None
+    ):
+        """Drag from ``(x0, y0)`` to ``(x1, y1)`` in ``steps`` moves with ``modifiers`` held.
+
+        ``hold_ns`` is the wait after the press, before the first move. The
+        modifiers come up after the release.
+        """
+        hold_ns = self.hold_ns if hold_ns is None else hold_ns
+        mask = modifier_mask(modifiers)
+        key = ("drag", x0, y0, x1, y1, mask, buttons, steps, step_ns, hold_ns)
+        handle = self._compiled.lookup(key)
+        if handle is not None:
+            return handle
+        frames = [(mask, 0, x0, y0, 0), (mask, buttons, x0, y0, hold_ns)]
+        for step in range(1, steps + 1):
+            frames.append(
+                (mask, buttons, x0 + (x1 - x0) * step // steps, y0 + (y1 - y0) * step // steps, step_ns)
+            )
+        frames.append((mask, 0, x1, y1, 0))
+        frames.append((0, 0, x1, y1, 0))
+        return self.compile(frames, key)
+
+    def _senders(self):
+        """``send_report`` of the mouse and of the keyboard, indexed by device."""
+        # pylint: disable=protected-access
+        mouse_device = self.mouse._mouse_device
+        keyboard_device = None if self.composite else self.keyboard._keyboard_device
+        if mouse_device is not self._senders_mouse or keyboard_device is not self._senders_keyboard:
+            self._senders_mouse = mouse_device
+            self._senders_keyboard = keyboard_device
+            if keyboard_device is None:
+                self._send = (mouse_device.send_report,)
+            else:
+                self._send = (mouse_device.send_report, keyboard_device.send_report)
+        return self._send
+
+    def play(self, handle):
+        """Send the reports of chord ``handle`` with their waits, blocking.
+
+        Returns after the wait of the last report too, so a mouse call right
+        after it cannot overtake the last keyboard report.
+        """
+        chord = self.chords[handle]
+        senders = self._senders()
+        devices = chord.devices
+        waits = chord.waits
+        views = chord._views  # pylint: disable=protected-access
+        deadline = time.monotonic_ns()
+        wait = 0
+        index = 0
+        try:
+            while index < chord.count:
+                # After a report with no wait, the next one is due already.
+                if wait:
+                    wait_until(deadline)
+                senders[devices[index]](views[index])
+                wait = waits[index]
+                deadline += wait
+                index += 1
+        finally:
+            if index < chord.count:
+                self._release(chord, index)
+        if wait:
+            wait_until(deadline)
+        self._follow(chord)
+
+    async def play_async(self, handle):
+        """Like ``play()``, but waits with ``asyncio`` so other tasks keep running."""
+        from mouse_scheduler import sleep_until  # pylint: disable=import-outside-toplevel
+
+        chord = self.chords[handle]
+        senders = self._senders()
+        devices = chord.devices
+        waits = chord.waits
+        views = chord._views  # pylint: disable=protected-access
+        deadline = time.monotonic_ns()
+        wait = 0
+        index = 0
+        try:
+            while index < chord.count:
+                if wait and time.monotonic_ns() < deadline:
+                    await sleep_until(deadline)
+                senders[devices[index]](views[index])
+                wait = waits[index]
+                deadline += wait
+                index += 1
+        finally:
+            if index < chord.count:
+                self._release(chord, index)
+        if wait and time.monotonic_ns() < deadline:
+            await sleep_until(deadline)
+        self._follow(chord)
+
+    def _release(self, chord, failed):
+        """Lift the buttons and the modifiers after report ``failed`` of ``chord`` did not go out.
+
+        The pointer stays where the last mouse report before it put it. A
+        release that fails too is not raised, the first error is.
+        """
+        views = chord._views  # pylint: disable=protected-access
+        mouse = self.mouse
+        current = mouse.report
+        for index in range(failed - 1, -1, -1):
+            if chord.devices[index] == MOUSE:
+                view = views[index]
+                for offset in range(self.report_length):
+                    current[offset] = view[offset]
+                break
+        current[self._buttons_offset] = 0
+        if self.composite:
+            current[self._modifiers_offset] = 0
+        senders = self._senders()
+        try:
+            senders[MOUSE](current)
+        except OSError:
+            pass
+        follow(mouse, current, self.report_length)
+        if not self.composite:
+            report = self.keyboard.report
+            for offset in range(KEYBOARD_REPORT_LENGTH):
+                report[offset] = 0
+            try:
+                senders[KEYBOARD](report)
+            except OSError:
+                pass
+
+    def _follow(self, chord):
+        """Make the drivers' current reports match the last ones sent."""
+        # pylint: disable=protected-access
+        if chord._last_mouse is not None:
+            follow(self.mouse, chord._last_mouse, self.report_length, chord.mouse_reports)
+        if chord._last_keyboard is not None:
+            self.keyboard.report[:KEYBOARD_REPORT_LENGTH] = chord._last_keyboard
@@ -0,0 +1,280 @@
+"""
+`command_protocol`
+====================================================
+
+Binary command protocol to drive the mouse from a host over ``usb_cdc.data``.
+
+Every command is a fixed-size frame of ``FRAME_SIZE`` bytes::
+
+    0  SYNC (0xA5)
+    1  sequence number, 0-255, wraps around
+    2  opcode (MOVE, PRESS, RELEASE, CLICK, WHEEL, KEY, STATS)
+    3  argument: buttons, signed wheel, or keycode
+    4  x, low byte        \\ absolute coordinates for MOVE, CLICK and WHEEL,
+    5  x, high byte        | modifier keycode in x for KEY
+    6  y, low byte         |
+    7  y, high byte       /
+    8  CRC-8 (polynomial 0x07) of bytes 0 to 7
+
+When acknowledgements are on, the device answers every frame with ``ACK_SIZE``
+bytes: ``ACK_SYNC``, the sequence number, a status code and a CRC-8 of the
+first three bytes. A ``STATS`` frame is answered with its acknowledgement
+followed by ``hid_stats.SNAPSHOT_SIZE`` bytes of report statistics.
+
+The receiver reads with ``readinto`` into a preallocated buffer and calls the
+mouse methods directly, so steady-state dispatch does not allocate. A frame
+with a bad CRC is answered with ``STATUS_BAD_CRC`` only when it starts where
+the previous frame ended; while looking for the next frame after an error,
+a stray SYNC value is counted and skipped, never answered, so the garbage
+byte after it cannot fail an unrelated command on the host. A command whose
+driver call raises, an ``OSError`` while the host suspends USB or a
+``ValueError`` for a bad keycode, is answered with ``STATUS_FAILED`` and never
+run again. It only
+needs an object with ``readinto`` (and optionally ``in_waiting`` and
+``write``), so it runs unchanged on a desktop Python against a pty or an
+``io.BytesIO``.
+"""
+
+import time
+
+SYNC = 0xA5
+ACK_SYNC = 0x5A
+FRAME_SIZE = 9
+ACK_SIZE = 4
+
+MOVE = 1
+PRESS = 2
+RELEASE = 3
+CLICK = 4
+WHEEL = 5
+KEY = 6
+STATS = 7
+
+STATUS_OK = 0
+STATUS_BAD_CRC = 1
+STATUS_BAD_OPCODE = 2
+STATUS_FAILED = 3
+
+
+def _crc8_table():
+    table = bytearray(256)
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[byte] = crc
+    return bytes(table)
+
+
+CRC8_TABLE = _crc8_table()
+
+
+def crc8(data, start=0, end=None):
+    """CRC-8 (polynomial 0x07, initial value 0) of ``data[start:end]``."""
+    if end is None:
+        end = len(data)
+    table = CRC8_TABLE
+    crc = 0
+    for index in range(start, end):
+        crc = table[crc ^ data[index]]
+    return crc
+
+
+def encode_frame(opcode, sequence, arg=0, x=0, y=0, buffer=None, offset=0):
+    """Write one command frame, returns the buffer.
+
+    :param buffer: optional bytearray to write into at ``offset``. A new
+        ``FRAME_SIZE`` bytearray is allocated if not given.
+    """
+    if buffer is None:
+        buffer = bytearray(FRAME_SIZE)
+    buffer[offset] = SYNC
+    buffer[offset + 1] = sequence & 0xFF
+    buffer[offset + 2] = opcode
+    buffer[offset + 3] = arg & 0xFF
+    buffer[offset + 4] = x & 0xFF
+    buffer[offset + 5] = (x >> 8) & 0xFF
+    buffer[offset + 6] = y & 0xFF
+    buffer[offset + 7] = (y >> 8) & 0xFF
+    buffer[offset + 8] = crc8(buffer, offset, offset + 8)
+    return buffer
+
+
+class CommandReceiver:
+    """Read command frames from a serial port and dispatch them to a mouse.
+
+    :param serial: the data port, usually ``usb_cdc.data``.
+    :param mouse: driver with ``move_to(x, y, wheel)``, ``press``, ``release``
+        and ``click``.
+    :param keyboard: optional ``adafruit_hid.keyboard.Keyboard`` for ``KEY``.
+    :param stats: optional ``hid_stats.ReportStats`` sent back for ``STATS``.
+    :param buffer_frames: how many frames one ``readinto`` can fetch.
+    :param ack: answer every frame with a status frame.
+    """
+
+    def __init__(self, serial, mouse, keyboard=None, *, stats=None, buffer_frames=32, ack=True):
+        self.serial = serial
+        self.mouse = mouse
+        self.keyboard = keyboard
+        self.stats = stats
+        self.ack = ack
+        self._buffer = bytearray(FRAME_SIZE * buffer_frames)
+        view = memoryview(self._buffer)
+        # Less than a frame is left over after every poll, so a read always
+        # starts at one of these, and no slice is made per read.
+        self._tails = [view[offset:] for offset in range(FRAME_SIZE)]
+        self._fill = 0
+        self._in_sync = True
+        self._ack_buffer = bytearray(ACK_SIZE)
+        self._ack_buffer[0] = ACK_SYNC
+        self._has_in_waiting = hasattr(serial, "in_waiting")
+        if hasattr(serial, "timeout"):
+            # Return what has arrived instead of waiting for a full buffer.
+            serial.timeout = 0
+        self._expected_sequence = None
+        self.received = 0
+        """Frames with a valid CRC."""
+        self.crc_errors = 0
+        """Frames dropped because of a bad CRC."""
+        self.unknown = 0
+        """Frames with an unknown opcode."""
+        self.failed = 0
+        """Frames whose driver call raised an exception."""
+        self.sequence_gaps = 0
+        """Frames missing according to the sequence numbers."""
+        self.skipped_bytes = 0
+        """Bytes thrown away while looking for a SYNC byte."""
+
+    def poll(self):
+        """Read what is available and dispatch every complete frame.
+
+        :return: the number of frames dispatched.
+        """
+        if self._has_in_waiting and not self.serial.in_waiting:
+            return 0
+        count = self.serial.readinto(self._tails[self._fill])
+        if count:
+            self._fill += count
+        return self._process()
+
+    def _process(self):
+        buffer = self._buffer
+        fill = self._fill
+        start = 0
+        dispatched = 0
+        try:
+            while fill - start >= FRAME_SIZE:
+                if buffer[start] != SYNC:
+                    start += 1
+                    self.skipped_bytes += 1
+                    self._in_sync = False
+                    continue
+                if crc8(buffer, start, start + 8) != buffer[start + 8]:
+                    self.crc_errors += 1
+                    if self._in_sync:
+                        # A frame where one was due: its sequence number is the
+                        # host's best guess, so tell it.
+                        self._acknowledge(buffer[start + 1], STATUS_BAD_CRC)
+                        self._in_sync = False
+                    # Otherwise likely a SYNC value inside a frame we joined halfway.
+                    start += 1
+                    continue
+                self._in_sync = True
+                # Consumed before it runs, so a failed command is never run twice.
+                frame = start
+                start += FRAME_SIZE
+                dispatched += 1
+                try:
+                    self._dispatch(frame)
+                except Exception:  # pylint: disable=broad-except
+                    self.failed += 1
+                    self._acknowledge(buffer[frame + 1], STATUS_FAILED)
+        finally:
+            # Keep the partial frame for the next read.
+            remaining = fill - start
+            for index in range(remaining):
+                buffer[index] = buffer[start + index]
+            self._fill = remaining
+        return dispatched
+
+    def _dispatch(self, start):
+        buffer = self._buffer
+        sequence = buffer[start + 1]
+        opcode = buffer[start + 2]
+        arg = buffer[start + 3]
+        x = buffer[start + 4] | (buffer[start + 5] << 8)
+        y = buffer[start + 6] | (buffer[start + 7] << 8)
+        self.received += 1
+        if self._expected_sequence is not None and sequence != self._expected_sequence:
+            self.sequence_gaps += (sequence - self._expected_sequence) & 0xFF
+        self._expected_sequence = (sequence + 1) & 0xFF
+
+        mouse = self.mouse
+        if opcode == MOVE:
+            mouse.move_to(x, y)
+        elif opcode == PRESS:
+            mouse.press(arg)
+        elif opcode == RELEASE:
+            mouse.release(arg)
+        elif opcode == CLICK:
+            mouse.move_to(x, y)
+            mouse.click(arg)
+        elif opcode == WHEEL:
+            mouse.move_to(x, y, arg - 256 if arg > 127 else arg)
+        elif opcode == KEY and self.keyboard is not None:
+            try:
+                if x & 0xFF:
+                    self.keyboard.press(x & 0xFF, arg)
+                else:
+                    self.keyboard.press(arg)
+            finally:
+                self.keyboard.release_all()
+        elif opcode == STATS and self.stats is not None:
+            self._acknowledge(sequence, STATUS_OK)
+            self.serial.write(self.stats.snapshot())
+            return
+        else:
+            self.unknown += 1
+            self._acknowledge(sequence, STATUS_BAD_OPCODE)
+            return
+        self._acknowledge(sequence, STATUS_OK)
+
+    def _acknowledge(self, sequence, status):
+        if not self.ack:
+            return
+        ack = self._ack_buffer
+        ack[1] = sequence
+        ack[2] = status
+        ack[3] = crc8(ack, 0, 3)
+        self.serial.write(ack)
+
+    def run(self):
+        """Poll forever."""
+        while True:
+            self.poll()
+
+    async def run_async(self, collector=None, quiet_ns=100_000_000):
+        """Poll forever, yielding to other ``asyncio`` tasks between reads.
+
+        :param collector: optional ``gc_scheduler.GCScheduler``. Commands run
+            inside its ``burst()``, and it may collect once the host has been
+            quiet for ``quiet_ns``.
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        if collector is None:
+            while True:
+                self.poll()
+                await asyncio.sleep(0)
+        last_active = time.monotonic_ns()
+        while True:
+            with collector.burst():
+                handled = self.poll()
+            now = time.monotonic_ns()
+            if handled:
+                last_active = now
+            elif now - last_active >= quiet_ns:
+                # A host that paused this long is likely to pause a bit longer.
+                if collector.idle(quiet_ns):
+                    last_active = time.monotonic_ns()
+            await asyncio.sleep(0)
@@ -0,0 +1,236 @@
+"""
+`desktop`
+====================================================
+
+Pixel coordinates on several monitors to absolute mouse coordinates.
+
+The 0-32767 range of the absolute mouse covers the whole virtual desktop, the
+bounding box of every monitor. A ``Monitor`` is placed on the desktop by its
+offset and size, in physical pixels as displayed, like the host's display
+settings show them: a 1920x1080 panel turned to portrait is 1080 wide. It can
+have a DPI scale and a rotation. Pixel positions are given in the monitor's own
+logical pixels, so with a 150% scale a 3840 pixel wide panel is 2560 logical
+pixels wide, and as displayed, like a screenshot shows them, unless the
+monitor has a rotation: then they are in the panel's unrotated orientation.
+
+Every monitor is compiled once into one integer affine transform per axis, in
+Q14 fixed point so every product stays a small int on the board. A conversion
+is then a clamp, a multiply, an add and a shift: no floats, no allocation.
+
+Monitors can be read from ``settings.toml``::
+
+    MONITORS = "main,side"
+    # x, y, width, height as displayed, scale percent, clockwise rotation
+    MONITOR_main = "0,0,2560,1440"
+    MONITOR_side = "2560,-240,1080,1920"
+
+Examples::
+
+    desktop = Desktop.from_settings()
+    desktop.move_to_pixel(mouse, "side", 500, 800)
+"""
+
+import os
+
+from hid_util import MAX_COORD
+
+_SHIFT = 14
+_ROUND = 1 << (_SHIFT - 1)
+
+
+class Monitor:
+    """One monitor of the virtual desktop.
+
+    :param name: name used to look the monitor up.
+    :param x: left edge on the desktop, in physical pixels. May be negative.
+    :param y: top edge on the desktop, in physical pixels. May be negative.
+    :param width: physical width on the desktop, as displayed.
+    :param height: physical height on the desktop, as displayed.
+    :param scale: DPI scale in percent, 100 for none.
+    :param rotation: 0 for pixel positions as displayed. 90, 180 or 270 for
+        positions in the orientation of the panel before it was turned that
+        many degrees clockwise, like a capture of its own framebuffer; for 90
+        and 270 their ``x`` then runs along ``height``.
+    """
+
+    def __init__(self, name, x, y, width, height, scale=100, rotation=0):
+        if width <= 0 or height <= 0 or scale <= 0:
+            raise ValueError("Monitor size and scale must be positive")
+        if rotation not in (0, 90, 180, 270):
+            raise ValueError("Rotation must be 0, 90, 180 or 270")
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.rotation = rotation
+        turned = rotation in (90, 270)
+        self.logical_width = (height if turned else width) * 100 // scale
+        """Range of the ``x`` of a position, in logical pixels."""
+        self.logical_height = (width if turned else height) * 100 // scale
+        """Range of the ``y`` of a position, in logical pixels."""
+
+    @property
+    def desktop_width(self):
+        """Physical pixels the monitor covers horizontally on the desktop."""
+        return self.width
+
+    @property
+    def desktop_height(self):
+        """Physical pixels the monitor covers vertically on the desktop."""
+        return self.height
+
+    def compile(self, left, top, width, height):
+        """Build the transforms for a desktop whose bounding box is given.
+
+        Called by ``Desktop``; until then ``map()`` raises ``AttributeError``.
+        """
+        rotation = self.rotation
+        # Physical position on the monitor, as displayed, of the logical
+        # position (u, v) is (first, second). Each displayed axis depends on
+        # one logical axis only: ``swap`` tells whether x comes from v.
+        swap = rotation in (90, 270)
+        flip_x = rotation in (90, 180)
+        flip_y = rotation in (180, 270)
+        origin_x = self.x - left + (self.desktop_width - 1 if flip_x else 0)
+        origin_y = self.y - top + (self.desktop_height - 1 if flip_y else 0)
+        self._k_x, self._c_x = _axis(origin_x, -self.scale if flip_x else self.scale, width)
+        self._k_y, self._c_y = _axis(origin_y, -self.scale if flip_y else self.scale, height)
+        self._swap = swap
+        # Largest logical value feeding each displayed axis.
+        self._limit_x = (self.logical_height if swap else self.logical_width) - 1
+        self._limit_y = (self.logical_width if swap else self.logical_height) - 1
+
+    def map_x(self, pixel_x, pixel_y):
+        """Absolute x coordinate of a logical pixel position, clamped to the monitor."""
+        value = pixel_y if self._swap else pixel_x
+        limit = self._limit_x
+        if value < 0:
+            value = 0
+        elif value > limit:
+            value = limit
+        return _clamp((self._k_x * value + self._c_x) >> _SHIFT)
+
+    def map_y(self, pixel_x, pixel_y):
+        """Absolute y coordinate of a logical pixel position, clamped to the monitor."""
+        value = pixel_x if self._swap else pixel_y
+        limit = self._limit_y
+        if value < 0:
+            value = 0
+        elif value > limit:
+            value = limit
+        return _clamp((self._k_y * value + self._c_y) >> _SHIFT)
+
+    def map(self, pixel_x, pixel_y):
+        """Convert one position, returns an ``(x, y)`` tuple."""
+        return self.map_x(pixel_x, pixel_y), self.map_y(pixel_x, pixel_y)
+
+    def __repr__(self):
+        return "Monitor({!r}, {}, {}, {}, {}, {}, {})".format(
+            self.name, self.x, self.y, self.width, self.height, self.scale, self.rotation
+        )
+
+
+def _axis(origin, scale, size):
+    """Q14 factor and offset of ``(origin + value * scale / 100) * 32767 / size``.
+
+    Rounded, and with the rounding of the final shift folded into the offset.
+    Both stay below 2**30 for any desktop up to 32767 pixels wide.
+    """
+    numerator = scale * MAX_COORD << _SHIFT
+    denominator = 100 * size
+    half = denominator if numerator >= 0 else -denominator
+    factor = (2 * numerator + half) // (2 * denominator)
+    offset = ((origin * MAX_COORD << _SHIFT) + size // 2) // size
+    return factor, offset + _ROUND
+
+
+def _clamp(value):
+    if value < 0:
+        return 0
+    if value > MAX_COORD:
+        return MAX_COORD
+    return value
+
+
+class Desktop:
+    """The virtual desktop made of ``monitors``, compiled once.
+
+    :param monitors: a sequence of ``Monitor``, the first one is the default.
+
+    The bounding box is computed from the monitors, so the host must not have
+    any other display attached.
+    """
+
+    def __init__(self, monitors):
+        if not monitors:
+            raise ValueError("A desktop needs at least one monitor")
+        self.monitors = tuple(monitors)
+        self.left = min(monitor.x for monitor in monitors)
+        self.top = min(monitor.y for monitor in monitors)
+        self.width = max(monitor.x + monitor.desktop_width for monitor in monitors) - self.left
+        self.height = max(monitor.y + monitor.desktop_height for monitor in monitors) - self.top
+        self._by_name = {}
+        for monitor in self.monitors:
+            monitor.compile(self.left, self.top, self.width, self.height)
+            self._by_name[monitor.name] = monitor
+
+    @classmethod
+    def from_settings(cls, getenv=os.getenv):
+        """Read the monitors named by ``MONITORS`` from ``settings.toml``.
+
+        Each ``MONITOR_<name>`` holds ``x,y,width,height`` and optionally the scale
+        in percent and the rotation. Raises ``ValueError`` if one is missing.
+        """
+        names = getenv("MONITORS")
+        if not names:
+            raise ValueError("MONITORS is not set")
+        monitors = []
+        for name in names.split(","):
+            name = name.strip()
+            spec = getenv("MONITOR_" + name)
+            if not spec:
+                raise ValueError("MONITOR_{} is not set".format(name))
+            values = [int(value) for value in spec.split(",")]
+            if not 4 <= len(values) <= 6:
+                raise ValueError("MONITOR_{} needs 4 to 6 values".format(name))
+            monitors.append(Monitor(name, *values))
+        return cls(monitors)
+
+    def __getitem__(self, monitor):
+        """The ``Monitor`` called ``monitor``, or at index ``monitor`` if an int."""
+        if isinstance(monitor, int):
+            return self.monitors[monitor]
+        return self._by_name[monitor]
+
+    def map(self, monitor, pixel_x, pixel_y):
+        """Absolute ``(x, y)`` of a pixel position on a monitor, by name or index."""
+        return self[monitor].map(pixel_x, pixel_y)
+
+    def map_many(self, monitor, points, out=None):
+        """Convert a list of ``(pixel_x, pixel_y)`` points of one monitor in one call.
+
+        :param out: optional ``array('H')`` of at least ``2 * len(points)`` items
+            to fill. A new one is allocated if not given.
+        :return: the array, holding ``x0, y0, x1, y1, ...``, ready for
+            ``motion.MotionEngine.play()``.
+        """
+        if out is None:
+            from array import array  # pylint: disable=import-outside-toplevel
+
+            out = array("H", bytes(4 * len(points)))
+        monitor = self[monitor]
+        map_x = monitor.map_x
+        map_y = monitor.map_y
+        index = 0
+        for pixel_x, pixel_y in points:
+            out[index] = map_x(pixel_x, pixel_y)
+            out[index + 1] = map_y(pixel_x, pixel_y)
+            index += 2
+        return out
+
+    def move_to_pixel(self, mouse, monitor, pixel_x, pixel_y):
+        """Move ``mouse`` (any driver with ``move_to(x, y)``) to a pixel of a monitor."""
+        monitor = self[monitor]
+        mouse.move_to(monitor.map_x(pixel_x, pixel_y), monitor.map_y(pixel_x, pixel_y))
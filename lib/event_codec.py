@@ -0,0 +1,369 @@
+"""
+`event_codec`
+====================================================
+
+Compact storage for timestamped absolute mouse reports.
+
+Each event starts with a flags byte, followed only by the fields it needs:
+
+* ``FLAG_KEYFRAME``: absolute state, as varint time (microseconds), buttons,
+  x and y (16 bit little endian) and wheel. Written every ``keyframe_interval``
+  events so playback can start from any keyframe.
+* otherwise: varint time delta, then zig-zag varint x and y deltas
+  (``FLAG_X``, ``FLAG_Y``), the new buttons byte (``FLAG_BUTTONS``) and the
+  wheel (``FLAG_WHEEL``) when they are present.
+* ``FLAG_RUN``: varint count of repeats of the previous event, same delay and
+  same state, for pauses and held buttons.
+
+``EventEncoder.close()`` ends the events with a ``FLAG_INDEX`` byte, then
+writes the keyframe index: one ``(event_index, byte_offset)`` pair of 32 bit
+little endian values per keyframe, and a ``FOOTER_SIZE`` byte footer,
+``INDEX_MAGIC``, the number of keyframes and the offset of the index. A
+decoder opening a stored stream finds the keyframes from its last bytes, see
+``EventDecoder.seek_event()``; a stream without the footer is decoded from the
+start instead.
+
+``EventDecoder`` reads the stream in fixed-size chunks and writes each event
+straight into a reusable report of the mouse layout, so its memory use does
+not depend on the length of the recording. The wheel is stored as one signed
+byte; a 16 bit wheel is sign extended when decoding. Decoding costs about
+twice as much per event as reading raw ``macro`` records, the price of a
+stream several times smaller.
+"""
+
+import struct
+
+from hid_descriptor import mouse_descriptor
+
+FLAG_X = 0x01
+FLAG_Y = 0x02
+FLAG_BUTTONS = 0x04
+FLAG_WHEEL = 0x08
+FLAG_KEYFRAME = 0x10
+FLAG_RUN = 0x20
+FLAG_INDEX = 0x40
+
+INDEX_MAGIC = b"EIDX"
+_INDEX_ENTRY = "<II"
+_FOOTER = "<4sII"
+FOOTER_SIZE = struct.calcsize(_FOOTER)
+
+
+def _write_varint(buffer, offset, value):
+    while value > 0x7F:
+        buffer[offset] = (value & 0x7F) | 0x80
+        value >>= 7
+        offset += 1
+    buffer[offset] = value
+    return offset + 1
+
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+class EventEncoder:
+    """Write mouse events to a binary stream.
+
+    :param stream: a writable file-like object.
+    :param keyframe_interval: number of events between two keyframes.
+    """
+
+    def __init__(self, stream, keyframe_interval=64):
+        self.stream = stream
+        self.keyframe_interval = keyframe_interval
+        self.count = 0
+        """Number of events encoded."""
+        self.size = 0
+        """Number of bytes written, the keyframe index included after ``close()``."""
+        self.keyframes = []
+        """``(event_index, byte_offset)`` of every keyframe, written by ``close()``."""
+        self._scratch = bytearray(24)
+        self._time = 0
+        self._delta = -1
+        self._buttons = 0
+        self._x = 0
+        self._y = 0
+        self._wheel = 0
+        self._run = 0
+
+    def add_report(self, time_us, report):
+        """Encode an absolute mouse report sent at ``time_us``.
+
+        Buttons, x, y and the low byte of the wheel are stored: the other
+        fields of a longer layout are left out.
+        """
+        wheel = report[5]
+        self.add(
+            time_us,
+            report[0],
+            report[1] | report[2] << 8,
+            report[3] | report[4] << 8,
+            wheel - 256 if wheel > 127 else wheel,
+        )
+
+    def add(self, time_us, buttons, x, y, wheel=0):
+        """Encode one event.
+
+        :param time_us: timestamp in microseconds, never lower than the previous one.
+        """
+        scratch = self._scratch
+        if self.count % self.keyframe_interval == 0:
+            self._flush_run()
+            self.keyframes.append((self.count, self.size))
+            scratch[0] = FLAG_KEYFRAME
+            offset = _write_varint(scratch, 1, time_us)
+            scratch[offset] = buttons
+            scratch[offset + 1] = x & 0xFF
+            scratch[offset + 2] = x >> 8
+            scratch[offset + 3] = y & 0xFF
+            scratch[offset + 4] = y >> 8
+            scratch[offset + 5] = wheel & 0xFF
+            self._write(offset + 6)
+            delta = -1
+        else:
+            delta = time_us - self._time
+            if (
+                delta == self._delta
+                and x == self._x
+                and y == self._y
+                and buttons == self._buttons
+                and wheel == self._wheel
+            ):
+                self._run += 1
+                self._time = time_us
+                self.count += 1
+                return
+            self._flush_run()
+            flags = 0
+            offset = _write_varint(scratch, 1, delta)
+            if x != self._x:
+                flags |= FLAG_X
+                offset = _write_varint(scratch, offset, _zigzag(x - self._x))
+            if y != self._y:
+                flags |= FLAG_Y
+                offset = _write_varint(scratch, offset, _zigzag(y - self._y))
+            if buttons != self._buttons:
+                flags |= FLAG_BUTTONS
+                scratch[offset] = buttons
+                offset += 1
+            if wheel:
+                flags |= FLAG_WHEEL
+                scratch[offset] = wheel & 0xFF
+                offset += 1
+            scratch[0] = flags
+            self._write(offset)
+        self._time = time_us
+        self._delta = delta
+        self._buttons = buttons
+        self._x = x
+        self._y = y
+        self._wheel = wheel
+        self.count += 1
+
+    def _flush_run(self):
+        if self._run:
+            self._scratch[0] = FLAG_RUN
+            self._write(_write_varint(self._scratch, 1, self._run))
+            self._run = 0
+
+    def _write(self, length):
+        self.stream.write(memoryview(self._scratch)[:length])
+        self.size += length
+
+    def close(self):
+        """Write a pending run of repeated events and the keyframe index.
+
+        Does not close the stream. No event can be added after it.
+        """
+        self._flush_run()
+        self._scratch[0] = FLAG_INDEX
+        self._write(1)
+        table = self.size
+        entry = bytearray(struct.calcsize(_INDEX_ENTRY))
+        for event_index, byte_offset in self.keyframes:
+            struct.pack_into(_INDEX_ENTRY, entry, 0, event_index, byte_offset)
+            self.stream.write(entry)
+            self.size += len(entry)
+        self.stream.write(struct.pack(_FOOTER, INDEX_MAGIC, len(self.keyframes), table))
+        self.size += FOOTER_SIZE
+
+
+class EventDecoder:
+    """Read events written by ``EventEncoder``.
+
+    :param stream: a readable file-like object with ``readinto``, and ``seek``
+        and ``tell`` for ``seek()`` and ``seek_event()``.
+    :param chunk_size: bytes read from the stream at once.
+    :param layout: ``hid_descriptor.Layout`` of the reports to write, by default
+        the one of ``hid_descriptor.mouse_descriptor()``. Fields the stream does
+        not store stay 0.
+
+    Examples::
+
+        decoder = EventDecoder(file)
+        while decoder.next() is not None:
+            wait_until(start + decoder.time_us * 1000)
+            mouse_device.send_report(decoder.report)
+    """
+
+    def __init__(self, stream, chunk_size=256, layout=None):
+        if layout is None:
+            layout = mouse_descriptor().layout()
+        fields = layout.fields
+        if (
+            layout.offset("buttons") != 0
+            or layout.offset("x") != 1
+            or layout.offset("y") != 3
+            or fields["wheel"][0] != 40
+            or fields["wheel"][1] not in (8, 16)
+        ):
+            raise ValueError("Layout does not start with buttons, x, y and wheel")
+        self.stream = stream
+        self.report = layout.new_report()
+        """The current event as a ready-to-send absolute mouse report."""
+        self._wide_wheel = fields["wheel"][1] == 16
+        self.time_us = 0
+        """Timestamp of the current event in microseconds."""
+        self.delay_us = 0
+        """Time since the previous event in microseconds."""
+        self._chunk = bytearray(chunk_size)
+        self._length = 0
+        self._position = 0
+        self._run = 0
+        self._x = 0
+        self._y = 0
+        self._ended = False
+        self._keyframes = None
+
+    def seek(self, byte_offset):
+        """Continue decoding at a keyframe, from ``keyframes()``."""
+        self.stream.seek(byte_offset)
+        self._length = 0
+        self._position = 0
+        self._run = 0
+        self._ended = False
+        self.time_us = 0
+
+    def keyframes(self):
+        """``(event_index, byte_offset)`` of every keyframe, from the index at the end of the stream.
+
+        Read once, on the first call. Empty if the stream has no index.
+        """
+        if self._keyframes is None:
+            stream = self.stream
+            position = stream.tell()
+            keyframes = []
+            end = stream.seek(0, 2)
+            if end >= FOOTER_SIZE:
+                stream.seek(end - FOOTER_SIZE)
+                magic, count, table = struct.unpack(_FOOTER, stream.read(FOOTER_SIZE))
+                entry_size = struct.calcsize(_INDEX_ENTRY)
+                if magic == INDEX_MAGIC and table + count * entry_size == end - FOOTER_SIZE:
+                    stream.seek(table)
+                    data = stream.read(count * entry_size)
+                    for index in range(count):
+                        keyframes.append(struct.unpack_from(_INDEX_ENTRY, data, index * entry_size))
+            stream.seek(position)
+            self._keyframes = keyframes
+        return self._keyframes
+
+    def seek_event(self, event_index):
+        """Make ``event_index`` the event the next ``next()`` decodes.
+
+        Starts at the last keyframe before it, or at the start of the stream
+        without an index, and decodes the events in between.
+
+        :raises IndexError: if the stream has fewer events.
+        """
+        start_event = 0
+        start_offset = 0
+        for keyframe_event, keyframe_offset in self.keyframes():
+            if keyframe_event > event_index:
+                break
+            start_event = keyframe_event
+            start_offset = keyframe_offset
+        self.seek(start_offset)
+        for _ in range(event_index - start_event):
+            if self.next() is None:
+                raise IndexError("event index out of range")
+
+    def _byte(self):
+        if self._position == self._length:
+            self._length = self.stream.readinto(self._chunk) or 0
+            self._position = 0
+            if not self._length:
+                raise EOFError
+        value = self._chunk[self._position]
+        self._position += 1
+        return value
+
+    def _varint(self):
+        value = 0
+        shift = 0
+        while True:
+            byte = self._byte()
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def _set_wheel(self, report, wheel):
+        report[5] = wheel
+        if self._wide_wheel:
+            report[6] = 0xFF if wheel > 127 else 0
+
+    def next(self):
+        """Decode the next event into ``report``.
+
+        :return: the delay since the previous event in microseconds, or ``None``
+            at the end of the stream.
+        """
+        report = self.report
+        if self._ended:
+            return None
+        if self._run:
+            self._run -= 1
+            self.time_us += self.delay_us
+            return self.delay_us
+        try:
+            flags = self._byte()
+            if flags == FLAG_INDEX:
+                # The keyframe index follows, not events.
+                self._ended = True
+                return None
+            if flags == FLAG_RUN:
+                self._run = self._varint() - 1
+                self.time_us += self.delay_us
+                return self.delay_us
+            if flags & FLAG_KEYFRAME:
+                time_us = self._varint()
+                self.delay_us = time_us - self.time_us if self.time_us else 0
+                self.time_us = time_us
+                report[0] = self._byte()
+                report[1] = self._byte()
+                report[2] = self._byte()
+                report[3] = self._byte()
+                report[4] = self._byte()
+                self._set_wheel(report, self._byte())
+                self._x = report[1] | report[2] << 8
+                self._y = report[3] | report[4] << 8
+                return self.delay_us
+            self.delay_us = self._varint()
+            self.time_us += self.delay_us
+            if flags & FLAG_X:
+                value = self._varint()
+                self._x += (value >> 1) ^ -(value & 1)
+                report[1] = self._x & 0xFF
+                report[2] = self._x >> 8
+            if flags & FLAG_Y:
+                value = self._varint()
+                self._y += (value >> 1) ^ -(value & 1)
+                report[3] = self._y & 0xFF
+                report[4] = self._y >> 8
+            if flags & FLAG_BUTTONS:
+                report[0] = self._byte()
+            self._set_wheel(report, self._byte() if flags & FLAG_WHEEL else 0)
+            return self.delay_us
+        except EOFError:
+            return None
@@ -0,0 +1,237 @@
+"""
+`gc_scheduler`
+====================================================
+
+Garbage collection in idle time, not in the middle of a click.
+
+CircuitPython collects whenever an allocation does not fit, which on a long
+run means a pause of a few milliseconds at a random point, sometimes between
+the press and the release of a gesture. ``GCScheduler`` moves the pauses:
+
+* ``idle(window_ns)`` runs ``gc.collect()`` when the caller has that much time
+  before its next deadline, the queue is empty or a dwell is being waited out,
+  and the window is longer than the slowest collection seen so far;
+* ``burst()`` marks a critical report sequence. With ``disable_in_bursts`` the
+  automatic collector is off inside it (a heap that is really full still
+  collects), and any collection that happens inside it is recorded.
+
+Every pause is recorded with its duration and placement (``IDLE``, ``BURST``
+or ``AUTO``) in a fixed ring, so a long run can confirm that none landed in a
+gesture. On the board, automatic collections are noticed by ``gc.mem_alloc()``
+going down and their duration is not known (the time of the burst is an upper
+bound); on a desktop Python, ``gc.callbacks`` gives exact times.
+
+Examples::
+
+    collector = GCScheduler(disable_in_bursts=True)
+    ...
+    with collector.burst():
+        mouse.click(1)
+    collector.idle(next_deadline - time.monotonic_ns())
+    ...
+    print(collector.format())
+"""
+
+import gc
+import time
+from array import array
+
+IDLE = 0
+"""Collection run by ``idle()``."""
+BURST = 1
+"""Automatic collection inside a ``burst()``: what this module is meant to prevent."""
+AUTO = 2
+"""Automatic collection outside of any burst."""
+
+PLACEMENT_NAMES = ("idle", "burst", "auto")
+
+_FIELDS = 3  # ticks_ms, duration_us, placement
+
+try:
+    _mem_alloc = gc.mem_alloc
+except AttributeError:
+    _mem_alloc = None
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+
+    def ticks_ms():
+        """Milliseconds, wrapping at 2**29 like ``supervisor.ticks_ms()``."""
+        return (time.monotonic_ns() // 1_000_000) & 0x1FFFFFFF
+
+
+class GCScheduler:
+    """Collect in idle windows and record where every collection lands.
+
+    :param disable_in_bursts: turn automatic collection off inside ``burst()``.
+    :param collect_when_idle: with ``False``, ``idle()`` never collects and the
+        scheduler only records where the automatic collections land.
+    :param min_garbage: on the board, bytes allocated since the last collection
+        below which ``idle()`` does not bother.
+    :param estimate_ns: expected pause before one was measured.
+    :param capacity: pauses kept in the ring.
+    """
+
+    def __init__(
+        self,
+        disable_in_bursts=False,
+        collect_when_idle=True,
+        min_garbage=4096,
+        estimate_ns=5_000_000,
+        capacity=32,
+    ):
+        self.disable_in_bursts = disable_in_bursts
+        self.collect_when_idle = collect_when_idle
+        self.min_garbage = min_garbage
+        self.estimate_ns = estimate_ns
+        self.capacity = capacity
+        self._records = array("l", [0] * (capacity * _FIELDS))
+        self._next = 0
+        self.counts = array("L", [0, 0, 0])
+        """Collections per placement: ``counts[IDLE]``, ``counts[BURST]``, ``counts[AUTO]``."""
+        self.max_pause_ns = 0
+        """Longest measured pause."""
+        self.total_pause_ns = 0
+        """Sum of the measured pauses."""
+        self.depth = 0
+        """Nesting depth of ``burst()``, 0 outside."""
+        self._burst_start_ns = 0
+        self._burst_alloc = 0
+        self._reenable = False
+        self._collecting = False
+        self._callback_start_ns = 0
+        self._collect_ns = 0
+        self._live = 0
+        self._last_alloc = _mem_alloc() if _mem_alloc is not None else 0
+        self._callbacks = getattr(gc, "callbacks", None)
+        if self._callbacks is not None:
+            self._callbacks.append(self._on_gc)
+
+    def close(self):
+        """Stop watching collections on a desktop Python, and turn the collector back on."""
+        if self._callbacks is not None and self._on_gc in self._callbacks:
+            self._callbacks.remove(self._on_gc)
+        if self._reenable:
+            gc.enable()
+            self._reenable = False
+
+    def _record(self, placement, duration_ns):
+        base = self._next % self.capacity * _FIELDS
+        records = self._records
+        records[base] = ticks_ms()
+        records[base + 1] = duration_ns // 1000
+        records[base + 2] = placement
+        self._next += 1
+        self.counts[placement] += 1
+        if duration_ns > self.max_pause_ns:
+            self.max_pause_ns = duration_ns
+        self.total_pause_ns += duration_ns
+
+    def _on_gc(self, phase, info):  # pylint: disable=unused-argument
+        """``gc.callbacks`` hook: times the automatic collections of a desktop Python."""
+        if self._collecting:
+            return
+        if phase == "start":
+            self._callback_start_ns = time.monotonic_ns()
+        else:
+            duration = time.monotonic_ns() - self._callback_start_ns
+            self._record(BURST if self.depth else AUTO, duration)
+
+    def _check_auto(self):
+        """On the board: notice a collection nobody asked for since the last check."""
+        if _mem_alloc is None or self._callbacks is not None:
+            return
+        allocated = _mem_alloc()
+        if allocated < self._last_alloc:
+            self._record(AUTO, 0)
+            self._live = allocated
+        self._last_alloc = allocated
+
+    def idle(self, window_ns):
+        """Collect if ``window_ns`` is enough for a pause and there is garbage.
+
+        :return: ``True`` if a collection ran. Call it wherever the caller is
+            about to wait, with the time left before its next deadline.
+        """
+        if self.depth:
+            return False
+        self._check_auto()
+        if not self.collect_when_idle:
+            return False
+        # The slowest explicit collection so far is what the next one may cost.
+        budget = self._collect_ns if self._collect_ns else self.estimate_ns
+        if window_ns < budget:
+            return False
+        if _mem_alloc is not None and self._last_alloc - self._live < self.min_garbage:
+            return False
+        return self.collect()
+
+    def collect(self):
+        """Collect now, recorded as ``IDLE``."""
+        self._collecting = True
+        start = time.monotonic_ns()
+        gc.collect()
+        duration = time.monotonic_ns() - start
+        self._collecting = False
+        if _mem_alloc is not None:
+            self._live = self._last_alloc = _mem_alloc()
+        if duration > self._collect_ns:
+            self._collect_ns = duration
+        self._record(IDLE, duration)
+        return True
+
+    def burst(self):
+        """Context manager around a critical report sequence.
+
+        Nothing is allocated: it returns the scheduler itself.
+        """
+        return self
+
+    def __enter__(self):
+        if not self.depth:
+            self._check_auto()
+            self._burst_start_ns = time.monotonic_ns()
+            if _mem_alloc is not None:
+                self._burst_alloc = _mem_alloc()
+            if self.disable_in_bursts and gc.isenabled():
+                gc.disable()
+                self._reenable = True
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.depth -= 1
+        if self.depth:
+            return
+        if self._reenable:
+            gc.enable()
+            self._reenable = False
+        if _mem_alloc is not None and self._callbacks is None:
+            allocated = _mem_alloc()
+            if allocated < self._burst_alloc:
+                # Collected inside the burst: its length bounds the pause.
+                self._record(BURST, time.monotonic_ns() - self._burst_start_ns)
+                self._live = allocated
+            self._last_alloc = allocated
+
+    def pauses(self):
+        """Recorded pauses, oldest first, as ``(ticks_ms, duration_us, placement)`` tuples."""
+        count = min(self._next, self.capacity)
+        result = []
+        for index in range(self._next - count, self._next):
+            base = index % self.capacity * _FIELDS
+            records = self._records
+            result.append((records[base], records[base + 1], records[base + 2]))
+        return result
+
+    def format(self):
+        """Counts per placement and pause times as one line."""
+        total = sum(self.counts)
+        return "gc idle={} burst={} auto={} max_pause={}us mean_pause={}us".format(
+            self.counts[IDLE],
+            self.counts[BURST],
+            self.counts[AUTO],
+            self.max_pause_ns // 1000,
+            self.total_pause_ns // total // 1000 if total else 0,
+        )
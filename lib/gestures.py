@@ -0,0 +1,287 @@
+"""
+`gestures`
+====================================================
+
+Drags, chords and multi-clicks compiled once into minimal report sequences.
+
+A gesture is described as frames: the buttons held, the absolute position and
+how long to wait before the next frame. ``compile()`` turns the frames into
+the fewest reports that make the host see the same thing:
+
+* a frame that only moves (its buttons are those of the report before it),
+  with no wait after it, rides along with the next frame when that one
+  presses buttons or moves again: the pointer is absolute, so the host lands
+  on the same spot without the extra report. A frame that presses or releases
+  buttons is always sent where it is;
+* a frame identical to the previous one is dropped and its wait added to the
+  previous one.
+
+Releases are never merged, so a drag always ends where it was meant to. The
+reports are stored back to back in one bytearray, with one ``array('l')`` of
+waits, and each compiled gesture gets a small integer handle. The gesture
+methods cache their result by arguments, so asking for the same drag twice
+costs a dictionary lookup, and ``play()`` only sends. Only the ``cache_size``
+gestures compiled or asked for most recently are kept, so clicking at ever
+new points does not fill the heap; the handle of an evicted gesture is not
+valid any more.
+
+Examples::
+
+    gestures = GestureComposer(mouse)
+    drag = gestures.drag(1000, 1000, 20000, 12000, steps=16, step_ns=8_000_000)
+    double = gestures.click(16383, 16383, count=2)
+    gestures.play(drag)
+    gestures.play(double)
+"""
+
+import time
+from array import array
+
+from hid_descriptor import mouse_descriptor
+from hid_util import HandleCache, follow, limit_coord, wait_until
+
+LEFT_BUTTON = 1
+"""Left mouse button."""
+RIGHT_BUTTON = 2
+"""Right mouse button."""
+MIDDLE_BUTTON = 4
+"""Middle mouse button."""
+
+HOLD_NS = 50_000_000
+"""Default time buttons stay down in a click."""
+GAP_NS = 80_000_000
+"""Default time between the clicks of a double or triple click, under the usual 500 ms."""
+
+
+class Gesture:
+    """A compiled gesture: reports and the wait after each of them.
+
+    :ivar reports: the reports, back to back.
+    :ivar waits: ``array('l')`` of nanoseconds to wait after each report.
+    :ivar count: number of reports.
+    """
+
+    def __init__(self, reports, waits, report_length):
+        self.reports = reports
+        self.waits = waits
+        self.count = len(waits)
+        view = memoryview(reports)
+        self._views = [
+            view[start:start + report_length]
+            for start in range(0, self.count * report_length, report_length)
+        ]
+
+    @property
+    def duration_ns(self):
+        """Time from the first report to the end of the last wait."""
+        return sum(self.waits)
+
+    def __len__(self):
+        return self.count
+
+
+class GestureComposer:
+    """Compile gestures for one mouse and replay them by handle.
+
+    :param mouse: the driver the reports go through, any of them. Its
+        ``report`` (and ``_last_report`` if it keeps one) follows the last
+        report of each gesture, so later calls continue from there.
+    :param hold_ns: default time the buttons stay down in a click.
+    :param gap_ns: default time between two clicks of a multi-click.
+    :param cache_size: number of compiled gestures to keep.
+    """
+
+    def __init__(self, mouse, *, hold_ns=HOLD_NS, gap_ns=GAP_NS, cache_size=32):
+        self.mouse = mouse
+        self.hold_ns = hold_ns
+        self.gap_ns = gap_ns
+        layout = getattr(mouse, "layout", None) or mouse_descriptor().layout()
+        self.report_length = layout.length
+        self._buttons_offset = layout.offset("buttons")
+        self._x_offset = layout.offset("x")
+        self._y_offset = layout.offset("y")
+        self.cache_size = cache_size
+        self._compiled = HandleCache(cache_size)
+        self.gestures = self._compiled.items
+        """Compiled ``Gesture`` objects by handle, the ``cache_size`` most recently used."""
+        self.frames_in = 0
+        """Frames given to ``compile()`` so far."""
+        self.reports_out = 0
+        """Reports ``compile()`` kept out of them."""
+
+    def compile(self, frames, key=None):
+        """Compile ``(buttons, x, y, wait_ns)`` frames into a gesture, return its handle.
+
+        :param key: cache key. A gesture compiled with the same key before is
+            returned as is.
+        """
+        handle = self._compiled.lookup(key)
+        if handle is not None:
+            return handle
+        kept = []
+        for frame in frames:
+            buttons, x, y, wait = frame
+            buttons &= 0xFF
+            frame = (buttons, limit_coord(x), limit_coord(y), wait)
+            self.frames_in += 1
+            if kept:
+                last_buttons, last_x, last_y, last_wait = kept[-1]
+                if frame[:3] == (last_buttons, last_x, last_y):
+                    kept[-1] = (last_buttons, last_x, last_y, last_wait + wait)
+                    continue
+                before_buttons = kept[-2][0] if len(kept) > 1 else 0
+                if (
+                    not last_wait
+                    and last_buttons == before_buttons
+                    and buttons & last_buttons == last_buttons
+                ):
+                    # A pure move with no wait, and nothing released next:
+                    # the next report carries this position too, as the
+                    # pointer is absolute.
+                    kept[-1] = frame
+                    continue
+            kept.append(frame)
+        step = self.report_length
+        reports = bytearray(len(kept) * step)
+        waits = array("l", [0] * len(kept))
+        offset = 0
+        for index, (buttons, x, y, wait) in enumerate(kept):
+            reports[offset + self._buttons_offset] = buttons
+            reports[offset + self._x_offset] = x & 0xFF
+            reports[offset + self._x_offset + 1] = x >> 8
+            reports[offset + self._y_offset] = y & 0xFF
+            reports[offset + self._y_offset + 1] = y >> 8
+            waits[index] = wait
+            offset += step
+        self.reports_out += len(kept)
+        return self._compiled.store(Gesture(reports, waits, step), key)
+
+    def click(self, x, y, buttons=LEFT_BUTTON, count=1, hold_ns=None, gap_ns=None):
+        """Click ``count`` times at ``(x, y)``: 1 for a click, 2 or 3 for double or triple.
+
+        The move goes out with the first press: ``2 * count`` reports.
+        """
+        hold_ns = self.hold_ns if hold_ns is None else hold_ns
+        gap_ns = self.gap_ns if gap_ns is None else gap_ns
+        key = ("click", x, y, buttons, count, hold_ns, gap_ns)
+        handle = self._compiled.lookup(key)
+        if handle is not None:
+            return handle
+        frames = [(0, x, y, 0)]
+        for index in range(count):
+            frames.append((buttons, x, y, hold_ns))
+            frames.append((0, x, y, gap_ns if index < count - 1 else 0))
+        return self.compile(frames, key)
+
+    def drag(self, x0, y0, x1, y1, buttons=LEFT_BUTTON, steps=8, step_ns=8_000_000, hold_ns=None):
+        """Press ``buttons`` at ``(x0, y0)``, move to ``(x1, y1)`` in ``steps`` moves, release.
+
+        ``hold_ns`` is the wait after the press, before the first move, so the
+        host recognizes a drag and not a click. With ``step_ns`` of 0 the
+        intermediate moves are merged away and the drag is three reports.
+        """
+        return self.chord_drag(x0, y0, x1, y1, (buttons,), steps, step_ns, hold_ns)
+
+    def chord_drag(
+        self, x0, y0, x1, y1, chord, steps=8, step_ns=8_000_000, hold_ns=None, chord_ns=0
+    ):
+        """Drag with several buttons, pressed in the order of ``chord``.
+
+        :param chord: button masks, pressed one after the other ``chord_ns``
+            apart and released in reverse order at the end. With ``chord_ns``
+            of 0 they all go down in one report.
+        """
+        hold_ns = self.hold_ns if hold_ns is None else hold_ns
+        key = ("drag", x0, y0, x1, y1, tuple(chord), steps, step_ns, hold_ns, chord_ns)
+        handle = self._compiled.lookup(key)
+        if handle is not None:
+            return handle
+        held = 0
+        frames = [(0, x0, y0, 0)]
+        for buttons in chord:
+            held |= buttons
+            frames.append((held, x0, y0, chord_ns))
+        frames[-1] = (held, x0, y0, hold_ns)
+        frames.extend(_path_frames(held, x0, y0, x1, y1, steps, step_ns))
+        for buttons in reversed(chord):
+            held &= ~buttons
+            frames.append((held, x1, y1, chord_ns))
+        frames[-1] = (held, x1, y1, 0)
+        return self.compile(frames, key)
+
+    def hold_move(self, x0, y0, points, buttons=LEFT_BUTTON, hold_ns=None, step_ns=8_000_000,
+                  release=True):
+        """Press at ``(x0, y0)``, hold ``hold_ns``, then follow ``points``.
+
+        :param points: ``(x, y)`` tuples visited ``step_ns`` apart.
+        :param release: release the buttons at the last point. Without it the
+            buttons stay down for a later gesture or ``release()``.
+        """
+        hold_ns = self.hold_ns if hold_ns is None else hold_ns
+        points = tuple(points)
+        key = ("hold", x0, y0, points, buttons, hold_ns, step_ns, release)
+        handle = self._compiled.lookup(key)
+        if handle is not None:
+            return handle
+        frames = [(0, x0, y0, 0), (buttons, x0, y0, hold_ns)]
+        x, y = x0, y0
+        for x, y in points:
+            frames.append((buttons, x, y, step_ns))
+        if release:
+            frames.append((0, x, y, 0))
+        return self.compile(frames, key)
+
+    def play(self, handle):
+        """Send the reports of gesture ``handle`` with their waits, blocking."""
+        gesture = self.gestures[handle]
+        send = self.mouse._mouse_device.send_report  # pylint: disable=protected-access
+        waits = gesture.waits
+        views = gesture._views  # pylint: disable=protected-access
+        deadline = time.monotonic_ns()
+        wait = 0
+        for index in range(gesture.count):
+            # After a report with no wait, the next one is due already.
+            if wait:
+                wait_until(deadline)
+            send(views[index])
+            wait = waits[index]
+            deadline += wait
+        self._follow(gesture)
+
+    async def play_async(self, handle):
+        """Like ``play()``, but waits with ``asyncio`` so other tasks keep running."""
+        from mouse_scheduler import sleep_until  # pylint: disable=import-outside-toplevel
+
+        gesture = self.gestures[handle]
+        send = self.mouse._mouse_device.send_report  # pylint: disable=protected-access
+        waits = gesture.waits
+        views = gesture._views  # pylint: disable=protected-access
+        deadline = time.monotonic_ns()
+        wait = 0
+        for index in range(gesture.count):
+            if wait and time.monotonic_ns() < deadline:
+                await sleep_until(deadline)
+            send(views[index])
+            wait = waits[index]
+            deadline += wait
+        self._follow(gesture)
+
+    def _follow(self, gesture):
+        """Make the driver's current report match the last one sent."""
+        if not gesture.count:
+            return
+        views = gesture._views  # pylint: disable=protected-access
+        follow(self.mouse, views[-1], self.report_length, gesture.count)
+
+
+def _path_frames(buttons, x0, y0, x1, y1, steps, step_ns):
+    """``steps`` frames along the straight line to ``(x1, y1)``, the last one on it."""
+    dx = x1 - x0
+    dy = y1 - y0
+    frames = []
+    for step in range(1, steps + 1):
+        frames.append((buttons, x0 + dx * step // steps, y0 + dy * step // steps, step_ns))
+    if not frames:
+        frames.append((buttons, x1, y1, step_ns))
+    return frames
+
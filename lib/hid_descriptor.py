@@ -0,0 +1,591 @@
+"""
+`hid_descriptor`
+====================================================
+
+Build HID report descriptors and the matching report layouts from a spec.
+
+A spec is a list of fields made with ``buttons()``, ``axes()``, ``wheel()``,
+``pan()``, ``modifiers()`` and ``padding()``, grouped into ``Report`` objects. ``Descriptor``
+turns them into the ``report_descriptor`` bytes for ``usb_hid.Device`` and
+into one ``Layout`` per report, which knows the length of the report and
+where each field lives in it. ``Layout.packer()`` returns a function that
+writes one field at its precomputed position, so sending needs no layout math.
+
+``ABSOLUTE_MOUSE`` is the absolute mouse of ``boot.py``: report ID 11, 5
+buttons, 16 bit x and y from 0 to 32767 and an 8 bit wheel, 6 bytes.
+``SCROLL_MOUSE`` has 16 bit high resolution wheel and pan instead, 9 bytes.
+``CHORD_MOUSE`` adds the keyboard modifier byte, 7 bytes.
+``mouse_descriptor()`` picks one of them from ``settings.toml``.
+
+Examples::
+
+    # 8 buttons, 16 bit wheel and horizontal pan, still report ID 11
+    mouse = Descriptor((Report(11, (
+        buttons(8),
+        axes("x", "y", minimum=0, maximum=32767, bits=16),
+        wheel(bits=16),
+        pan(bits=16),
+    )),))
+    usb_hid.enable((mouse.device(),), boot_device=0)
+"""
+
+from hid_util import setting
+
+# Item tags, with the size bits cleared
+_INPUT = 0x80
+_FEATURE = 0xB0
+_COLLECTION = 0xA0
+_END_COLLECTION = 0xC0
+_USAGE_PAGE = 0x04
+_LOGICAL_MINIMUM = 0x14
+_LOGICAL_MAXIMUM = 0x24
+_PHYSICAL_MINIMUM = 0x34
+_PHYSICAL_MAXIMUM = 0x44
+_REPORT_SIZE = 0x74
+_REPORT_ID = 0x84
+_REPORT_COUNT = 0x94
+_USAGE = 0x08
+_USAGE_MINIMUM = 0x18
+_USAGE_MAXIMUM = 0x28
+
+COLLECTION_PHYSICAL = 0x00
+COLLECTION_APPLICATION = 0x01
+COLLECTION_LOGICAL = 0x02
+
+DATA_VARIABLE_ABSOLUTE = 0x02
+"""Input item flags: Data, Variable, Absolute."""
+CONSTANT = 0x03
+"""Input item flags: Constant, Variable, Absolute (padding)."""
+DATA_VARIABLE_RELATIVE = 0x06
+"""Input item flags: Data, Variable, Relative."""
+
+PAGE_GENERIC_DESKTOP = 0x01
+PAGE_KEYBOARD = 0x07
+PAGE_BUTTON = 0x09
+PAGE_CONSUMER = 0x0C
+
+USAGE_MOUSE = 0x02
+USAGE_POINTER = 0x01
+USAGE_WHEEL = 0x38
+USAGE_RESOLUTION_MULTIPLIER = 0x48
+USAGE_AC_PAN = 0x0238
+USAGE_LEFT_CONTROL = 0xE0
+USAGE_RIGHT_GUI = 0xE7
+AXIS_USAGES = {"x": 0x30, "y": 0x31, "z": 0x32, "rx": 0x33, "ry": 0x34, "rz": 0x35}
+
+
+class Field:
+    """One main item of a report: ``count`` values of ``size`` bits each.
+
+    Use the helper functions rather than building fields by hand.
+
+    :param names: one name per value, ``None`` for padding. A single name for
+        a bit field such as the buttons.
+    :param main: ``_INPUT`` or ``_FEATURE``; ``_COLLECTION`` and
+        ``_END_COLLECTION`` for the markers of ``logical()``, without bits.
+    :param physical: ``(minimum, maximum)`` physical range, for the fields
+        whose host value is scaled, like the resolution multiplier.
+    """
+
+    def __init__(
+        self,
+        names,
+        *,
+        size,
+        count,
+        usage_page=None,
+        usages=(),
+        usage_range=None,
+        minimum=0,
+        maximum=0,
+        flags=DATA_VARIABLE_ABSOLUTE,
+        count_first=False,
+        main=_INPUT,
+        physical=None,
+    ):
+        self.names = tuple(names)
+        self.size = size
+        self.count = count
+        self.usage_page = usage_page
+        self.usages = tuple(usages)
+        self.usage_range = usage_range
+        self.minimum = minimum
+        self.maximum = maximum
+        self.flags = flags
+        self.count_first = count_first
+        self.main = main
+        self.physical = physical
+
+    @property
+    def bits(self):
+        """Total size of the field in bits."""
+        return self.size * self.count
+
+
+def buttons(count=5, name="buttons"):
+    """``count`` one bit buttons, padded to a whole byte."""
+    fields = [
+        Field(
+            (name,),
+            size=1,
+            count=count,
+            usage_page=PAGE_BUTTON,
+            usage_range=(1, count),
+            minimum=0,
+            maximum=1,
+            count_first=True,
+        )
+    ]
+    if count % 8:
+        fields.extend(padding(8 - count % 8))
+    return fields
+
+
+def padding(bits, feature=False):
+    """Constant bits that keep the next field byte aligned, in the feature report if ``feature``."""
+    return [Field((None,), size=bits, count=1, flags=CONSTANT, main=_FEATURE if feature else _INPUT)]
+
+
+def axes(*names, minimum=0, maximum=32767, bits=16, relative=False):
+    """Generic desktop axes, by name: ``"x"``, ``"y"``, ``"z"``, ``"rx"``..."""
+    return [
+        Field(
+            names,
+            size=bits,
+            count=len(names),
+            usage_page=PAGE_GENERIC_DESKTOP,
+            usages=[AXIS_USAGES[name] for name in names],
+            minimum=minimum,
+            maximum=maximum,
+            flags=DATA_VARIABLE_RELATIVE if relative else DATA_VARIABLE_ABSOLUTE,
+        )
+    ]
+
+
+def wheel(bits=8, name="wheel"):
+    """Relative vertical wheel, signed, ``bits`` wide."""
+    limit = (1 << (bits - 1)) - 1
+    return [
+        Field(
+            (name,),
+            size=bits,
+            count=1,
+            usage_page=PAGE_GENERIC_DESKTOP,
+            usages=(USAGE_WHEEL,),
+            minimum=-limit,
+            maximum=limit,
+            flags=DATA_VARIABLE_RELATIVE,
+        )
+    ]
+
+
+def pan(bits=8, name="pan"):
+    """Relative horizontal scrolling (Consumer page, AC Pan), signed."""
+    limit = (1 << (bits - 1)) - 1
+    return [
+        Field(
+            (name,),
+            size=bits,
+            count=1,
+            usage_page=PAGE_CONSUMER,
+            usages=(USAGE_AC_PAN,),
+            minimum=-limit,
+            maximum=limit,
+            flags=DATA_VARIABLE_RELATIVE,
+        )
+    ]
+
+
+def modifiers(name="modifiers"):
+    """The 8 keyboard modifier keys, left control to right GUI, one byte.
+
+    The same bits as the first byte of a boot keyboard report.
+    """
+    return [
+        Field(
+            (name,),
+            size=1,
+            count=8,
+            usage_page=PAGE_KEYBOARD,
+            usage_range=(USAGE_LEFT_CONTROL, USAGE_RIGHT_GUI),
+            minimum=0,
+            maximum=1,
+            count_first=True,
+        )
+    ]
+
+
+def logical(*fields):
+    """Wrap ``fields`` in a logical collection.
+
+    A resolution multiplier only applies to the controls of its own logical
+    collection, so each high resolution axis gets one.
+    """
+    result = [Field((None,), size=0, count=0, main=_COLLECTION, flags=COLLECTION_LOGICAL)]
+    for field in fields:
+        if isinstance(field, Field):
+            result.append(field)
+        else:
+            result.extend(field)
+    result.append(Field((None,), size=0, count=0, main=_END_COLLECTION))
+    return result
+
+
+def resolution_multiplier(multiplier=8, name="multiplier"):
+    """Feature control the host sets to 1 to get ``multiplier`` wheel counts per detent.
+
+    Two bits in the feature report, padded to a byte. Until the host sets it,
+    one count is one detent, as with a plain wheel.
+    """
+    return [
+        Field(
+            (name,),
+            size=2,
+            count=1,
+            usage_page=PAGE_GENERIC_DESKTOP,
+            usages=(USAGE_RESOLUTION_MULTIPLIER,),
+            minimum=0,
+            maximum=1,
+            main=_FEATURE,
+            physical=(1, multiplier),
+        )
+    ] + padding(6, feature=True)
+
+
+def high_resolution_wheel(bits=16, multiplier=8, name="wheel"):
+    """Vertical wheel with its resolution multiplier, named ``<name>_multiplier``."""
+    return logical(resolution_multiplier(multiplier, name + "_multiplier"), wheel(bits, name))
+
+
+def high_resolution_pan(bits=16, multiplier=8, name="pan"):
+    """Horizontal pan with its resolution multiplier, named ``<name>_multiplier``."""
+    return logical(resolution_multiplier(multiplier, name + "_multiplier"), pan(bits, name))
+
+
+class Report:
+    """One input report: an ID and its fields, in order.
+
+    :param fields: a sequence of fields, or of lists of fields as returned by
+        the helper functions.
+    """
+
+    def __init__(self, report_id, fields):
+        self.report_id = report_id
+        self.fields = []
+        for field in fields:
+            if isinstance(field, Field):
+                self.fields.append(field)
+            else:
+                self.fields.extend(field)
+
+
+def _pack_bits(bit_offset, bits):
+    byte, shift = divmod(bit_offset, 8)
+    mask = ((1 << bits) - 1) << shift
+
+    def pack(buffer, value, base=0):
+        index = base + byte
+        buffer[index] = (buffer[index] & ~mask & 0xFF) | ((value << shift) & mask)
+
+    return pack
+
+
+def _pack_u8(byte):
+    def pack(buffer, value, base=0):
+        buffer[base + byte] = value & 0xFF
+
+    return pack
+
+
+def _pack_u16(byte):
+    def pack(buffer, value, base=0):
+        buffer[base + byte] = value & 0xFF
+        buffer[base + byte + 1] = (value >> 8) & 0xFF
+
+    return pack
+
+
+def _pack_generic(bit_offset, bits):
+    def pack(buffer, value, base=0):
+        for bit in range(bits):
+            index, shift = divmod(bit_offset + bit, 8)
+            if value >> bit & 1:
+                buffer[base + index] |= 1 << shift
+            else:
+                buffer[base + index] &= ~(1 << shift) & 0xFF
+
+    return pack
+
+
+class Layout:
+    """Where each named field sits in one report.
+
+    :ivar report_id: the report ID.
+    :ivar length: report length in bytes, without the report ID.
+    :ivar fields: ``{name: (bit_offset, bits, minimum, maximum)}``.
+    :ivar feature_length: feature report length in bytes, 0 without one.
+    :ivar feature_fields: ``{name: (bit_offset, bits, physical_minimum,
+        physical_maximum)}`` of the feature report.
+    """
+
+    def __init__(self, report_id, length, fields, feature_length=0, feature_fields=None):
+        self.report_id = report_id
+        self.length = length
+        self.fields = fields
+        self.feature_length = feature_length
+        self.feature_fields = feature_fields or {}
+
+    def offset(self, name):
+        """Byte offset of a byte aligned field."""
+        bit_offset = self.fields[name][0]
+        if bit_offset % 8:
+            raise ValueError("{} is not byte aligned".format(name))
+        return bit_offset // 8
+
+    def packer(self, name):
+        """Function ``pack(buffer, value, base=0)`` writing field ``name``.
+
+        ``base`` is the offset of the report in ``buffer``, for buffers holding
+        several reports back to back. Values are masked to the field width, so
+        signed values are written in two's complement.
+        """
+        bit_offset, bits, _, _ = self.fields[name]
+        if bit_offset % 8 == 0 and bits == 8:
+            return _pack_u8(bit_offset // 8)
+        if bit_offset % 8 == 0 and bits == 16:
+            return _pack_u16(bit_offset // 8)
+        if bit_offset % 8 + bits <= 8:
+            return _pack_bits(bit_offset, bits)
+        return _pack_generic(bit_offset, bits)
+
+    def new_report(self):
+        """A zeroed bytearray of the report length."""
+        return bytearray(self.length)
+
+
+class Descriptor:
+    """Report descriptor and layouts of one HID device.
+
+    :param reports: the ``Report`` objects, each in its own physical collection.
+    :param usage_page: usage page of the application collection.
+    :param usage: usage of the application collection.
+    :param physical_usage: usage of each report's physical collection.
+    """
+
+    def __init__(
+        self,
+        reports,
+        usage_page=PAGE_GENERIC_DESKTOP,
+        usage=USAGE_MOUSE,
+        physical_usage=USAGE_POINTER,
+    ):
+        self.usage_page = usage_page
+        self.usage = usage
+        self.layouts = {}
+        """``{report_id: Layout}``"""
+        self.report_ids = tuple(report.report_id for report in reports)
+        """Report IDs, in descriptor order."""
+        out = bytearray()
+        _item(out, _USAGE_PAGE, usage_page)
+        _item(out, _USAGE, usage)
+        _item(out, _COLLECTION, COLLECTION_APPLICATION)
+        page = usage_page
+        for report in reports:
+            _item(out, _USAGE, physical_usage)
+            _item(out, _COLLECTION, COLLECTION_PHYSICAL)
+            _item(out, _REPORT_ID, report.report_id)
+            page = self._add_report(out, report, page)
+            out.append(_END_COLLECTION)
+        out.append(_END_COLLECTION)
+        self.report_descriptor = bytes(out)
+        """The descriptor bytes for ``usb_hid.Device``."""
+
+    def _add_report(self, out, report, page):
+        bit_offset = 0
+        fields = {}
+        feature_offset = 0
+        feature_fields = {}
+        for field in report.fields:
+            if field.main == _COLLECTION:
+                _item(out, _COLLECTION, field.flags)
+                continue
+            if field.main == _END_COLLECTION:
+                out.append(_END_COLLECTION)
+                continue
+            if field.usage_page is not None and field.usage_page != page:
+                page = field.usage_page
+                _item(out, _USAGE_PAGE, page)
+            if field.usage_range is not None:
+                _item(out, _USAGE_MINIMUM, field.usage_range[0])
+                _item(out, _USAGE_MAXIMUM, field.usage_range[1])
+            for usage in field.usages:
+                _item(out, _USAGE, usage)
+            if field.flags != CONSTANT:
+                _item(out, _LOGICAL_MINIMUM, field.minimum, signed=True)
+                _item(out, _LOGICAL_MAXIMUM, field.maximum, signed=True)
+            if field.physical is not None:
+                _item(out, _PHYSICAL_MINIMUM, field.physical[0], signed=True)
+                _item(out, _PHYSICAL_MAXIMUM, field.physical[1], signed=True)
+            if field.count_first:
+                _item(out, _REPORT_COUNT, field.count)
+                _item(out, _REPORT_SIZE, field.size)
+            else:
+                _item(out, _REPORT_SIZE, field.size)
+                _item(out, _REPORT_COUNT, field.count)
+            _item(out, field.main, field.flags)
+            if field.physical is not None:
+                # Back to "physical range is the logical range" for the next fields.
+                _item(out, _PHYSICAL_MINIMUM, 0)
+                _item(out, _PHYSICAL_MAXIMUM, 0)
+            if field.main == _FEATURE:
+                if field.names[0] is not None:
+                    low, high = field.physical or (field.minimum, field.maximum)
+                    feature_fields[field.names[0]] = (feature_offset, field.bits, low, high)
+                feature_offset += field.bits
+                continue
+            if len(field.names) == field.count:
+                for index, name in enumerate(field.names):
+                    if name is not None:
+                        fields[name] = (
+                            bit_offset + index * field.size,
+                            field.size,
+                            field.minimum,
+                            field.maximum,
+                        )
+            elif field.names[0] is not None:
+                fields[field.names[0]] = (bit_offset, field.bits, 0, (1 << field.bits) - 1)
+            bit_offset += field.bits
+        if bit_offset % 8 or feature_offset % 8:
+            raise ValueError("Report {} is not a whole number of bytes".format(report.report_id))
+        self.layouts[report.report_id] = Layout(
+            report.report_id, bit_offset // 8, fields, feature_offset // 8, feature_fields
+        )
+        return page
+
+    @property
+    def in_report_lengths(self):
+        """Report lengths in bytes, in the order of ``report_ids``."""
+        return tuple(self.layouts[report_id].length for report_id in self.report_ids)
+
+    def layout(self, report_id=None):
+        """The ``Layout`` of a report, of the first one by default."""
+        if report_id is None:
+            report_id = self.report_ids[0]
+        return self.layouts[report_id]
+
+    @property
+    def feature_report_lengths(self):
+        """Feature report lengths in bytes, in the order of ``report_ids``."""
+        return tuple(self.layouts[report_id].feature_length for report_id in self.report_ids)
+
+    def device(self):
+        """A ``usb_hid.Device`` for ``usb_hid.enable()`` in ``boot.py``.
+
+        CircuitPython keeps what the host writes to a feature report in the
+        buffer of the output reports, so the feature lengths go to
+        ``out_report_lengths`` and ``get_last_received_report()`` returns them.
+        """
+        import usb_hid  # pylint: disable=import-outside-toplevel
+
+        return usb_hid.Device(
+            report_descriptor=self.report_descriptor,
+            usage_page=self.usage_page,
+            usage=self.usage,
+            report_ids=self.report_ids,
+            in_report_lengths=self.in_report_lengths,
+            out_report_lengths=self.feature_report_lengths,
+        )
+
+
+def _item(out, tag, value, signed=False):
+    """Append a short item, using the smallest data size that holds ``value``."""
+    if signed:
+        if -0x80 <= value <= 0x7F:
+            size = 1
+        elif -0x8000 <= value <= 0x7FFF:
+            size = 2
+        else:
+            size = 4
+    elif value <= 0xFF:
+        size = 1
+    elif value <= 0xFFFF:
+        size = 2
+    else:
+        size = 4
+    out.append(tag | (3 if size == 4 else size))
+    for index in range(size):
+        out.append((value >> (8 * index)) & 0xFF)
+
+
+ABSOLUTE_MOUSE = Descriptor(
+    (
+        Report(
+            11,
+            (
+                buttons(5),
+                axes("x", "y", minimum=0, maximum=32767, bits=16),
+                wheel(bits=8),
+            ),
+        ),
+    )
+)
+"""The absolute mouse enabled by ``boot.py``, report ID 11, 6 byte reports."""
+
+SCROLL_MOUSE = Descriptor(
+    (
+        Report(
+            11,
+            (
+                buttons(5),
+                axes("x", "y", minimum=0, maximum=32767, bits=16),
+                high_resolution_wheel(bits=16, multiplier=8),
+                high_resolution_pan(bits=16, multiplier=8),
+            ),
+        ),
+    )
+)
+"""Absolute mouse with 16 bit high resolution wheel and pan, report ID 11, 9 byte reports.
+
+Both have a resolution multiplier of 8 in a 2 byte feature report.
+"""
+
+CHORD_MOUSE = Descriptor(
+    (
+        Report(
+            11,
+            (
+                buttons(5),
+                axes("x", "y", minimum=0, maximum=32767, bits=16),
+                wheel(bits=8),
+                modifiers(),
+            ),
+        ),
+    )
+)
+"""Absolute mouse with the keyboard modifiers in the same report, report ID 11, 7 bytes.
+
+The first 6 bytes are those of ``ABSOLUTE_MOUSE``, the modifier byte comes
+last. A modifier and a click then travel on one endpoint, in order (see
+``lib/chords.py``). Linux maps the keyboard usages of a mouse collection to
+keys; Windows and macOS only take them from a keyboard collection and ignore
+the byte, so ``chords.ChordPlanner`` keeps using a keyboard when it has one.
+"""
+
+
+def mouse_descriptor():
+    """The mouse ``boot.py`` enables, chosen by ``settings.toml``.
+
+    ``SCROLL_MOUSE`` with ``HID_HIGH_RES_SCROLL``, else ``CHORD_MOUSE`` with
+    ``HID_CHORD_MOUSE``, else ``ABSOLUTE_MOUSE``.
+
+    The drivers use its layout by default, so both sides always agree on the
+    report format. Raises ``ValueError`` when both are set: there is no
+    descriptor with both the high resolution wheel and the modifiers.
+    """
+    if setting("HID_HIGH_RES_SCROLL"):
+        if setting("HID_CHORD_MOUSE"):
+            raise ValueError("HID_HIGH_RES_SCROLL and HID_CHORD_MOUSE cannot both be set")
+        return SCROLL_MOUSE
+    if setting("HID_CHORD_MOUSE"):
+        return CHORD_MOUSE
+    return ABSOLUTE_MOUSE
@@ -0,0 +1,233 @@
+"""
+`hid_stats`
+====================================================
+
+Latency and error counters for HID reports.
+
+``InstrumentedDevice`` sits in front of a ``usb_hid.Device`` and times every
+``send_report()`` call into a ``ReportStats``. Nothing is measured unless a
+driver's device is wrapped, so there is no cost when instrumentation is off.
+
+Memory use is fixed: the latency histogram has ``BUCKETS`` buckets, bucket 0
+counts reports under 1.024 us and each following bucket doubles the limit. The
+last bucket also takes everything slower. The last ``RETRY_SLOTS`` refused
+reports are kept, to recognize them when they go through.
+
+A driver that probes its device when it is created sends before
+``instrument()`` can wrap it: wrap the devices first with
+``instrument_devices()`` to count those reports too.
+
+Examples::
+
+    stats = ReportStats()
+    mouse = AbsoluteMouse(stats.instrument_devices(usb_hid.devices))
+    ...
+    print(stats.format())
+"""
+
+import gc
+import struct
+import time
+from array import array
+
+BUCKETS = 16
+_FIRST_BUCKET_SHIFT = 10
+_HEADER = "<IIIIII"
+SNAPSHOT_SIZE = struct.calcsize(_HEADER) + 4 * BUCKETS
+"""Size in bytes of ``ReportStats.snapshot()``."""
+RETRY_SLOTS = 8
+"""Refused reports remembered at once, the oldest is forgotten first."""
+_SLOT_SIZE = 16
+
+try:
+    _mem_alloc = gc.mem_alloc
+except AttributeError:
+    _mem_alloc = None
+
+
+class ReportStats:
+    """Counters and latency histogram of the reports sent through a device."""
+
+    def __init__(self):
+        self.histogram = array("L", [0] * BUCKETS)
+        """Number of reports per latency bucket."""
+        self._snapshot = bytearray(SNAPSHOT_SIZE)
+        # Refused reports not sent since, compared on their first _SLOT_SIZE bytes
+        self._refused = bytearray(RETRY_SLOTS * _SLOT_SIZE)
+        self._refused_lengths = bytearray(RETRY_SLOTS)
+        self.reset()
+
+    def reset(self):
+        """Clear every counter."""
+        for bucket in range(BUCKETS):
+            self.histogram[bucket] = 0
+        self.sent = 0
+        """Reports accepted by ``send_report()``."""
+        self.failed = 0
+        """``send_report()`` calls that raised ``OSError``."""
+        self.retried = 0
+        """Reports that went through after being refused at least once."""
+        self.max_stall_ns = 0
+        """Slowest ``send_report()`` call, successful or not."""
+        self.gc_seen = 0
+        """Garbage collections detected between two reports."""
+        self.gc_gap_ns = 0
+        """Total time between two reports that had a collection between them.
+
+        An upper bound of the time lost to the garbage collector.
+        """
+        self._last_alloc = 0
+        self._last_end = 0
+        for slot in range(RETRY_SLOTS):
+            self._refused_lengths[slot] = 0
+        self._refused_count = 0
+        self._next_slot = 0
+
+    def record(self, start_ns, end_ns, ok, report):
+        """Account one ``send_report()`` call of ``report`` that ran from ``start_ns`` to ``end_ns``."""
+        latency = end_ns - start_ns
+        if latency > self.max_stall_ns:
+            self.max_stall_ns = latency
+        bucket = 0
+        latency >>= _FIRST_BUCKET_SHIFT
+        while latency and bucket < BUCKETS - 1:
+            latency >>= 1
+            bucket += 1
+        self.histogram[bucket] += 1
+        if ok:
+            self.sent += 1
+            if self._refused_count:
+                slot = self._find_refused(report)
+                if slot >= 0:
+                    self.retried += 1
+                    self._refused_lengths[slot] = 0
+                    self._refused_count -= 1
+        else:
+            self.failed += 1
+            if self._find_refused(report) < 0:
+                self._keep_refused(report)
+        if _mem_alloc is not None:
+            allocated = _mem_alloc()
+            if allocated < self._last_alloc and self._last_end:
+                self.gc_seen += 1
+                self.gc_gap_ns += start_ns - self._last_end
+            self._last_alloc = allocated
+        self._last_end = end_ns
+
+    def _find_refused(self, report):
+        """Slot of the kept refused report equal to ``report``, -1 if there is none."""
+        length = min(len(report), _SLOT_SIZE)
+        for slot in range(RETRY_SLOTS):
+            if self._refused_lengths[slot] != length:
+                continue
+            base = slot * _SLOT_SIZE
+            index = 0
+            while index < length and self._refused[base + index] == report[index]:
+                index += 1
+            if index == length:
+                return slot
+        return -1
+
+    def _keep_refused(self, report):
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % RETRY_SLOTS
+        if not self._refused_lengths[slot]:
+            self._refused_count += 1
+        length = min(len(report), _SLOT_SIZE)
+        base = slot * _SLOT_SIZE
+        for index in range(length):
+            self._refused[base + index] = report[index]
+        self._refused_lengths[slot] = length
+
+    def instrument(self, mouse):
+        """Wrap the HID device of ``mouse`` (any of the drivers) with an ``InstrumentedDevice``.
+
+        Reports the driver sent before, like the probe of its constructor, are
+        not counted: see ``instrument_devices()``.
+        """
+        # pylint: disable=protected-access
+        device = mouse._mouse_device
+        if device is not None and not isinstance(device, InstrumentedDevice):
+            mouse._mouse_device = InstrumentedDevice(device, self)
+        return mouse
+
+    def instrument_devices(self, devices):
+        """``devices`` with every device wrapped in an ``InstrumentedDevice``, to create a driver with.
+
+        :param devices: a sequence of ``usb_hid.Device``, usually ``usb_hid.devices``.
+        """
+        return tuple(
+            device if isinstance(device, InstrumentedDevice) else InstrumentedDevice(device, self)
+            for device in devices
+        )
+
+    def snapshot(self):
+        """Counters as ``SNAPSHOT_SIZE`` little endian bytes, for the serial port.
+
+        Six 32 bit values (sent, failed, retried, max stall in us, collections
+        seen, collection gap in us) followed by the histogram. The buffer is
+        reused by the next call.
+        """
+        struct.pack_into(
+            _HEADER,
+            self._snapshot,
+            0,
+            self.sent & 0xFFFFFFFF,
+            self.failed & 0xFFFFFFFF,
+            self.retried & 0xFFFFFFFF,
+            min(0xFFFFFFFF, self.max_stall_ns // 1000),
+            self.gc_seen & 0xFFFFFFFF,
+            min(0xFFFFFFFF, self.gc_gap_ns // 1000),
+        )
+        offset = struct.calcsize(_HEADER)
+        for bucket in range(BUCKETS):
+            struct.pack_into("<I", self._snapshot, offset + 4 * bucket, self.histogram[bucket])
+        return self._snapshot
+
+    def format(self):
+        """Counters as one line of text."""
+        return "sent={} failed={} retried={} max_stall_us={} gc={} gc_gap_us={} hist={}".format(
+            self.sent,
+            self.failed,
+            self.retried,
+            self.max_stall_ns // 1000,
+            self.gc_seen,
+            self.gc_gap_ns // 1000,
+            ",".join(str(count) for count in self.histogram),
+        )
+
+
+def bucket_limit_ns(bucket):
+    """Upper latency limit of a histogram bucket, in nanoseconds."""
+    return 1 << (bucket + _FIRST_BUCKET_SHIFT)
+
+
+class InstrumentedDevice:
+    """HID device wrapper that times every report into a ``ReportStats``.
+
+    :param device: the real ``usb_hid.Device``.
+    :param stats: the ``ReportStats`` to fill.
+    """
+
+    def __init__(self, device, stats):
+        self.device = device
+        self.stats = stats
+        self.usage_page = device.usage_page
+        self.usage = device.usage
+
+    def __getattr__(self, name):
+        # Everything but send_report(), feature reports included, is the device's
+        return getattr(self.device, name)
+
+    def send_report(self, report, report_id=None):
+        """Send the report, timing it and counting ``OSError`` failures."""
+        start = time.monotonic_ns()
+        try:
+            if report_id is None:
+                self.device.send_report(report)
+            else:
+                self.device.send_report(report, report_id)
+        except OSError:
+            self.stats.record(start, time.monotonic_ns(), False, report)
+            raise
+        self.stats.record(start, time.monotonic_ns(), True, report)
@@ -0,0 +1,128 @@
+"""
+`hid_util`
+====================================================
+
+Small helpers shared by the modules that send precomputed mouse reports
+themselves (``batch_click``, ``chords``, ``gestures``, ``hotspots``,
+``macro``, ``motion``, ``scroll``) and by the drivers, and ``setting()`` for
+the numeric entries of ``settings.toml``.
+"""
+
+import os
+import time
+
+MAX_COORD = 32767
+"""Largest absolute coordinate on both axes, the logical maximum of every
+mouse descriptor. ``screen_mapper`` and ``desktop`` scale to it too."""
+
+SPIN_NS = 2_000_000
+"""How long before a deadline ``wait_until()`` stops sleeping and spins."""
+
+
+def setting(name, default=0):
+    """Integer value of ``name`` in ``settings.toml``, ``default`` if it is not set.
+
+    ``os.getenv()`` returns an ``int`` for a number in ``settings.toml`` on the
+    board, but a ``str`` for an environment variable on a desktop, where
+    ``"0"`` would otherwise count as set.
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return int(value)
+
+
+def wait_until(deadline):
+    """Return when ``time.monotonic_ns()`` reaches ``deadline``.
+
+    Sleeps most of the way, then spins for the last ``SPIN_NS``: the sleep
+    alone wakes up late by a tick or more.
+    """
+    remaining = deadline - time.monotonic_ns()
+    if remaining <= 0:
+        return
+    if remaining > SPIN_NS:
+        time.sleep((remaining - SPIN_NS) / 1_000_000_000)
+    while time.monotonic_ns() < deadline:
+        pass
+
+
+def follow(mouse, report, length, sent=0):
+    """Make the driver's current report match ``report``, the last one sent past it.
+
+    Copies the first ``length`` bytes into ``mouse.report`` and, if the driver
+    keeps one, ``mouse._last_report``, and adds ``sent`` to
+    ``mouse.reports_sent`` if it counts them. Later driver calls then continue
+    from there.
+    """
+    if len(report) != length:
+        report = memoryview(report)[:length]
+    mouse.report[:length] = report
+    last = getattr(mouse, "_last_report", None)
+    if last is not None:
+        last[:length] = report
+    if sent and hasattr(mouse, "reports_sent"):
+        mouse.reports_sent += sent
+
+
+def limit_coord(coord):
+    """``coord`` clamped to 0 to ``MAX_COORD``."""
+    if coord > MAX_COORD:
+        return MAX_COORD
+    if coord < 0:
+        return 0
+    return coord
+
+
+class HandleCache:
+    """Compiled report sequences by small integer handle, the ``size`` most recently used.
+
+    ``store()`` gives every sequence a new handle and forgets the least
+    recently stored or looked up one beyond ``size``, so compiling for ever
+    new targets does not fill the heap. The handle of a forgotten sequence
+    raises ``KeyError``.
+    """
+
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.items = {}
+        """Sequences by handle."""
+        self._handles = {}
+        self._keys = {}
+        self._order = []
+        self._next_handle = 0
+
+    def lookup(self, key):
+        """Handle of the sequence stored under ``key``, now the most recently used, or ``None``."""
+        if key is None:
+            return None
+        handle = self._handles.get(key)
+        if handle is not None:
+            self._order.remove(handle)
+            self._order.append(handle)
+        return handle
+
+    def store(self, item, key=None):
+        """Keep ``item``, under ``key`` if given, and return its handle."""
+        if len(self._order) >= self.size:
+            evicted = self._order.pop(0)
+            del self.items[evicted]
+            evicted_key = self._keys.pop(evicted, None)
+            if evicted_key is not None:
+                del self._handles[evicted_key]
+        handle = self._next_handle
+        self._next_handle += 1
+        self.items[handle] = item
+        self._order.append(handle)
+        if key is not None:
+            self._handles[key] = handle
+            self._keys[handle] = key
+        return handle
+
+    def __getitem__(self, handle):
+        return self.items[handle]
+
+    def __len__(self):
+        return len(self.items)
@@ -0,0 +1,242 @@
+"""
+`hotspots`
+====================================================
+
+Named click targets, compiled once into ready-to-send mouse reports.
+
+Targets live in a text file, ``hotspots.txt`` on ``/sd`` or CIRCUITPY, one per
+line: a name, the pixel position and optionally the monitor from
+``desktop.Desktop``. Blank lines and ``#`` comments are skipped::
+
+    # name     x     y    [monitor]
+    submit   500  1400
+    search  1200    80    side
+
+``load()`` converts every position once and stores its report in one
+bytearray, so ``click_target()`` only looks the name up and sends: no
+conversion, no clamping, no allocation. A move keeps the buttons the driver
+holds, so moving to a target in the middle of a drag keeps dragging. Each target also gets a small integer
+id, its line order, for callers that skip the name lookup too.
+
+Examples::
+
+    hotspots = Hotspots(mouse, screen)
+    hotspots.load()
+    hotspots.click_target("submit")
+    ...
+    hotspots.reload()  # only reads the file again if it changed
+"""
+
+import os
+from array import array
+
+from hid_descriptor import mouse_descriptor
+from hid_util import follow
+
+FILE_NAME = "hotspots.txt"
+
+LEFT_BUTTON = 1
+"""Left mouse button."""
+
+
+class Hotspots:
+    """Registry of named targets for one mouse.
+
+    :param mouse: the driver the reports go through, any of them. Its
+        ``report`` (and ``_last_report`` if it keeps one) follows each target, so
+        later moves and clicks continue from there.
+    :param screen: the ``screen_mapper.ScreenMapper`` for targets without a monitor.
+    :param desktop: the ``desktop.Desktop`` for targets with a monitor.
+    """
+
+    def __init__(self, mouse, screen=None, desktop=None):
+        self.mouse = mouse
+        self.screen = screen
+        self.desktop = desktop
+        layout = getattr(mouse, "layout", None) or mouse_descriptor().layout()
+        self.report_length = layout.length
+        self._buttons_offset = layout.offset("buttons")
+        self._x_offset = layout.offset("x")
+        self._y_offset = layout.offset("y")
+        # Held state the moves carry over from the driver's report
+        self._held_offsets = tuple(
+            layout.offset(name) for name in ("buttons", "modifiers") if name in layout.fields
+        )
+        self._move = layout.new_report()
+        self.path = None
+        """File the targets were loaded from."""
+        self.names = []
+        """Target names, in id order."""
+        self.pixels = array("h")
+        """``x0, y0, x1, y1, ...`` pixel positions as written in the file."""
+        self.monitors = []
+        """Monitor of each target, ``None`` for the ``screen``."""
+        self._ids = {}
+        self._reports = bytearray(0)
+        self._views = []
+        self._stamp = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def id(self, name):
+        """Small integer id of the target ``name``, raises ``KeyError`` if unknown."""
+        return self._ids[name]
+
+    def load(self, path=None):
+        """Read and compile the targets of ``path``, replacing the current ones.
+
+        :param path: defaults to ``hotspots.txt`` under ``macro.default_root()``.
+
+        The registry is updated in place, so every reference to it stays valid.
+        Raises ``OSError`` if the file cannot be read and ``ValueError`` on a bad
+        line, leaving the current targets untouched.
+        """
+        if path is None:
+            from macro import macro_path  # pylint: disable=import-outside-toplevel
+
+            path = macro_path(FILE_NAME)
+        entries = []
+        with open(path) as source:
+            for number, line in enumerate(source, 1):
+                fields = line.split("#", 1)[0].split()
+                if not fields:
+                    continue
+                if len(fields) not in (3, 4):
+                    raise ValueError("{}:{}: expected name x y [monitor]".format(path, number))
+                monitor = fields[3] if len(fields) == 4 else None
+                entries.append((fields[0], int(fields[1]), int(fields[2]), monitor))
+        self.compile(entries)
+        self.path = path
+        self._stamp = _stamp(path)
+
+    def reload(self):
+        """Load the file again if it changed since the last ``load()``.
+
+        :return: ``True`` if the targets were reloaded. Cheap enough for a main loop:
+            one ``os.stat()`` when nothing changed.
+        """
+        if self.path is None:
+            return False
+        stamp = _stamp(self.path)
+        if stamp == self._stamp:
+            return False
+        self.load(self.path)
+        return True
+
+    def add(self, name, pixel_x, pixel_y, monitor=None):
+        """Add one target, or move it if ``name`` exists, keeping the others and their ids."""
+        entries = [
+            (other, self.pixels[2 * index], self.pixels[2 * index + 1], self.monitors[index])
+            for index, other in enumerate(self.names)
+        ]
+        entry = (name, pixel_x, pixel_y, monitor)
+        if name in self._ids:
+            entries[self._ids[name]] = entry
+        else:
+            entries.append(entry)
+        self.compile(entries)
+
+    def compile(self, entries):
+        """Replace the targets with ``(name, pixel_x, pixel_y, monitor)`` tuples.
+
+        Raises ``ValueError`` for a target with a monitor but no ``desktop``, or
+        without one and no ``screen``.
+        """
+        # Convert everything first: an unknown monitor leaves the targets untouched.
+        positions = array("H")
+        for name, pixel_x, pixel_y, monitor in entries:
+            if monitor is None and self.screen is None:
+                raise ValueError("{}: no screen for a target without a monitor".format(name))
+            if monitor is not None and self.desktop is None:
+                raise ValueError("{}: monitor {} needs a desktop".format(name, monitor))
+            if monitor is None:
+                positions.append(self.screen.map_x(pixel_x))
+                positions.append(self.screen.map_y(pixel_y))
+            else:
+                positions.extend(self.desktop.map(monitor, pixel_x, pixel_y))
+        step = self.report_length
+        reports = self._reports
+        if len(reports) < len(entries) * step:
+            reports = bytearray(len(entries) * step)
+            view = memoryview(reports)
+            self._views = [view[start:start + step] for start in range(0, len(reports), step)]
+            self._reports = reports
+        else:
+            for index in range(len(reports)):
+                reports[index] = 0
+        pixels = array("h")
+        names = []
+        monitors = []
+        ids = {}
+        for index, (name, pixel_x, pixel_y, monitor) in enumerate(entries):
+            x = positions[2 * index]
+            y = positions[2 * index + 1]
+            offset = index * step
+            reports[offset + self._x_offset] = x & 0xFF
+            reports[offset + self._x_offset + 1] = x >> 8
+            reports[offset + self._y_offset] = y & 0xFF
+            reports[offset + self._y_offset + 1] = y >> 8
+            ids[name] = index
+            names.append(name)
+            monitors.append(monitor)
+            pixels.append(pixel_x)
+            pixels.append(pixel_y)
+        self.names = names
+        self.pixels = pixels
+        self.monitors = monitors
+        self._ids = ids
+
+    def report(self, target):
+        """The preencoded report of ``target``, a name or an id, buttons released.
+
+        Raises ``KeyError`` for an unknown name and ``IndexError`` for an id
+        that is not a current target, like one that ``reload()`` dropped.
+        """
+        if not isinstance(target, int):
+            target = self._ids[target]
+        elif not 0 <= target < len(self.names):
+            raise IndexError("no target {}".format(target))
+        return self._views[target]
+
+    def position(self, target):
+        """Absolute ``(x, y)`` of ``target``, a name or an id."""
+        report = self.report(target)
+        return (
+            report[self._x_offset] | report[self._x_offset + 1] << 8,
+            report[self._y_offset] | report[self._y_offset + 1] << 8,
+        )
+
+    def move_to_target(self, target):
+        """Move the pointer to ``target``, a name or an id, keeping the buttons held."""
+        move = self._move
+        move[:] = self.report(target)
+        current = self.mouse.report
+        for offset in self._held_offsets:
+            move[offset] = current[offset]
+        self.mouse._mouse_device.send_report(move)  # pylint: disable=protected-access
+        follow(self.mouse, move, self.report_length)
+
+    def click_target(self, target, buttons=LEFT_BUTTON):
+        """Move to ``target`` and click ``buttons``, three reports.
+
+        The move is the preencoded report. The press and the release go through
+        the driver's ``press()`` and ``release()``, so its bookkeeping stays
+        right, and the release is sent even if the press fails.
+        """
+        self.move_to_target(target)
+        mouse = self.mouse
+        try:
+            mouse.press(buttons)
+        finally:
+            mouse.release(buttons)
+
+
+def _stamp(path):
+    """Size and modification time of ``path``, to notice edits."""
+    stat = os.stat(path)
+    return stat[6], stat[8]
+
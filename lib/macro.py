@@ -0,0 +1,254 @@
+"""
+`macro`
+====================================================
+
+Record HID reports with their timing to a file and play them back.
+
+A macro file is an 8 byte header followed by fixed-size records::
+
+    0-3   microseconds since the previous record, little endian
+    4     device index (``MOUSE`` or ``KEYBOARD``)
+    5     report length
+    6-15  the report, zero padded
+
+Reports of up to ``MAX_REPORT_LENGTH`` bytes fit, the 9 byte report of
+``hid_descriptor.SCROLL_MOUSE`` included. Version 1 files, with at most 8
+byte reports and bytes 14-15 reserved, play unchanged.
+
+Recording goes through ``RecordingDevice``, a pass-through HID device, so any
+driver can be recorded unchanged. Playback reads ``chunk_records`` records at a
+time into one reusable buffer, so memory use does not depend on the length of
+the macro. Deadlines are accumulated from the start time, so timing errors do
+not add up over a long run.
+
+Files go on the SD card when one is mounted at ``/sd``, or on CIRCUITPY, which
+``boot.py`` must make writable with ``storage.remount("/", readonly=False)``.
+On a desktop, pass any local directory as ``root``.
+"""
+
+import os
+import struct
+import time
+
+from hid_util import wait_until
+
+MAGIC = b"PMAC"
+VERSION = 2
+HEADER_SIZE = 8
+RECORD_SIZE = 16
+REPORT_OFFSET = 6
+MAX_REPORT_LENGTH = RECORD_SIZE - REPORT_OFFSET
+
+MOUSE = 0
+KEYBOARD = 1
+
+_RECORD = "<IBB"
+_MAX_DELTA_US = 0xFFFFFFFF
+
+
+def default_root():
+    """``/sd`` if an SD card is mounted there, else the root of CIRCUITPY."""
+    try:
+        if "placeholder.txt" not in os.listdir("/sd"):
+            return "/sd"
+    except OSError:
+        pass
+    return "/"
+
+
+def macro_path(name, root=None):
+    """Path of the macro file ``name`` under ``root`` (``default_root()`` by default)."""
+    if root is None:
+        root = default_root()
+    return root.rstrip("/") + "/" + name
+
+
+class MacroRecorder:
+    """Write timestamped reports to a macro file.
+
+    :param path: file to create, overwritten if it exists.
+    :param chunk_records: records buffered in RAM between two writes.
+    """
+
+    def __init__(self, path, chunk_records=32):
+        self._file = open(path, "wb")
+        header = bytearray(HEADER_SIZE)
+        header[0:4] = MAGIC
+        header[4] = VERSION
+        header[5] = RECORD_SIZE
+        self._file.write(header)
+        self._buffer = bytearray(RECORD_SIZE * chunk_records)
+        self._offset = 0
+        self._last_ns = None
+        self.count = 0
+        """Number of records written."""
+
+    def record(self, device_index, report):
+        """Append one report, timestamped now.
+
+        :raises ValueError: if ``report`` is longer than ``MAX_REPORT_LENGTH``.
+        """
+        length = len(report)
+        if length > MAX_REPORT_LENGTH:
+            raise ValueError("Report longer than {} bytes".format(MAX_REPORT_LENGTH))
+        now = time.monotonic_ns()
+        if self._last_ns is None:
+            delta_us = 0
+        else:
+            delta_us = min(_MAX_DELTA_US, (now - self._last_ns) // 1000)
+        self._last_ns = now
+        buffer = self._buffer
+        offset = self._offset
+        struct.pack_into(_RECORD, buffer, offset, delta_us, device_index, length)
+        start = offset + REPORT_OFFSET
+        for index in range(MAX_REPORT_LENGTH):
+            buffer[start + index] = report[index] if index < length else 0
+        self._offset = offset + RECORD_SIZE
+        self.count += 1
+        if self._offset == len(buffer):
+            self.flush()
+
+    def flush(self):
+        """Write the buffered records to the file."""
+        if self._offset:
+            self._file.write(memoryview(self._buffer)[: self._offset])
+            self._offset = 0
+        self._file.flush()
+
+    def close(self):
+        """Flush and close the file."""
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class RecordingDevice:
+    """HID device that records every report before forwarding it.
+
+    :param device: the real ``usb_hid.Device``, or ``None`` to record only.
+    :param recorder: a ``MacroRecorder``.
+    :param device_index: ``MOUSE`` or ``KEYBOARD``, stored with each record.
+
+    Examples::
+
+        recorder = MacroRecorder(macro_path("login.mac"))
+        mouse_device = find_device(usb_hid.devices, usage_page=0x1, usage=0x02)
+        mouse = AbsoluteMouse(RecordingDevice(mouse_device, recorder, MOUSE))
+    """
+
+    def __init__(self, device, recorder, device_index):
+        self._device = device
+        self._recorder = recorder
+        self._device_index = device_index
+        self.usage_page = device.usage_page if device else 0x01
+        self.usage = device.usage if device else (0x02 if device_index == MOUSE else 0x06)
+
+    def send_report(self, report, report_id=None):
+        """Record the report, then send it to the real device."""
+        self._recorder.record(self._device_index, report)
+        if self._device is not None:
+            self._device.send_report(report)
+
+
+class MacroPlayer:
+    """Stream a macro file to HID devices with its recorded timing.
+
+    :param path: the macro file.
+    :param devices: a sequence indexed by device index (``MOUSE``, ``KEYBOARD``)
+        of objects with ``send_report()``. ``None`` entries are skipped.
+    :param chunk_records: records read from the file at once.
+    """
+
+    def __init__(self, path, devices, chunk_records=32):
+        self.path = path
+        self.devices = devices
+        self._buffer = bytearray(RECORD_SIZE * chunk_records)
+        view = memoryview(self._buffer)
+        self._view = view
+        # One view per record slot and report length, built once.
+        self._reports = []
+        for slot in range(0, len(self._buffer), RECORD_SIZE):
+            start = slot + REPORT_OFFSET
+            self._reports.append(
+                [view[start : start + length] for length in range(MAX_REPORT_LENGTH + 1)]
+            )
+        self.played = 0
+        """Number of reports sent by the last ``play()``."""
+        self.max_error_ns = 0
+        """Largest lateness of a report in the last ``play()``."""
+        self.total_error_ns = 0
+        """Sum of the lateness of every report in the last ``play()``."""
+
+    @property
+    def mean_error_ns(self):
+        """Average lateness of a report in the last ``play()``."""
+        return self.total_error_ns // self.played if self.played else 0
+
+    def play(self, speed_percent=100):
+        """Play the whole macro, blocking until the last report is sent.
+
+        :param speed_percent: 200 plays twice as fast, 50 at half speed.
+        :raises ValueError: if ``speed_percent`` is not positive, if the file is
+            not a macro of version 1 or ``VERSION``, or if it ends in the middle
+            of a record. The records before are played.
+        """
+        if speed_percent <= 0:
+            raise ValueError("speed_percent must be positive")
+        self.played = 0
+        self.max_error_ns = 0
+        self.total_error_ns = 0
+        buffer = self._buffer
+        devices = self.devices
+        with open(self.path, "rb") as file:
+            header = file.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE or header[0:4] != MAGIC or header[5] != RECORD_SIZE:
+                raise ValueError("Not a macro file")
+            if not 1 <= header[4] <= VERSION:
+                raise ValueError("Macro file version {}, expected {}".format(header[4], VERSION))
+            deadline = time.monotonic_ns()
+            while True:
+                count = self._fill(file)
+                if not count:
+                    break
+                if count % RECORD_SIZE:
+                    raise ValueError("Macro file ends in the middle of a record")
+                for slot in range(count // RECORD_SIZE):
+                    offset = slot * RECORD_SIZE
+                    delta_us = (
+                        buffer[offset]
+                        | buffer[offset + 1] << 8
+                        | buffer[offset + 2] << 16
+                        | buffer[offset + 3] << 24
+                    )
+                    device_index = buffer[offset + 4]
+                    length = buffer[offset + 5]
+                    if length > MAX_REPORT_LENGTH or device_index >= len(devices):
+                        raise ValueError("Bad macro record")
+                    deadline += delta_us * 100_000 // speed_percent
+                    wait_until(deadline)
+                    device = devices[device_index]
+                    if device is not None:
+                        device.send_report(self._reports[slot][length])
+                    error = time.monotonic_ns() - deadline
+                    if error > self.max_error_ns:
+                        self.max_error_ns = error
+                    self.total_error_ns += error
+                    self.played += 1
+
+    def _fill(self, file):
+        """Read into the buffer until it is full or the file ends, return the bytes read.
+
+        ``readinto()`` can return less than asked before the end of the file.
+        """
+        count = file.readinto(self._buffer)
+        while count and count < len(self._buffer):
+            more = file.readinto(self._view[count:])
+            if not more:
+                break
+            count += more
+        return count
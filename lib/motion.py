@@ -0,0 +1,206 @@
+"""
+`motion`
+====================================================
+
+Smooth pointer motion: integer path generators and a frame-paced player.
+
+Paths are ``array('H')`` buffers of ``x0, y0, x1, y1, ...`` absolute
+coordinates, built with integer math only: ``linear()`` is a DDA, ``eased()``
+applies a smoothstep curve and ``bezier()`` a cubic Bezier curve, both in Q14
+fixed point so that every intermediate value stays a small integer on the
+board.
+
+``MotionEngine`` sends one point per frame on a fixed deadline schedule from
+``time.monotonic_ns()``, matched to the host polling interval. When it falls
+behind by more than a frame it jumps to the point that is due now instead of
+sending every late one, so lag never accumulates. It measures the achieved
+frame rate and the jitter of each frame against its deadline.
+
+Examples::
+
+    engine = MotionEngine(mouse, rate_hz=125)
+    engine.play(eased(0, 0, 16383, 16383, engine.frames_for(300_000_000)))
+"""
+
+import time
+from array import array
+
+from hid_util import limit_coord, wait_until
+
+_ONE = 1 << 14
+
+
+def _new_path(steps, out):
+    if steps < 1:
+        raise ValueError("steps must be at least 1")
+    if out is None:
+        out = array("H", bytes(4 * steps))
+    elif len(out) < 2 * steps:
+        raise ValueError("out holds fewer than steps points")
+    return out
+
+
+def linear(x0, y0, x1, y1, steps, out=None):
+    """Straight line from ``(x0, y0)`` to ``(x1, y1)`` in ``steps`` points.
+
+    The last point is exactly ``(x1, y1)``. Points off the screen are clamped
+    to its edges.
+    """
+    out = _new_path(steps, out)
+    dx = x1 - x0
+    dy = y1 - y0
+    for step in range(steps):
+        out[2 * step] = limit_coord(x0 + dx * (step + 1) // steps)
+        out[2 * step + 1] = limit_coord(y0 + dy * (step + 1) // steps)
+    return out
+
+
+def eased(x0, y0, x1, y1, steps, out=None):
+    """Straight line that accelerates then slows down (smoothstep easing).
+
+    Points off the screen are clamped to its edges, like in ``linear()``.
+    """
+    out = _new_path(steps, out)
+    dx = x1 - x0
+    dy = y1 - y0
+    for step in range(steps):
+        t = ((step + 1) << 14) // steps
+        # 3t^2 - 2t^3, in Q14
+        s = ((t * t) >> 14) * (3 * _ONE - 2 * t) >> 14
+        out[2 * step] = limit_coord(x0 + ((dx * s) >> 14))
+        out[2 * step + 1] = limit_coord(y0 + ((dy * s) >> 14))
+    out[2 * steps - 2] = limit_coord(x1)
+    out[2 * steps - 1] = limit_coord(y1)
+    return out
+
+
+def bezier(points, steps, out=None):
+    """Cubic Bezier curve through four ``(x, y)`` control points."""
+    out = _new_path(steps, out)
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = points
+    for step in range(steps):
+        t = ((step + 1) << 14) // steps
+        u = _ONE - t
+        t2 = (t * t) >> 14
+        u2 = (u * u) >> 14
+        b0 = (u2 * u) >> 14
+        b1 = (3 * u2 * t) >> 14
+        b2 = (3 * u * t2) >> 14
+        b3 = (t2 * t) >> 14
+        # One shift per term keeps every product under 2**30
+        out[2 * step] = limit_coord(
+            ((b0 * x0) >> 14) + ((b1 * x1) >> 14) + ((b2 * x2) >> 14) + ((b3 * x3) >> 14)
+        )
+        out[2 * step + 1] = limit_coord(
+            ((b0 * y0) >> 14) + ((b1 * y1) >> 14) + ((b2 * y2) >> 14) + ((b3 * y3) >> 14)
+        )
+    out[2 * steps - 2] = limit_coord(x3)
+    out[2 * steps - 1] = limit_coord(y3)
+    return out
+
+
+class MotionEngine:
+    """Play paths on a mouse at a fixed frame rate.
+
+    :param mouse: a driver with ``move_to(x, y)``.
+    :param rate_hz: frames per second, usually the host polling rate
+        (125 Hz for a full speed mouse polled every 8 ms).
+    """
+
+    def __init__(self, mouse, rate_hz=125):
+        self.mouse = mouse
+        self.rate_hz = rate_hz
+        self.period_ns = 1_000_000_000 // rate_hz
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.frames_sent = 0
+        """Frames sent by the last ``play()``."""
+        self.frames_dropped = 0
+        """Frames skipped because the engine was behind."""
+        self.elapsed_ns = 0
+        """Duration of the last ``play()``."""
+        self.max_jitter_ns = 0
+        """Largest distance between the start of a frame and its deadline."""
+        self.total_jitter_ns = 0
+        """Sum of the distance of every frame to its deadline."""
+
+    def frames_for(self, duration_ns):
+        """Number of frames that fit in ``duration_ns``, at least one."""
+        return max(1, duration_ns // self.period_ns)
+
+    @property
+    def achieved_rate_hz(self):
+        """Frames per second of the last ``play()``."""
+        if self.frames_sent < 2 or not self.elapsed_ns:
+            return 0
+        return (self.frames_sent - 1) * 1_000_000_000 // self.elapsed_ns
+
+    @property
+    def mean_jitter_ns(self):
+        """Average distance between a frame and its deadline."""
+        return self.total_jitter_ns // self.frames_sent if self.frames_sent else 0
+
+    def play(self, path, count=None):
+        """Send the points of ``path``, one per frame, blocking until done.
+
+        :param path: an ``array('H')`` of ``x, y`` pairs from the generators.
+        :param count: number of points to play, all of them by default.
+        """
+        count = self._begin(path, count)
+        period = self.period_ns
+        start = time.monotonic_ns()
+        frame = 0
+        while frame < count:
+            wait_until(start + frame * period)
+            frame = self._send_frame(path, frame, count, start)
+        self.elapsed_ns = time.monotonic_ns() - start
+
+    async def play_async(self, path, count=None):
+        """Like ``play()``, but waits with ``asyncio`` so other tasks keep running."""
+        from mouse_scheduler import sleep_until  # pylint: disable=import-outside-toplevel
+
+        count = self._begin(path, count)
+        period = self.period_ns
+        start = time.monotonic_ns()
+        frame = 0
+        while frame < count:
+            deadline = start + frame * period
+            if time.monotonic_ns() < deadline:
+                await sleep_until(deadline)
+            frame = self._send_frame(path, frame, count, start)
+        self.elapsed_ns = time.monotonic_ns() - start
+
+    def _begin(self, path, count):
+        """Reset the statistics and return the number of points to play."""
+        self._reset_stats()
+        points = len(path) // 2
+        if count is None:
+            return points
+        if not 0 <= count <= points:
+            raise ValueError("count out of range of the path")
+        return count
+
+    def _send_frame(self, path, frame, count, start):
+        """Send ``frame``, or the frame due now when behind, and return the next one."""
+        period = self.period_ns
+        deadline = start + frame * period
+        now = time.monotonic_ns()
+        if now - deadline >= period:
+            # Behind: jump to the frame that is due now, the host would
+            # only see the skipped ones as one merged move anyway.
+            due = min(count - 1, (now - start) // period)
+            self.frames_dropped += due - frame
+            frame = due
+            deadline = start + frame * period
+        self._account(time.monotonic_ns() - deadline)
+        self.mouse.move_to(path[2 * frame], path[2 * frame + 1])
+        return frame + 1
+
+    def _account(self, jitter):
+        if jitter < 0:
+            jitter = -jitter
+        if jitter > self.max_jitter_ns:
+            self.max_jitter_ns = jitter
+        self.total_jitter_ns += jitter
+        self.frames_sent += 1
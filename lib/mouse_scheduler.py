@@ -0,0 +1,247 @@
+"""
+`mouse_scheduler`
+====================================================
+
+Non-blocking mouse actions on top of ``asyncio``.
+
+``AsyncMouse`` wraps a blocking driver (anything with ``move_to``, ``press`` and
+``release``) and turns every delay between reports into an ``await``, so LED
+feedback and input handling keep running while a click is held down.
+``ActionScheduler`` runs a queue of actions, each one no earlier than its
+deadline, measured with ``time.monotonic_ns()``. Given a
+``gc_scheduler.GCScheduler``, it collects garbage while it waits, the hold of
+a click included, and marks every report it sends as a burst.
+
+Examples::
+
+    mouse = AsyncMouse(AbsoluteMouse(usb_hid.devices))
+    scheduler = ActionScheduler(mouse)
+    scheduler.click_at(16383, 16383)
+    asyncio.run(asyncio.gather(scheduler.run(stop_when_idle=True), blink(led)))
+"""
+
+import time
+import asyncio
+
+MOVE = 0
+PRESS = 1
+RELEASE = 2
+CLICK = 3
+WAIT = 4
+
+_NS_PER_S = 1_000_000_000
+_IDLE_WINDOW_NS = 1_000_000_000  # Empty queue: nothing due for at least this long
+
+
+async def sleep_until(deadline_ns):
+    """Yield to other tasks until ``time.monotonic_ns()`` reaches ``deadline_ns``.
+
+    Always yields at least once, so a late deadline still lets other tasks run.
+    """
+    delay = deadline_ns - time.monotonic_ns()
+    if delay > 0:
+        await asyncio.sleep(delay / _NS_PER_S)
+    else:
+        await asyncio.sleep(0)
+
+
+class AsyncMouse:
+    """Awaitable versions of the mouse actions.
+
+    :param mouse: a blocking mouse driver with ``move_to(x, y)``,
+        ``press(buttons)`` and ``release(buttons)``.
+    :param hold_ns: how long ``click()`` keeps the buttons down.
+    :param settle_ns: how long ``click_at()`` waits between the move and the click.
+    """
+
+    LEFT_BUTTON = 1
+    """Left mouse button."""
+    RIGHT_BUTTON = 2
+    """Right mouse button."""
+    MIDDLE_BUTTON = 4
+    """Middle mouse button."""
+
+    def __init__(self, mouse, *, hold_ns=50_000_000, settle_ns=100_000_000):
+        self.mouse = mouse
+        self.hold_ns = hold_ns
+        self.settle_ns = settle_ns
+
+    async def move_to(self, x, y):
+        """Move to absolute coordinates, then yield."""
+        self.mouse.move_to(x, y)
+        await asyncio.sleep(0)
+
+    async def press(self, buttons):
+        """Press the given buttons, then yield."""
+        self.mouse.press(buttons)
+        await asyncio.sleep(0)
+
+    async def release(self, buttons):
+        """Release the given buttons, then yield."""
+        self.mouse.release(buttons)
+        await asyncio.sleep(0)
+
+    async def click(self, buttons=LEFT_BUTTON, hold_ns=None):
+        """Press, wait ``hold_ns`` without blocking, release.
+
+        The buttons are released even if the task is cancelled while they are down.
+        """
+        if hold_ns is None:
+            hold_ns = self.hold_ns
+        self.mouse.press(buttons)
+        try:
+            await sleep_until(time.monotonic_ns() + hold_ns)
+        finally:
+            self.mouse.release(buttons)
+
+    async def click_at(self, x, y, buttons=LEFT_BUTTON):
+        """Move to absolute coordinates, let the host settle, then click.
+
+        Like ``click()``, releases the buttons if cancelled while they are down.
+        """
+        self.mouse.move_to(x, y)
+        await sleep_until(time.monotonic_ns() + self.settle_ns)
+        await self.click(buttons)
+
+
+class ActionScheduler:
+    """Queue of mouse actions executed on deadlines.
+
+    :param mouse: an ``AsyncMouse``.
+    :param capacity: most actions waiting at once, ``submit()`` refuses more.
+    :param collector: optional ``gc_scheduler.GCScheduler``. Its ``idle()`` runs
+        before every wait and each report is sent inside its ``burst()``; no
+        burst spans an ``await``, so other tasks never run with the automatic
+        collector off.
+
+    Each action is a ``[kind, a, b, not_before_ns]`` record. ``kind`` is one of
+    ``MOVE`` (``a``, ``b`` = x, y), ``PRESS``, ``RELEASE``, ``CLICK`` (``a`` =
+    buttons) or ``WAIT`` (``a`` = nanoseconds). The records are preallocated,
+    ``capacity`` of them in a ring, so queueing an action does not allocate and
+    taking the next one does not move the others.
+    """
+
+    def __init__(self, mouse, *, capacity=64, collector=None):
+        self.mouse = mouse
+        self.capacity = capacity
+        self.collector = collector
+        self.completed = 0
+        """Number of actions executed so far."""
+        self._ring = [[0, 0, 0, 0] for _ in range(capacity)]
+        self._head = 0
+        self._count = 0
+        self._wakeup = asyncio.Event()
+        self._running = False
+
+    def __len__(self):
+        return self._count
+
+    def submit(self, kind, a=0, b=0, not_before_ns=0):
+        """Queue one action, returns ``False`` if the queue is full."""
+        if self._count >= self.capacity:
+            return False
+        record = self._ring[(self._head + self._count) % self.capacity]
+        record[0] = kind
+        record[1] = a
+        record[2] = b
+        record[3] = not_before_ns
+        self._count += 1
+        self._wakeup.set()
+        return True
+
+    def move_to(self, x, y):
+        """Queue a move to absolute coordinates."""
+        return self.submit(MOVE, x, y)
+
+    def press(self, buttons):
+        """Queue a button press."""
+        return self.submit(PRESS, buttons)
+
+    def release(self, buttons):
+        """Queue a button release."""
+        return self.submit(RELEASE, buttons)
+
+    def click(self, buttons=AsyncMouse.LEFT_BUTTON):
+        """Queue a click at the current position."""
+        return self.submit(CLICK, buttons)
+
+    def wait(self, duration_ns):
+        """Queue a pause, other tasks keep running during it."""
+        return self.submit(WAIT, duration_ns)
+
+    def click_at(self, x, y, buttons=AsyncMouse.LEFT_BUTTON):
+        """Queue a move, the settle delay and a click."""
+        if self._count + 3 > self.capacity:
+            return False
+        self.submit(MOVE, x, y)
+        self.submit(WAIT, self.mouse.settle_ns)
+        self.submit(CLICK, buttons)
+        return True
+
+    def stop(self):
+        """Make ``run()`` return once the queue is empty."""
+        self._running = False
+        self._wakeup.set()
+
+    async def run(self, stop_when_idle=False):
+        """Execute queued actions until stopped.
+
+        :param stop_when_idle: return as soon as the queue is empty instead of
+            waiting for more actions.
+        """
+        ring = self._ring
+        collector = self.collector
+        self._running = True
+        while True:
+            if not self._count:
+                if stop_when_idle or not self._running:
+                    return
+                if collector is not None:
+                    collector.idle(_IDLE_WINDOW_NS)
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            kind, a, b, not_before_ns = ring[self._head]
+            self._head = (self._head + 1) % self.capacity
+            self._count -= 1
+            if not_before_ns:
+                if collector is not None:
+                    collector.idle(not_before_ns - time.monotonic_ns())
+                await sleep_until(not_before_ns)
+            if kind == WAIT:
+                await self._wait(a)
+            elif kind == CLICK:
+                self._send(PRESS, a)
+                try:
+                    await self._wait(self.mouse.hold_ns)
+                finally:
+                    self._send(RELEASE, a)
+            else:
+                self._send(kind, a, b)
+                await asyncio.sleep(0)
+            self.completed += 1
+
+    async def _wait(self, duration_ns):
+        """Sleep ``duration_ns`` without blocking, collecting first if it fits."""
+        deadline = time.monotonic_ns() + duration_ns
+        if self.collector is not None:
+            self.collector.idle(duration_ns)
+        await sleep_until(deadline)
+
+    def _send(self, kind, a, b=0):
+        """One report through the blocking driver, inside a burst if collecting."""
+        collector = self.collector
+        if collector is None:
+            self._dispatch(kind, a, b)
+            return
+        with collector.burst():
+            self._dispatch(kind, a, b)
+
+    def _dispatch(self, kind, a, b):
+        driver = self.mouse.mouse
+        if kind == MOVE:
+            driver.move_to(a, b)
+        elif kind == PRESS:
+            driver.press(a)
+        elif kind == RELEASE:
+            driver.release(a)
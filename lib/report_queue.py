@@ -0,0 +1,357 @@
+"""
+`report_queue`
+====================================================
+
+Non-blocking report queue between the HID drivers and ``usb_hid``.
+
+``usb_hid.Device.send_report()`` raises ``OSError`` while the host is not
+ready. ``ReportQueue`` stands in for the device: ``send_report()`` copies the
+report into a fixed-size ring buffer and sends what it can right away. When the
+host refuses a report, the queue stops trying for a while, doubling the wait
+after every failure up to ``max_backoff_ns``, and the caller carries on. Queued
+reports go out with ``drain()``, called from a loop, or with ``run()`` as an
+``asyncio`` task.
+
+A report that changes the buttons (the ``state_bytes``) or turns the wheel
+is never dropped or merged: losing a release would leave a button down on
+the host. Only plain moves are. What happens when the ring is full depends
+on ``policy``:
+
+* ``DROP_OLDEST`` drops the oldest queued move.
+* ``COALESCE`` replaces the newest queued report when both only move the
+  pointer (same buttons, no wheel), so the latest position wins. Anything else
+  is handled like ``DROP_OLDEST``.
+* ``BLOCK`` waits for the host, at most ``block_timeout_ns``, then drops the
+  oldest queued move.
+
+Only ``BLOCK`` ever sleeps in ``enqueue()``; the other policies try the host
+once. When no queued report is a plain move and the host took nothing, the
+queue raises ``OSError`` for the new report, which the driver then has not
+sent: after ``block_timeout_ns`` with ``BLOCK``, right away otherwise.
+
+Memory use is fixed: one ring of ``capacity`` reports, allocated once.
+
+Examples::
+
+    mouse = AbsoluteMouse(usb_hid.devices)
+    queue = queue_mouse(mouse, capacity=32)
+    asyncio.create_task(queue.run())
+"""
+
+import time
+
+DROP_OLDEST = 0
+COALESCE = 1
+BLOCK = 2
+
+_NS_PER_S = 1_000_000_000
+
+
+class ReportQueue:
+    """Fixed capacity ring of reports in front of one HID device.
+
+    :param device: the ``usb_hid.Device`` (or wrapper) that sends the reports.
+    :param report_length: size in bytes of one report.
+    :param capacity: number of reports the ring holds.
+    :param policy: ``DROP_OLDEST``, ``COALESCE`` or ``BLOCK``.
+    :param state_bytes: offsets of the bytes that must match for ``COALESCE``
+        to merge two reports, the buttons for a mouse.
+    :param relative_bytes: offsets of the bytes that must be zero in both
+        reports for ``COALESCE`` to merge them, the wheel for a mouse.
+    :param min_backoff_ns: wait after the first failure.
+    :param max_backoff_ns: longest wait between two attempts.
+    :param block_timeout_ns: longest time ``BLOCK`` waits for room. The other
+        policies never wait.
+    """
+
+    def __init__(
+        self,
+        device,
+        report_length,
+        capacity=16,
+        policy=COALESCE,
+        *,
+        state_bytes=(),
+        relative_bytes=(),
+        min_backoff_ns=1_000_000,
+        max_backoff_ns=128_000_000,
+        block_timeout_ns=250_000_000,
+    ):
+        self.device = device
+        self.usage_page = device.usage_page
+        self.usage = device.usage
+        self.report_length = report_length
+        self.capacity = capacity
+        self.policy = policy
+        self.state_bytes = tuple(state_bytes)
+        self.relative_bytes = tuple(relative_bytes)
+        self.min_backoff_ns = min_backoff_ns
+        self.max_backoff_ns = max_backoff_ns
+        self.block_timeout_ns = block_timeout_ns
+        self._ring = bytearray(capacity * report_length)
+        # One memoryview per slot, built once so sending allocates nothing.
+        view = memoryview(self._ring)
+        self._slots = [
+            view[slot * report_length:(slot + 1) * report_length] for slot in range(capacity)
+        ]
+        self._head = 0
+        # Buttons of the last report the host took, to tell moves from changes.
+        self._sent_state = bytearray(report_length)
+        self.pending = 0
+        """Reports waiting in the ring."""
+        self._backoff_ns = 0
+        self._retry_at = 0
+        self.sent = 0
+        """Reports the device accepted."""
+        self.failed = 0
+        """Attempts the device refused with ``OSError``."""
+        self.dropped = 0
+        """Moves lost because the ring was full."""
+        self.coalesced = 0
+        """Reports merged into the newest queued one."""
+        self.high_water = 0
+        """Largest number of reports waiting at once."""
+
+    @property
+    def ready(self):
+        """``True`` unless the queue is waiting out a backoff after a failure."""
+        return not self._backoff_ns or time.monotonic_ns() >= self._retry_at
+
+    def send_report(self, report, report_id=None):
+        """Queue a copy of ``report`` and send as much of the queue as the host takes.
+
+        Same signature as ``usb_hid.Device.send_report()``, so drivers use the queue
+        in place of their device. Raises ``OSError`` only when the ring is full of
+        button changes the host did not take, see ``enqueue()``.
+        ``report_id`` is not kept: a queue serves a device with a single report.
+        """
+        self.enqueue(report)
+        self.drain()
+
+    def enqueue(self, report):
+        """Copy ``report`` into the ring without sending anything.
+
+        :return: ``False`` if a queued move had to be dropped to make room.
+        :raises OSError: if the ring stayed full of button changes: after
+            ``block_timeout_ns`` with ``BLOCK``, at once with the other policies.
+        """
+        kept = True
+        if self.pending == self.capacity:
+            policy = self.policy
+            if policy == COALESCE and self._merges(report):
+                self._copy(report, self._slot(self.pending - 1))
+                self.coalesced += 1
+                return True
+            if policy == BLOCK:
+                self._wait_for_room()
+            else:
+                # One try, no sleep: a host that is not ready is the queue's
+                # problem, not the caller's.
+                self.drain()
+            if self.pending == self.capacity:
+                if self._drop_move():
+                    kept = False
+                else:
+                    raise OSError("Report queue full of button changes")
+        self._copy(report, self._slot(self.pending))
+        self.pending += 1
+        if self.pending > self.high_water:
+            self.high_water = self.pending
+        return kept
+
+    def drain(self, limit=None):
+        """Send queued reports until the ring is empty or the host refuses one.
+
+        :param limit: most reports to send in this call, all of them by default.
+        :return: the number of reports sent.
+
+        Does nothing while a backoff is running, so it is cheap to call often.
+        """
+        if self._backoff_ns and time.monotonic_ns() < self._retry_at:
+            return 0
+        count = 0
+        send_report = self.device.send_report
+        while self.pending and (limit is None or count < limit):
+            try:
+                send_report(self._slots[self._head])
+            except OSError:
+                self.failed += 1
+                backoff = self._backoff_ns * 2 if self._backoff_ns else self.min_backoff_ns
+                if backoff > self.max_backoff_ns:
+                    backoff = self.max_backoff_ns
+                self._backoff_ns = backoff
+                self._retry_at = time.monotonic_ns() + backoff
+                break
+            self._backoff_ns = 0
+            slot = self._slots[self._head]
+            for index in self.state_bytes:
+                self._sent_state[index] = slot[index]
+            self._head = (self._head + 1) % self.capacity
+            self.pending -= 1
+            self.sent += 1
+            count += 1
+        return count
+
+    def flush(self, timeout_ns=None):
+        """Block until the ring is empty or ``timeout_ns`` ran out.
+
+        :return: ``True`` if every report went out.
+        """
+        deadline = None if timeout_ns is None else time.monotonic_ns() + timeout_ns
+        while self.pending:
+            self.drain()
+            if not self.pending:
+                break
+            now = time.monotonic_ns()
+            if deadline is not None and now >= deadline:
+                return False
+            wait = self._retry_at - now
+            if deadline is not None and deadline - now < wait:
+                wait = deadline - now
+            if wait > 0:
+                time.sleep(wait / _NS_PER_S)
+        return True
+
+    async def run(self, idle_ns=1_000_000):
+        """Keep draining the queue, as an ``asyncio`` task that never returns.
+
+        :param idle_ns: how long to sleep when there is nothing to send.
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        while True:
+            self.drain()
+            wait = idle_ns
+            if self.pending and self._backoff_ns:
+                wait = self._retry_at - time.monotonic_ns()
+            if wait > 0:
+                await asyncio.sleep(wait / _NS_PER_S)
+            else:
+                await asyncio.sleep(0)
+
+    def clear(self):
+        """Forget every queued report, any running backoff and the buttons last sent.
+
+        The next report is then taken as a change from a released mouse, so it
+        is never dropped as a move of a state the host may not have.
+        """
+        self._head = 0
+        self.pending = 0
+        self._backoff_ns = 0
+        self._retry_at = 0
+        for index in range(self.report_length):
+            self._sent_state[index] = 0
+
+    def format(self):
+        """Counters as one line of text."""
+        return "sent={} failed={} dropped={} coalesced={} pending={} high_water={}".format(
+            self.sent, self.failed, self.dropped, self.coalesced, self.pending, self.high_water
+        )
+
+    def _slot(self, index):
+        """Slot ``index`` places after the oldest queued report."""
+        return self._slots[(self._head + index) % self.capacity]
+
+    def _copy(self, report, slot):
+        # Byte by byte: a slice assignment would allocate a slice object.
+        for index in range(self.report_length):
+            slot[index] = report[index]
+
+    def _merges(self, report):
+        """Whether ``report`` can replace the newest queued report."""
+        newest = self._slot(self.pending - 1)
+        for index in self.state_bytes:
+            if report[index] != newest[index]:
+                return False
+        for index in self.relative_bytes:
+            if report[index] or newest[index]:
+                return False
+        return True
+
+    def _drop_move(self):
+        """Drop the oldest queued report that only moves, ``False`` if there is none.
+
+        A move keeps the buttons of the report before it and turns no wheel.
+        """
+        previous = self._sent_state
+        for index in range(self.pending):
+            slot = self._slot(index)
+            if self._is_move(slot, previous):
+                if index == 0:
+                    self._head = (self._head + 1) % self.capacity
+                else:
+                    # Close the gap: the later reports move one slot up.
+                    for later in range(index, self.pending - 1):
+                        self._copy(self._slot(later + 1), self._slot(later))
+                self.pending -= 1
+                self.dropped += 1
+                return True
+            previous = slot
+        return False
+
+    def _is_move(self, report, previous):
+        for index in self.state_bytes:
+            if report[index] != previous[index]:
+                return False
+        for index in self.relative_bytes:
+            if report[index]:
+                return False
+        return True
+
+    def _wait_for_room(self):
+        """Drain, sleeping out the backoffs, until a slot is free or the timeout ran out."""
+        deadline = time.monotonic_ns() + self.block_timeout_ns
+        while self.pending == self.capacity:
+            self.drain()
+            now = time.monotonic_ns()
+            if self.pending < self.capacity or now >= deadline:
+                return
+            wait = self._retry_at - now
+            if deadline - now < wait:
+                wait = deadline - now
+            if wait > 0:
+                time.sleep(wait / _NS_PER_S)
+
+
+def queue_mouse(mouse, capacity=16, policy=COALESCE, **kwargs):
+    """Put a ``ReportQueue`` between ``mouse`` (any of the drivers) and its device.
+
+    The buttons, wheel and pan positions come from ``mouse.layout`` when the driver
+    has one, the default 6 byte report otherwise. Returns the queue.
+    """
+    # pylint: disable=protected-access
+    if isinstance(mouse._mouse_device, ReportQueue):
+        return mouse._mouse_device
+    layout = getattr(mouse, "layout", None)
+    if layout is None:
+        length = len(mouse.report)
+        state_bytes = (0,)
+        relative_bytes = (5,)
+    else:
+        length = layout.length
+        state_bytes = (layout.offset("buttons"),)
+        relative_bytes = ()
+        for name in ("wheel", "pan"):
+            if name in layout.fields:
+                bit, bits = layout.fields[name][:2]
+                relative_bytes += tuple(range(bit // 8, (bit + bits + 7) // 8))
+    kwargs.setdefault("state_bytes", state_bytes)
+    kwargs.setdefault("relative_bytes", relative_bytes)
+    mouse._mouse_device = ReportQueue(mouse._mouse_device, length, capacity, policy, **kwargs)
+    return mouse._mouse_device
+
+
+def queue_keyboard(keyboard, capacity=16, policy=BLOCK, **kwargs):
+    """Put a ``ReportQueue`` between an ``adafruit_hid`` ``Keyboard`` and its device.
+
+    Every keyboard report changes which keys are down, so none of them are ever
+    merged. Returns the queue.
+    """
+    # pylint: disable=protected-access
+    if isinstance(keyboard._keyboard_device, ReportQueue):
+        return keyboard._keyboard_device
+    kwargs.setdefault("state_bytes", range(len(keyboard.report)))
+    keyboard._keyboard_device = ReportQueue(
+        keyboard._keyboard_device, len(keyboard.report), capacity, policy, **kwargs
+    )
+    return keyboard._keyboard_device
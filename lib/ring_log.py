@@ -0,0 +1,192 @@
+"""
+`ring_log`
+====================================================
+
+Leveled logging that stays out of the HID hot path.
+
+``print()`` formats a string, which allocates, and then writes it to the USB
+console, which blocks while the host is not reading. ``RingLogger`` does
+neither when a message is logged: it stores the message id, the level, a
+millisecond timestamp and up to four integers in a fixed ring of ``array``
+slots. Formatting and writing happen in ``flush()``, called from the main loop
+or the ``run()`` task when nothing urgent is going on.
+
+Messages are format strings registered once with ``message()``. Calls below the
+logger's level go to a method that returns right away, so disabled logging
+costs one call.
+
+Examples::
+
+    log = RingLogger(level=INFO)
+    MOVED = log.message("Moving to pixel ({}, {}) = absolute ({}, {})")
+    ...
+    log.info(MOVED, pixel_x, pixel_y, x, y)
+    ...
+    log.flush()
+"""
+
+import sys
+import time
+from array import array
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+
+    def ticks_ms():
+        """Milliseconds, wrapping at 2**29 like ``supervisor.ticks_ms()``."""
+        return (time.monotonic_ns() // 1_000_000) & 0x1FFFFFFF
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+"""Level that disables every message."""
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+_FIELDS = 7  # ticks, level, message, four arguments
+
+
+def _ignore(message, a=0, b=0, c=0, d=0):  # pylint: disable=unused-argument
+    """Stand-in for the methods of the disabled levels."""
+
+
+class RingLogger:
+    """Fixed size ring of log records, formatted when flushed.
+
+    :param capacity: records kept between two flushes. When full, the oldest
+        record is overwritten and counted in ``dropped``.
+    :param level: lowest level recorded.
+    :param path: file to append the lines to, for example on ``/sd``. Lines go
+        to the serial console when ``None``.
+    """
+
+    def __init__(self, capacity=64, level=INFO, path=None):
+        self.capacity = capacity
+        self.path = path
+        self._records = array("l", [0] * (capacity * _FIELDS))
+        self._head = 0
+        self.pending = 0
+        """Records waiting for ``flush()``."""
+        self.dropped = 0
+        """Records overwritten before they were flushed."""
+        self._messages = []
+        self.level = OFF
+        self.set_level(level)
+
+    def message(self, text):
+        """Register the format string ``text``, returns its id for the logging calls.
+
+        ``text`` is formatted with ``str.format()`` and the integer arguments of the
+        call, unused ones are ignored. Register messages at import time, not in
+        the hot path.
+        """
+        self._messages.append(text)
+        return len(self._messages) - 1
+
+    def set_level(self, level):
+        """Record ``level`` and above from now on."""
+        self.level = level
+        self.debug = self._debug if level <= DEBUG else _ignore
+        self.info = self._info if level <= INFO else _ignore
+        self.warning = self._warning if level <= WARNING else _ignore
+        self.error = self._error if level <= ERROR else _ignore
+
+    def enabled(self, level):
+        """Whether messages of ``level`` are recorded, to skip computing arguments."""
+        return level >= self.level
+
+    def log(self, level, message, a=0, b=0, c=0, d=0):
+        """Record ``message`` with up to four integer arguments at ``level``.
+
+        Integers must fit in 32 bits. Nothing is allocated.
+        """
+        if level >= self.level:
+            self._record(level, message, a, b, c, d)
+
+    def _record(self, level, message, a, b, c, d):
+        if self.pending == self.capacity:
+            self._head = (self._head + 1) % self.capacity
+            self.pending -= 1
+            self.dropped += 1
+        base = (self._head + self.pending) % self.capacity * _FIELDS
+        records = self._records
+        records[base] = ticks_ms()
+        records[base + 1] = level
+        records[base + 2] = message
+        records[base + 3] = a
+        records[base + 4] = b
+        records[base + 5] = c
+        records[base + 6] = d
+        self.pending += 1
+
+    def _debug(self, message, a=0, b=0, c=0, d=0):
+        self._record(DEBUG, message, a, b, c, d)
+
+    def _info(self, message, a=0, b=0, c=0, d=0):
+        self._record(INFO, message, a, b, c, d)
+
+    def _warning(self, message, a=0, b=0, c=0, d=0):
+        self._record(WARNING, message, a, b, c, d)
+
+    def _error(self, message, a=0, b=0, c=0, d=0):
+        self._record(ERROR, message, a, b, c, d)
+
+    def lines(self, limit=None):
+        """Format and remove up to ``limit`` records, oldest first, as strings."""
+        result = []
+        records = self._records
+        while self.pending and (limit is None or len(result) < limit):
+            base = self._head * _FIELDS
+            text = self._messages[records[base + 2]].format(
+                records[base + 3], records[base + 4], records[base + 5], records[base + 6]
+            )
+            level = records[base + 1]
+            result.append(
+                "{} {} {}".format(records[base], LEVEL_NAMES.get(level, level), text)
+            )
+            self._head = (self._head + 1) % self.capacity
+            self.pending -= 1
+        if self.dropped and not self.pending:
+            result.append("{} WARNING {} log records dropped".format(ticks_ms(), self.dropped))
+            self.dropped = 0
+        return result
+
+    def flush(self, limit=None):
+        """Write up to ``limit`` records to the console or to ``path``.
+
+        :return: the number of lines written. Call it where a few milliseconds
+            of blocking do not matter.
+        """
+        lines = self.lines(limit)
+        if not lines:
+            return 0
+        if self.path is not None:
+            try:
+                with open(self.path, "a") as log_file:
+                    for line in lines:
+                        log_file.write(line)
+                        log_file.write("\n")
+                return len(lines)
+            except OSError:
+                # Read-only filesystem or no card: the console still works.
+                self.path = None
+        return self._console(lines)
+
+    @staticmethod
+    def _console(lines):
+        for line in lines:
+            sys.stdout.write(line)
+            sys.stdout.write("\n")
+        return len(lines)
+
+    async def run(self, interval_ns=250_000_000, limit=8):
+        """Flush at most ``limit`` records every ``interval_ns``, as an ``asyncio`` task."""
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        while True:
+            await asyncio.sleep(interval_ns / 1_000_000_000)
+            self.flush(limit)
@@ -0,0 +1,114 @@
+"""
+`screen_mapper`
+====================================================
+
+Convert screen pixels to absolute mouse coordinates (0-32767) without floats.
+
+A ``ScreenMapper`` is built once per resolution. By default it precomputes one
+``array('H')`` lookup table per axis, so a conversion is a bounds check and an
+index. With ``tables=False`` it uses integer arithmetic instead, which saves the
+RAM of the tables (2 bytes per pixel) at the cost of a multiply and a divide.
+Neither path allocates for a single axis.
+"""
+
+from array import array
+
+from hid_util import MAX_COORD
+
+
+class ScreenMapper:
+    """Pixel to absolute coordinate mapper for one screen resolution.
+
+    :param width: screen width in pixels.
+    :param height: screen height in pixels.
+    :param tables: precompute lookup tables (faster, uses ``2 * (width + height)``
+        bytes of RAM).
+
+    Examples::
+
+        screen = ScreenMapper(2560, 1440)
+        mouse.move_to(screen.map_x(500), screen.map_y(1400))
+    """
+
+    def __init__(self, width, height, *, tables=True):
+        if width <= 0 or height <= 0:
+            raise ValueError("Screen size must be positive")
+        self.width = width
+        self.height = height
+        if tables:
+            self._x_table = self._build_table(width)
+            self._y_table = self._build_table(height)
+            self.map_x = self._table_x
+            self.map_y = self._table_y
+        else:
+            self._x_table = None
+            self._y_table = None
+            self.map_x = self._scale_x
+            self.map_y = self._scale_y
+
+    @staticmethod
+    def _build_table(size):
+        # Same result as int(pixel / size * 32767), computed with integers.
+        table = array("H", bytes(2 * size))
+        for pixel in range(size):
+            table[pixel] = pixel * MAX_COORD // size
+        return table
+
+    def _table_x(self, pixel_x):
+        """Absolute x coordinate of ``pixel_x``, clamped to the screen."""
+        if pixel_x <= 0:
+            return 0
+        if pixel_x >= self.width:
+            return MAX_COORD
+        return self._x_table[pixel_x]
+
+    def _table_y(self, pixel_y):
+        """Absolute y coordinate of ``pixel_y``, clamped to the screen."""
+        if pixel_y <= 0:
+            return 0
+        if pixel_y >= self.height:
+            return MAX_COORD
+        return self._y_table[pixel_y]
+
+    def _scale_x(self, pixel_x):
+        """Absolute x coordinate of ``pixel_x``, clamped to the screen."""
+        if pixel_x <= 0:
+            return 0
+        if pixel_x >= self.width:
+            return MAX_COORD
+        return pixel_x * MAX_COORD // self.width
+
+    def _scale_y(self, pixel_y):
+        """Absolute y coordinate of ``pixel_y``, clamped to the screen."""
+        if pixel_y <= 0:
+            return 0
+        if pixel_y >= self.height:
+            return MAX_COORD
+        return pixel_y * MAX_COORD // self.height
+
+    def map(self, pixel_x, pixel_y):
+        """Convert one pixel position, returns an ``(x, y)`` tuple.
+
+        The tuple is the only allocation. Use ``map_x()`` and ``map_y()`` in hot
+        loops to avoid it.
+        """
+        return self.map_x(pixel_x), self.map_y(pixel_y)
+
+    def map_many(self, points, out=None):
+        """Convert a list of ``(pixel_x, pixel_y)`` points in one call.
+
+        :param points: a sequence of ``(pixel_x, pixel_y)`` tuples.
+        :param out: optional ``array('H')`` of at least ``2 * len(points)`` items
+            to fill. A new one is allocated if not given.
+        :return: the array, holding ``x0, y0, x1, y1, ...``.
+        """
+        if out is None:
+            out = array("H", bytes(4 * len(points)))
+        map_x = self.map_x
+        map_y = self.map_y
+        index = 0
+        for pixel_x, pixel_y in points:
+            out[index] = map_x(pixel_x)
+            out[index + 1] = map_y(pixel_y)
+            index += 2
+        return out
@@ -0,0 +1,200 @@
+"""
+`scroll`
+====================================================
+
+Wheel and pan scrolling with fractional accumulation and paced reports.
+
+Amounts are in 1/120 of a detent (``WHEEL_DELTA``, the unit Windows and most
+toolkits use), so a touchpad style ``add(13)`` is not lost: what does not make
+a whole wheel count yet stays in the accumulator until the next call, and the
+sum of what goes out is always the sum of what came in.
+
+One wheel count is one detent on a plain wheel. With the ``SCROLL_MOUSE``
+descriptor of ``hid_descriptor`` and a host that sets its resolution
+multiplier, a count is 1/8 of a detent and scrolling is that much finer.
+
+Counts waiting to go out are sent as few reports as the field allows: a 16 bit
+wheel carries up to 32767 counts in one report, an 8 bit one 127. Reports go out
+at most once per frame of ``rate_hz``, on ``time.monotonic_ns()`` deadlines,
+so a large scroll never floods the host faster than it polls.
+
+Examples::
+
+    scroller = ScrollEngine(mouse, rate_hz=125)
+    scroller.scroll(-3 * WHEEL_DELTA)                  # three detents down, now
+    scroller.scroll(10 * WHEEL_DELTA, duration_ns=200_000_000)  # smooth, 200 ms
+"""
+
+import time
+
+from hid_util import wait_until
+
+WHEEL_DELTA = 120
+"""Units of one detent."""
+
+
+def _divide(total, divisor):
+    """``total / divisor``, rounded toward zero."""
+    if total >= 0:
+        return total // divisor
+    return -(-total // divisor)
+
+
+def _whole(total):
+    """Whole detents in ``total``, rounded toward zero."""
+    return _divide(total, WHEEL_DELTA)
+
+
+class ScrollEngine:
+    """Turn the wheel and pan of a mouse by fractional amounts.
+
+    :param mouse: a driver with ``scroll(wheel, pan)`` and ``layout``, like
+        ``absolute_mouse.AbsoluteMouse``.
+    :param rate_hz: most reports per second, usually the host polling rate.
+    :param multiplier: wheel counts per detent. By default it is read from the
+        mouse with ``wheel_resolution()``, see ``refresh()``.
+    """
+
+    def __init__(self, mouse, rate_hz=125, multiplier=None):
+        self.mouse = mouse
+        self.rate_hz = rate_hz
+        self.period_ns = 1_000_000_000 // rate_hz
+        fields = mouse.layout.fields
+        self.max_wheel = fields["wheel"][3]
+        """Most wheel counts one report carries."""
+        self.max_pan = fields["pan"][3] if "pan" in fields else 0
+        """Most pan counts one report carries, 0 without a pan field."""
+        # Remainders, in units times multiplier, and whole counts to send
+        self._wheel_rest = 0
+        self._pan_rest = 0
+        self.multiplier = 1
+        self.refresh(multiplier)
+        self.wheel_pending = 0
+        """Wheel counts waiting for ``step()``."""
+        self.pan_pending = 0
+        """Pan counts waiting for ``step()``."""
+        self._next_ns = 0
+        self.reports_sent = 0
+        """Reports sent since the engine was created."""
+        self.counts_sent = 0
+        """Wheel and pan counts sent since the engine was created."""
+        self.elapsed_ns = 0
+        """Duration of the last ``scroll()``."""
+        self.last_reports = 0
+        """Reports sent by the last ``scroll()``."""
+
+    def refresh(self, multiplier=None):
+        """Pick up the resolution multiplier the host set, or ``multiplier`` if given.
+
+        Call it once the host had time to configure the device; the fraction
+        waiting in the accumulator is rescaled, not lost.
+        """
+        if multiplier is None:
+            resolution = getattr(self.mouse, "wheel_resolution", None)
+            multiplier = resolution() if resolution is not None else 1
+        old = self.multiplier
+        if multiplier != old:
+            # Rounded like _whole(), so a negative rest keeps its sign and size.
+            self._wheel_rest = _divide(self._wheel_rest * multiplier, old)
+            self._pan_rest = _divide(self._pan_rest * multiplier, old)
+        self.multiplier = multiplier
+
+    @property
+    def pending(self):
+        """Whether counts are waiting to be sent."""
+        return bool(self.wheel_pending or self.pan_pending)
+
+    def add(self, units, pan_units=0):
+        """Accumulate ``units`` of wheel and ``pan_units`` of pan, in 1/120 detents.
+
+        Positive scrolls away from the user and to the right. Nothing is sent:
+        the whole counts wait for ``step()``, the fraction for the next call.
+        """
+        total = self._wheel_rest + units * self.multiplier
+        counts = _whole(total)
+        self._wheel_rest = total - counts * WHEEL_DELTA
+        self.wheel_pending += counts
+        if pan_units and self.max_pan:
+            total = self._pan_rest + pan_units * self.multiplier
+            counts = _whole(total)
+            self._pan_rest = total - counts * WHEEL_DELTA
+            self.pan_pending += counts
+
+    def step(self):
+        """Send one report with as many of the pending counts as it holds.
+
+        :return: the wheel and pan counts sent, 0 when nothing was pending.
+        """
+        wheel = self.wheel_pending
+        if wheel > self.max_wheel:
+            wheel = self.max_wheel
+        elif wheel < -self.max_wheel:
+            wheel = -self.max_wheel
+        pan = self.pan_pending
+        if pan > self.max_pan:
+            pan = self.max_pan
+        elif pan < -self.max_pan:
+            pan = -self.max_pan
+        if not wheel and not pan:
+            return 0
+        self.mouse.scroll(wheel, pan)
+        self.wheel_pending -= wheel
+        self.pan_pending -= pan
+        self.reports_sent += 1
+        sent = abs(wheel) + abs(pan)
+        self.counts_sent += sent
+        return sent
+
+    def _wait(self):
+        deadline = self._next_ns
+        now = time.monotonic_ns()
+        if now < deadline:
+            wait_until(deadline)
+            now = deadline
+        self._next_ns = now + self.period_ns
+
+    def flush(self):
+        """Send every pending count, one report per frame at most, blocking."""
+        while self.pending:
+            self._wait()
+            self.step()
+
+    def scroll(self, units, pan_units=0, duration_ns=0):
+        """Scroll by ``units`` and ``pan_units`` and wait until it went out.
+
+        :param duration_ns: spread the scroll over this long, one report per
+            frame, for smooth scrolling. With 0, the counts go out in as few
+            reports as the fields allow.
+        """
+        start = time.monotonic_ns()
+        reports = self.reports_sent
+        frames = duration_ns // self.period_ns
+        if frames > 1:
+            # Integer DDA over the frames: frame i gets the units between the
+            # running totals, so the parts add up exactly.
+            done_wheel = 0
+            done_pan = 0
+            for frame in range(1, frames + 1):
+                wheel = units * frame // frames
+                pan = pan_units * frame // frames
+                self.add(wheel - done_wheel, pan - done_pan)
+                done_wheel = wheel
+                done_pan = pan
+                if self.pending:
+                    self._wait()
+                    self.step()
+        else:
+            self.add(units, pan_units)
+        self.flush()
+        self.elapsed_ns = time.monotonic_ns() - start
+        self.last_reports = self.reports_sent - reports
+
+    async def run(self):
+        """Send what ``add()`` accumulated, one report per frame, as an ``asyncio`` task."""
+        from mouse_scheduler import sleep_until  # pylint: disable=import-outside-toplevel
+
+        while True:
+            await sleep_until(max(self._next_ns, time.monotonic_ns() + self.period_ns))
+            if self.pending:
+                self._next_ns = time.monotonic_ns() + self.period_ns
+                self.step()
@@ -0,0 +1,136 @@
+"""
+`startup`
+====================================================
+
+Fast path from power-up to the first HID report.
+
+Instead of sleeping a fixed time for the host to enumerate the board,
+``wait_for_usb()`` polls ``supervisor.runtime.usb_connected`` and
+``wait_for_report()`` retries a no-op report until the host takes it, both with
+a timeout. ``StartupProfiler`` keeps a timestamp per startup phase and appends
+them as one line to a log file, so slow boots can be compared across re-plugs.
+
+This module only imports ``time`` and ``supervisor``, so it can be imported
+first thing in ``code.py`` and the profile covers the other imports too.
+
+Examples::
+
+    import time
+    from startup import StartupProfiler, wait_for_usb
+    profile = StartupProfiler()
+    import usb_hid
+    profile.mark("import")
+    wait_for_usb(3_000_000_000)
+    profile.mark("usb")
+    profile.save()
+"""
+
+import time
+
+try:
+    import supervisor
+except ImportError:
+    supervisor = None
+
+LOG_NAME = "startup.log"
+LOG_LIMIT = 4096
+"""A log bigger than this many bytes is started over."""
+
+_POLL_NS = 5_000_000
+_NS_PER_S = 1_000_000_000
+
+
+def wait_for_usb(timeout_ns, poll_ns=_POLL_NS):
+    """Wait until the host enumerated the board, at most ``timeout_ns``.
+
+    :return: ``True`` if the board is connected. Without ``supervisor`` (older
+        firmware) there is nothing to poll and it returns ``True`` right away.
+    """
+    if supervisor is None:
+        return True
+    deadline = time.monotonic_ns() + timeout_ns
+    runtime = supervisor.runtime
+    while not runtime.usb_connected:
+        if time.monotonic_ns() >= deadline:
+            return False
+        time.sleep(poll_ns / _NS_PER_S)
+    return True
+
+
+def wait_for_report(send, timeout_ns, poll_ns=_POLL_NS):
+    """Call ``send()`` until it stops raising ``OSError``, at most ``timeout_ns``.
+
+    ``send`` is usually a driver's method sending its current, all released,
+    report. The HID endpoint can lag behind ``usb_connected`` by a few polls.
+
+    :return: ``True`` once a report went through.
+    """
+    deadline = time.monotonic_ns() + timeout_ns
+    while True:
+        try:
+            send()
+            return True
+        except OSError:
+            if time.monotonic_ns() >= deadline:
+                return False
+        time.sleep(poll_ns / _NS_PER_S)
+
+
+class StartupProfiler:
+    """Timestamps of the startup phases, from the moment it is created.
+
+    ``start_ns`` is ``time.monotonic_ns()`` at creation, which on the board is
+    close to the time since reset.
+    """
+
+    def __init__(self):
+        self.start_ns = time.monotonic_ns()
+        self.phases = []
+        """Names of the phases marked so far, in order."""
+        self.times_ns = []
+        """Time of each phase, relative to ``start_ns``."""
+
+    def mark(self, phase):
+        """Record that ``phase`` just ended."""
+        self.phases.append(phase)
+        self.times_ns.append(time.monotonic_ns() - self.start_ns)
+
+    def elapsed_ns(self, phase):
+        """Time from the start to the end of ``phase``, or ``None`` if not marked."""
+        for index, name in enumerate(self.phases):
+            if name == phase:
+                return self.times_ns[index]
+        return None
+
+    def format(self):
+        """Phases as one line: the start since reset, then each phase in milliseconds."""
+        parts = ["reset+{}ms".format(self.start_ns // 1_000_000)]
+        for name, elapsed in zip(self.phases, self.times_ns):
+            parts.append("{}={}.{:03d}ms".format(name, elapsed // 1_000_000, elapsed // 1000 % 1000))
+        return " ".join(parts)
+
+    def save(self, path=None):
+        """Append ``format()`` to the log, ``startup.log`` under ``macro.default_root()``.
+
+        :return: ``False`` if the filesystem is read only, which CIRCUITPY is
+            while the host has it mounted, unless ``boot.py`` remounted it.
+        """
+        import os  # pylint: disable=import-outside-toplevel
+
+        if path is None:
+            from macro import macro_path  # pylint: disable=import-outside-toplevel
+
+            path = macro_path(LOG_NAME)
+        mode = "a"
+        try:
+            if os.stat(path)[6] > LOG_LIMIT:
+                mode = "w"
+        except OSError:
+            pass
+        try:
+            with open(path, mode) as log:
+                log.write(self.format())
+                log.write("\n")
+        except OSError:
+            return False
+        return True
@@ -0,0 +1,131 @@
+"""
+`typing_engine`
+====================================================
+
+Type strings as precompiled sequences of 8 byte boot keyboard reports.
+
+A string is turned into reports once, using the layout's ``keycodes()`` for
+the character lookups, and kept in a small LRU cache with the report slices
+``send()`` needs. Each press report is followed by an all-keys-up report so
+repeated letters and modifier changes are always seen by the host.
+
+With ``rollover=True``, consecutive characters that need the same modifiers
+and different keys share one report, up to the 6 keys of the boot protocol
+(6-key rollover), so ``"hello world"`` takes 8 press reports instead of 11.
+The keys of one report are all new at once, and many hosts turn them into
+key presses in usage order, not array order: ``"ba"`` can come out as
+``"ab"``. Only turn it on for a host known to keep the array order.
+
+Examples::
+
+    keyboard = Keyboard(usb_hid.devices)
+    typist = TypingEngine(keyboard, KeyboardLayoutUS(keyboard))
+    typist.type("hello world\\n")
+"""
+
+REPORT_LENGTH = 8
+_MAX_KEYS = 6
+_FIRST_MODIFIER = 0xE0
+_LAST_MODIFIER = 0xE7
+
+
+class TypingEngine:
+    """Compile and send strings as keyboard reports.
+
+    :param keyboard: an ``adafruit_hid.keyboard.Keyboard``, its device sends the reports.
+    :param layout: a keyboard layout with ``keycodes(char)``, like ``KeyboardLayoutUS``.
+    :param cache_size: number of compiled strings to keep.
+    :param rollover: combine characters into reports of up to 6 keys, see
+        above: it can reorder the text on some hosts.
+    """
+
+    def __init__(self, keyboard, layout, cache_size=16, rollover=False):
+        self.keyboard = keyboard
+        self.layout = layout
+        self.cache_size = cache_size
+        self.rollover = rollover
+        self._cache = {}
+        self._order = []
+        # Last (reports, slices) compiled or found, for send()
+        self._last = (None, ())
+        self.hits = 0
+        """Strings found in the cache."""
+        self.misses = 0
+        """Strings that had to be compiled."""
+
+    def compile(self, string):
+        """Reports typing ``string``, as one bytearray of 8 byte reports.
+
+        Uses the cache, and adds the string to it.
+        """
+        entry = self._cache.get(string)
+        if entry is not None:
+            self.hits += 1
+            # Most recently used goes last
+            self._order.remove(string)
+            self._order.append(string)
+        else:
+            self.misses += 1
+            entry = _with_frames(self._compile(string))
+            if len(self._order) >= self.cache_size:
+                del self._cache[self._order.pop(0)]
+            self._cache[string] = entry
+            self._order.append(string)
+        self._last = entry
+        return entry[0]
+
+    def _compile(self, string):
+        groups = []
+        modifiers = -1
+        keys = None
+        for char in string:
+            char_modifiers = 0
+            char_keys = []
+            for keycode in self.layout.keycodes(char):
+                if _FIRST_MODIFIER <= keycode <= _LAST_MODIFIER:
+                    char_modifiers |= 1 << (keycode - _FIRST_MODIFIER)
+                else:
+                    char_keys.append(keycode)
+            if (
+                self.rollover
+                and char_modifiers == modifiers
+                and len(keys) + len(char_keys) <= _MAX_KEYS
+                and not any(key in keys for key in char_keys)
+            ):
+                keys.extend(char_keys)
+            else:
+                modifiers = char_modifiers
+                keys = char_keys
+                groups.append((modifiers, keys))
+        # One press report and one release report per group
+        reports = bytearray(2 * REPORT_LENGTH * len(groups))
+        offset = 0
+        for modifiers, keys in groups:
+            reports[offset] = modifiers
+            for index, key in enumerate(keys):
+                reports[offset + 2 + index] = key
+            offset += 2 * REPORT_LENGTH
+        return reports
+
+    def send(self, reports):
+        """Send compiled reports back to back.
+
+        The slices of the reports last returned by ``compile()`` are reused, so
+        sending those allocates nothing.
+        """
+        last, frames = self._last
+        if reports is not last:
+            frames = _with_frames(reports)[1]
+        send_report = self.keyboard._keyboard_device.send_report  # pylint: disable=protected-access
+        for frame in frames:
+            send_report(frame)
+
+    def type(self, string):
+        """Type ``string``, compiling it first if it is not cached."""
+        self.send(self.compile(string))
+
+
+def _with_frames(reports):
+    """``(reports, slices)``: the 8 byte memoryview slices of each report."""
+    view = memoryview(reports)
+    return reports, [view[start : start + REPORT_LENGTH] for start in range(0, len(reports), REPORT_LENGTH)]
@@ -0,0 +1,21 @@
+"""
+`adafruit_hid`
+====================================================
+
+Host-side stand-in for ``adafruit_hid``, whose ``.mpy`` files in ``lib`` only
+load on CircuitPython.
+"""
+
+
+def find_device(devices, *, usage_page, usage, timeout=None):
+    """Search through the provided sequence of devices to find the one with the matching
+    usage_page and usage.
+
+    ``timeout`` is accepted for compatibility, the fake devices are always ready.
+    """
+    if hasattr(devices, "send_report"):
+        devices = [devices]
+    for device in devices:
+        if device.usage_page == usage_page and device.usage == usage and hasattr(device, "send_report"):
+            return device
+    raise ValueError("Could not find matching HID device.")
@@ -0,0 +1,88 @@
+"""
+`adafruit_hid.keyboard.Keyboard`
+====================================================
+
+Host-side stand-in for ``adafruit_hid.keyboard``, same reports as the library.
+"""
+
+from . import find_device
+from .keycode import Keycode
+
+_MAX_KEYPRESSES = 6
+
+
+class Keyboard:
+    """Send HID keyboard reports."""
+
+    LED_NUM_LOCK = 0x01
+    LED_CAPS_LOCK = 0x02
+    LED_SCROLL_LOCK = 0x04
+    LED_COMPOSE = 0x08
+
+    def __init__(self, devices, timeout=None):
+        self._keyboard_device = find_device(devices, usage_page=0x1, usage=0x06, timeout=timeout)
+        # report[0] modifiers, report[1] unused, report[2:8] regular key presses
+        self.report = bytearray(8)
+        self.report_modifier = memoryview(self.report)[0:1]
+        self.report_keys = memoryview(self.report)[2:]
+        try:
+            self.release_all()
+        except OSError:
+            self.release_all()
+
+    def press(self, *keycodes):
+        """Send a report indicating that the given keys have been pressed."""
+        for keycode in keycodes:
+            self._add_keycode_to_report(keycode)
+        self._keyboard_device.send_report(self.report)
+
+    def release(self, *keycodes):
+        """Send a USB HID report indicating that the given keys have been released."""
+        for keycode in keycodes:
+            self._remove_keycode_from_report(keycode)
+        self._keyboard_device.send_report(self.report)
+
+    def release_all(self):
+        """Release all pressed keys."""
+        for i in range(8):
+            self.report[i] = 0
+        self._keyboard_device.send_report(self.report)
+
+    def send(self, *keycodes):
+        """Press the given keycodes and then release all pressed keys."""
+        self.press(*keycodes)
+        self.release_all()
+
+    def _add_keycode_to_report(self, keycode):
+        modifier = Keycode.modifier_bit(keycode)
+        if modifier:
+            self.report_modifier[0] |= modifier
+        else:
+            report_keys = self.report_keys
+            for i in range(_MAX_KEYPRESSES):
+                if report_keys[i] == keycode:
+                    return
+            for i in range(_MAX_KEYPRESSES):
+                if report_keys[i] == 0:
+                    report_keys[i] = keycode
+                    return
+            raise ValueError("Trying to press more than six keys at once.")
+
+    def _remove_keycode_from_report(self, keycode):
+        modifier = Keycode.modifier_bit(keycode)
+        if modifier:
+            self.report_modifier[0] &= ~modifier
+        else:
+            report_keys = self.report_keys
+            for i in range(_MAX_KEYPRESSES):
+                if report_keys[i] == keycode:
+                    report_keys[i] = 0
+
+    @property
+    def led_status(self):
+        """Returns the last received report"""
+        return b"\x00"
+
+    def led_on(self, led_code):
+        """Returns whether an LED is on based on the led code"""
+        return False
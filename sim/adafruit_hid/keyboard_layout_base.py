@@ -0,0 +1,68 @@
+"""
+`adafruit_hid.keyboard_layout_base.KeyboardLayoutBase`
+====================================================
+
+Host-side stand-in for ``adafruit_hid.keyboard_layout_base``.
+"""
+
+from time import sleep
+
+
+class KeyboardLayoutBase:
+    """Base class for keyboard layouts. Uses the tables defined in the subclass
+    to map UTF-8 characters to appropriate keypresses."""
+
+    SHIFT_FLAG = 0x80
+    ALTGR_FLAG = 0x80
+    SHIFT_CODE = 0xE1
+    RIGHT_ALT_CODE = 0xE6
+    ASCII_TO_KEYCODE = ()
+    NEED_ALTGR = ""
+    HIGHER_ASCII = {}
+    COMBINED_KEYS = {}
+
+    def __init__(self, keyboard):
+        self.keyboard = keyboard
+
+    def _write(self, keycode, altgr=False):
+        if keycode & self.SHIFT_FLAG:
+            keycode &= ~self.SHIFT_FLAG
+            self.keyboard.press(self.SHIFT_CODE)
+        if altgr:
+            self.keyboard.press(self.RIGHT_ALT_CODE)
+        self.keyboard.press(keycode)
+        self.keyboard.release_all()
+
+    def write(self, string, delay=None):
+        """Type the string by pressing and releasing keys on my keyboard."""
+        for char in string:
+            keycode = self._char_to_keycode(char)
+            self._write(keycode, char in self.NEED_ALTGR)
+            if delay is not None:
+                sleep(delay)
+
+    def keycodes(self, char):
+        """Return a tuple of keycodes needed to type the given character."""
+        keycode = self._char_to_keycode(char)
+        codes = []
+        if char in self.NEED_ALTGR:
+            codes.append(self.RIGHT_ALT_CODE)
+        if keycode & self.SHIFT_FLAG:
+            codes.extend((self.SHIFT_CODE, keycode & ~self.SHIFT_FLAG))
+        else:
+            codes.append(keycode)
+        return tuple(codes)
+
+    def _char_to_keycode(self, char):
+        char_val = ord(char)
+        if char_val > len(self.ASCII_TO_KEYCODE):
+            keycode = self.HIGHER_ASCII.get(char_val, 0)
+        else:
+            keycode = self.ASCII_TO_KEYCODE[char_val]
+        if keycode == 0:
+            raise ValueError(
+                "No keycode available for character {letter} ({num}/0x{num:02x}).".format(
+                    letter=repr(char), num=char_val
+                )
+            )
+        return keycode
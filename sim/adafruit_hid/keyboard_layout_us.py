@@ -0,0 +1,40 @@
+"""
+`adafruit_hid.keyboard_layout_us.KeyboardLayoutUS`
+====================================================
+
+Host-side stand-in for ``adafruit_hid.keyboard_layout_us``.
+"""
+
+from .keyboard_layout_base import KeyboardLayoutBase
+
+
+def _ascii_to_keycode():
+    shift = KeyboardLayoutBase.SHIFT_FLAG
+    table = bytearray(128)
+    table[0x08] = 0x2A  # BACKSPACE
+    table[0x09] = 0x2B  # TAB
+    table[0x0A] = 0x28  # ENTER
+    table[0x1B] = 0x29  # ESCAPE
+    table[0x7F] = 0x4C  # DELETE
+    for index in range(26):
+        table[ord("a") + index] = 0x04 + index
+        table[ord("A") + index] = (0x04 + index) | shift
+    for index, char in enumerate("1234567890"):
+        table[ord(char)] = 0x1E + index
+    for index, char in enumerate("!@#$%^&*()"):
+        table[ord(char)] = (0x1E + index) | shift
+    plain = " -=[]\\\0;'`,./"
+    shifted = " _+{}|\0:\"~<>?"
+    for index, char in enumerate(plain):
+        if char != "\0":
+            table[ord(char)] = 0x2C + index
+    for index, char in enumerate(shifted):
+        if char not in "\0 ":
+            table[ord(char)] = (0x2C + index) | shift
+    return bytes(table)
+
+
+class KeyboardLayoutUS(KeyboardLayoutBase):
+    """Map ASCII characters to appropriate keypresses on a standard US PC keyboard."""
+
+    ASCII_TO_KEYCODE = _ascii_to_keycode()
@@ -0,0 +1,29 @@
+"""
+`board`
+====================================================
+
+Host-side stand-in for the CircuitPython ``board`` module of a Raspberry Pi Pico 2.
+"""
+
+board_id = "raspberry_pi_pico2"
+
+
+class Pin:
+    """A named microcontroller pin."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return "board.{}".format(self.name)
+
+
+LED = Pin("LED")
+VBUS_SENSE = Pin("VBUS_SENSE")
+SMPS_MODE = Pin("SMPS_MODE")
+A0 = Pin("A0")
+A1 = Pin("A1")
+A2 = Pin("A2")
+for _number in range(29):
+    globals()["GP{}".format(_number)] = Pin("GP{}".format(_number))
+del _number
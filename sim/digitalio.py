@@ -0,0 +1,75 @@
+"""
+`digitalio`
+====================================================
+
+Host-side stand-in for the CircuitPython ``digitalio`` module.
+
+Every ``value`` change is recorded with a ``time.monotonic_ns()`` timestamp in
+``DigitalInOut.changes``, so LED feedback can be checked off-device.
+"""
+
+import time
+
+
+class Direction:
+    """Pin direction."""
+
+    INPUT = "INPUT"
+    OUTPUT = "OUTPUT"
+
+
+class Pull:
+    """Pull resistor of an input."""
+
+    UP = "UP"
+    DOWN = "DOWN"
+
+
+class DriveMode:
+    """Drive mode of an output."""
+
+    PUSH_PULL = "PUSH_PULL"
+    OPEN_DRAIN = "OPEN_DRAIN"
+
+
+class DigitalInOut:
+    """Fake digital pin."""
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self.pull = None
+        self.drive_mode = DriveMode.PUSH_PULL
+        self._value = False
+        self.changes = []
+        """``(timestamp_ns, value)`` of every write to ``value``."""
+
+    @property
+    def value(self):
+        """Pin level."""
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = bool(value)
+        self.changes.append((time.monotonic_ns(), self._value))
+
+    def switch_to_output(self, value=False, drive_mode=DriveMode.PUSH_PULL):
+        """Make the pin an output."""
+        self.direction = Direction.OUTPUT
+        self.drive_mode = drive_mode
+        self.value = value
+
+    def switch_to_input(self, pull=None):
+        """Make the pin an input."""
+        self.direction = Direction.INPUT
+        self.pull = pull
+
+    def deinit(self):
+        """Release the pin."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.deinit()
@@ -0,0 +1,11 @@
+"""
+`micropython`
+====================================================
+
+Host-side stand-in for the ``micropython`` module.
+"""
+
+
+def const(value):
+    """Compile-time constant on the board, the value itself on a desktop."""
+    return value
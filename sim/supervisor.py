@@ -0,0 +1,36 @@
+"""
+`supervisor`
+====================================================
+
+Host-side stand-in for the CircuitPython ``supervisor`` module.
+
+``runtime.usb_connected`` is ``True`` unless a test calls ``connect_after()``
+to simulate a host that takes a while to enumerate the board.
+"""
+
+import time
+
+
+class Runtime:
+    """The parts of ``supervisor.runtime`` the startup code reads."""
+
+    def __init__(self):
+        self._connected_at_ns = 0
+        self.serial_connected = False
+
+    @property
+    def usb_connected(self):
+        """``True`` once the simulated host enumerated the board."""
+        return time.monotonic_ns() >= self._connected_at_ns
+
+    def connect_after(self, delay_ns):
+        """Report the board as connected ``delay_ns`` from now."""
+        self._connected_at_ns = time.monotonic_ns() + delay_ns
+
+
+runtime = Runtime()
+
+
+def ticks_ms():
+    """Milliseconds since an arbitrary point, wrapping at 2**29 like on the board."""
+    return (time.monotonic_ns() // 1_000_000) & 0x1FFFFFFF
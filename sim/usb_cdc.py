@@ -0,0 +1,16 @@
+"""
+`usb_cdc`
+====================================================
+
+Host-side stand-in for the CircuitPython ``usb_cdc`` module.
+
+``data`` is ``None`` unless a test assigns a stream (for example one end of a
+pty) to it, like ``boot.py`` not enabling the data port.
+"""
+
+console = None
+data = None
+
+
+def enable(*, console=True, data=False):  # pylint: disable=redefined-outer-name
+    """Accepted for ``boot.py`` compatibility, streams are assigned by the host code."""
@@ -0,0 +1,102 @@
+"""
+`usb_hid`
+====================================================
+
+Host-side stand-in for the CircuitPython ``usb_hid`` module.
+
+Put the ``sim`` directory first on ``sys.path`` to run the drivers from ``lib``
+on a desktop Python. Reports are recorded with a ``time.monotonic_ns()``
+timestamp instead of going over USB.
+"""
+
+import time
+
+recording = True
+"""Keep a timestamped copy of every report. Turn off for pure throughput runs."""
+
+
+class Device:
+    """Fake HID device with the same constructor as ``usb_hid.Device``."""
+
+    KEYBOARD = None
+    MOUSE = None
+    CONSUMER_CONTROL = None
+
+    def __init__(
+        self,
+        *,
+        report_descriptor=b"",
+        usage_page=0,
+        usage=0,
+        report_ids=(0,),
+        in_report_lengths=(0,),
+        out_report_lengths=(0,),
+    ):
+        self.report_descriptor = bytes(report_descriptor)
+        self.usage_page = usage_page
+        self.usage = usage
+        self.report_ids = tuple(report_ids)
+        self.in_report_lengths = tuple(in_report_lengths)
+        self.out_report_lengths = tuple(out_report_lengths)
+        self.report_count = 0
+        self.last_report = None
+        self.reports = []
+        """``(timestamp_ns, report_bytes)`` of every report sent while ``recording``."""
+        self.refuse_until_ns = 0
+        """``send_report()`` raises ``OSError`` until ``time.monotonic_ns()`` reaches this."""
+        self.refused = 0
+        """Reports refused because of a simulated host stall."""
+        self.received = {}
+        """``{report_id: bytes}`` the host wrote, set by benchmarks playing the host."""
+
+    def send_report(self, report, report_id=None):
+        """Count the report and keep a copy of it while ``recording``."""
+        if self.refuse_until_ns and time.monotonic_ns() < self.refuse_until_ns:
+            self.refused += 1
+            raise OSError("USB busy")
+        self.report_count += 1
+        if recording:
+            self.last_report = bytes(report)
+            self.reports.append((time.monotonic_ns(), self.last_report))
+
+    def stall(self, duration_ns):
+        """Refuse every report for ``duration_ns``, like a host that stopped polling."""
+        self.refuse_until_ns = time.monotonic_ns() + duration_ns
+
+    def get_last_received_report(self, report_id=None):
+        """What the simulated host last wrote to ``report_id``, ``None`` if nothing."""
+        return self.received.get(report_id)
+
+
+Device.KEYBOARD = Device(usage_page=0x01, usage=0x06, report_ids=(1,), in_report_lengths=(8,))
+Device.MOUSE = Device(usage_page=0x01, usage=0x02, report_ids=(2,), in_report_lengths=(4,))
+Device.CONSUMER_CONTROL = Device(usage_page=0x0C, usage=0x01, report_ids=(3,), in_report_lengths=(2,))
+
+ABSOLUTE_MOUSE = Device(
+    usage_page=0x01,
+    usage=0x02,
+    report_ids=(11,),
+    in_report_lengths=(6,),
+    out_report_lengths=(0,),
+)
+"""The absolute mouse that ``boot.py`` enables."""
+
+devices = (Device.KEYBOARD, ABSOLUTE_MOUSE)
+"""Devices as they appear after ``boot.py`` ran."""
+
+
+def enable(devices_to_enable, boot_device=0):
+    """Replace the list of devices, like a new ``boot.py`` would."""
+    global devices  # pylint: disable=global-statement
+    devices = tuple(devices_to_enable)
+
+
+def reset():
+    """Clear the counters and recorded reports of every known device."""
+    for device in devices:
+        device.report_count = 0
+        device.last_report = None
+        device.reports.clear()
+        device.refuse_until_ns = 0
+        device.refused = 0
+        device.received.clear()
@@ -0,0 +1,10 @@
+"""Put ``lib``, ``sim`` and ``host`` on ``sys.path``, like ``bench/benchutil.py`` does."""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (os.path.join(ROOT, "lib"), os.path.join(ROOT, "sim"), os.path.join(ROOT, "host")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,50 @@
+"""``Mouse`` of ``lib/absolute_mouse/__init__.py`` with each report layout."""
+
+import pytest
+
+from absolute_mouse import Mouse
+from hid_descriptor import ABSOLUTE_MOUSE, CHORD_MOUSE, SCROLL_MOUSE
+
+
+class Device:
+    usage_page = 0x01
+    usage = 0x02
+
+    def __init__(self):
+        self.reports = []
+
+    def send_report(self, report, report_id=None):
+        self.reports.append(bytes(report))
+
+
+def new_mouse(descriptor):
+    device = Device()
+    return Mouse(device, descriptor.layout()), device.reports
+
+
+@pytest.mark.parametrize("descriptor", [ABSOLUTE_MOUSE, SCROLL_MOUSE, CHORD_MOUSE])
+def test_click_at(descriptor):
+    mouse, reports = new_mouse(descriptor)
+    mouse.move(0x1234, 40000)
+    mouse.click(Mouse.LEFT_BUTTON)
+    position = bytes((0x34, 0x12, 0xFF, 0x7F))
+    tail = bytes(descriptor.layout().length - 6)
+    assert reports == [
+        bytes((0,)) + position + bytes((0,)) + tail,
+        bytes((1,)) + position + bytes((0,)) + tail,
+        bytes((0,)) + position + bytes((0,)) + tail,
+    ]
+
+
+def test_wheel_steps_with_an_8_bit_field():
+    mouse, reports = new_mouse(ABSOLUTE_MOUSE)
+    mouse.move(wheel=-200)
+    assert [report[5] for report in reports] == [0x81, 0xB7]
+    assert mouse.report[5] == 0
+
+
+def test_high_resolution_wheel_in_one_report():
+    mouse, reports = new_mouse(SCROLL_MOUSE)
+    mouse.move(wheel=-200)
+    assert len(reports) == 1 and reports[0][5:7] == (-200 & 0xFFFF).to_bytes(2, "little")
+    assert mouse.report[5:7] == b"\x00\x00"
@@ -0,0 +1,100 @@
+"""Chords compiled by ``lib/chords.py``: the reports, their order and the cache."""
+
+import pytest
+
+from chords import KEYBOARD, MOUSE, ChordPlanner, modifier_mask
+from hid_descriptor import ABSOLUTE_MOUSE, CHORD_MOUSE
+
+CONTROL = 0xE0
+SHIFT = 0xE1
+
+
+class Device:
+    def __init__(self):
+        self.reports = []
+
+    def send_report(self, report, report_id=None):
+        self.reports.append(bytes(report))
+
+
+class Mouse:
+    def __init__(self, layout):
+        self.layout = layout
+        self.report = layout.new_report()
+        self._mouse_device = Device()
+
+
+class Keyboard:
+    def __init__(self):
+        self.report = bytearray(8)
+        self._keyboard_device = Device()
+
+
+def mouse_report(buttons, x, y, modifiers=None):
+    report = bytes((buttons, x & 0xFF, x >> 8, y & 0xFF, y >> 8, 0))
+    return report if modifiers is None else report + bytes((modifiers,))
+
+
+def test_modifier_mask():
+    assert modifier_mask(CONTROL) == 0x01
+    assert modifier_mask((CONTROL, SHIFT)) == 0x03
+    with pytest.raises(ValueError):
+        modifier_mask(0x04)
+
+
+def test_click_with_keyboard():
+    mouse, keyboard = Mouse(ABSOLUTE_MOUSE.layout()), Keyboard()
+    planner = ChordPlanner(mouse, keyboard, hold_ns=1, settle_ns=2)
+    chord = planner.chords[planner.click(1000, 2000, CONTROL)]
+    # Modifier down, move with the press, release, modifier up.
+    assert list(chord.devices) == [KEYBOARD, MOUSE, MOUSE, KEYBOARD]
+    assert list(chord.waits) == [2, 1, 2, 2]
+    planner.play(planner.click(1000, 2000, CONTROL))
+    assert keyboard._keyboard_device.reports == [bytes((1,)) + bytes(7), bytes(8)]
+    assert mouse._mouse_device.reports == [mouse_report(1, 1000, 2000), mouse_report(0, 1000, 2000)]
+    assert mouse.report == bytearray(mouse_report(0, 1000, 2000))
+
+
+def test_composite_click():
+    mouse = Mouse(CHORD_MOUSE.layout())
+    planner = ChordPlanner(mouse, hold_ns=1)
+    assert planner.composite
+    planner.play(planner.click(10, 20, SHIFT))
+    # The modifier rides with the move, never with a button change.
+    assert mouse._mouse_device.reports == [
+        mouse_report(0, 10, 20, 2),
+        mouse_report(1, 10, 20, 2),
+        mouse_report(0, 10, 20, 2),
+        mouse_report(0, 10, 20, 0),
+    ]
+
+
+def test_keyboard_needed_without_modifiers_field():
+    with pytest.raises(ValueError):
+        ChordPlanner(Mouse(ABSOLUTE_MOUSE.layout()))
+
+
+def test_cache_keeps_the_most_recent():
+    mouse, keyboard = Mouse(ABSOLUTE_MOUSE.layout()), Keyboard()
+    planner = ChordPlanner(mouse, keyboard, cache_size=2)
+    first = planner.click(1, 1, CONTROL)
+    second = planner.click(2, 2, CONTROL)
+    assert planner.click(1, 1, CONTROL) == first
+    third = planner.click(3, 3, CONTROL)
+    # The least recently used chord went, the one asked for again stayed.
+    assert len(planner.chords) == 2
+    assert first in planner.chords and third in planner.chords
+    with pytest.raises(KeyError):
+        planner.play(second)
+    assert planner.click(2, 2, CONTROL) not in (first, second, third)
+
+
+def test_wrapped_device_is_used():
+    mouse, keyboard = Mouse(ABSOLUTE_MOUSE.layout()), Keyboard()
+    planner = ChordPlanner(mouse, keyboard, hold_ns=1, settle_ns=1)
+    handle = planner.click(5, 5, CONTROL)
+    planner.play(handle)
+    wrapper = Device()
+    mouse._mouse_device = wrapper
+    planner.play(handle)
+    assert len(wrapper.reports) == 2
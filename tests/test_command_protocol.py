@@ -0,0 +1,179 @@
+"""Framing of ``lib/command_protocol.py`` and ``CommandReceiver`` against fakes."""
+
+from command_protocol import (
+    ACK_SIZE,
+    ACK_SYNC,
+    CLICK,
+    FRAME_SIZE,
+    MOVE,
+    PRESS,
+    STATUS_BAD_CRC,
+    STATUS_BAD_OPCODE,
+    STATUS_FAILED,
+    STATUS_OK,
+    SYNC,
+    WHEEL,
+    CommandReceiver,
+    crc8,
+    encode_frame,
+)
+
+
+class FakeSerial:
+    """Hands out ``incoming`` in reads of at most ``chunk`` bytes, keeps what is written."""
+
+    def __init__(self, incoming=b"", chunk=64):
+        self.incoming = bytearray(incoming)
+        self.chunk = chunk
+        self.written = bytearray()
+
+    @property
+    def in_waiting(self):
+        return len(self.incoming)
+
+    def readinto(self, buffer):
+        count = min(len(buffer), len(self.incoming), self.chunk)
+        buffer[:count] = self.incoming[:count]
+        del self.incoming[:count]
+        return count
+
+    def write(self, data):
+        self.written.extend(data)
+        return len(data)
+
+
+class FakeMouse:
+    """Records the driver calls, raises ``OSError`` for the calls listed in ``fail``."""
+
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = list(fail)
+
+    def _call(self, *call):
+        if call in self.fail:
+            self.fail.remove(call)
+            raise OSError("USB suspended")
+        self.calls.append(call)
+
+    def move_to(self, x, y, wheel=0):
+        self._call("move_to", x, y, wheel)
+
+    def press(self, buttons):
+        self._call("press", buttons)
+
+    def release(self, buttons):
+        self._call("release", buttons)
+
+    def click(self, buttons):
+        self._call("click", buttons)
+
+
+def acks(written):
+    """``(sequence, status)`` of every acknowledgement in ``written``, checking their CRC."""
+    result = []
+    for start in range(0, len(written), ACK_SIZE):
+        assert written[start] == ACK_SYNC
+        assert crc8(written, start, start + 3) == written[start + 3]
+        result.append((written[start + 1], written[start + 2]))
+    return result
+
+
+def frames(*commands):
+    data = bytearray()
+    for sequence, (opcode, arg, x, y) in enumerate(commands):
+        data += encode_frame(opcode, sequence, arg, x, y)
+    return data
+
+
+def test_failed_command_is_answered_and_not_run_again():
+    serial = FakeSerial(frames((CLICK, 1, 10, 20), (MOVE, 0, 30, 40)))
+    mouse = FakeMouse(fail=[("click", 1)])
+    receiver = CommandReceiver(serial, mouse)
+    assert receiver.poll() == 2
+    assert acks(serial.written) == [(0, STATUS_FAILED), (1, STATUS_OK)]
+    assert receiver.failed == 1
+    # Nothing is left to dispatch a second time.
+    assert receiver.poll() == 0
+    assert mouse.calls == [("move_to", 10, 20, 0), ("move_to", 30, 40, 0)]
+
+
+def test_failed_command_keeps_partial_frame():
+    data = frames((MOVE, 0, 1, 2), (MOVE, 0, 3, 4))
+    serial = FakeSerial(data[:13])
+    mouse = FakeMouse(fail=[("move_to", 1, 2, 0)])
+    receiver = CommandReceiver(serial, mouse)
+    assert receiver.poll() == 1
+    serial.incoming += data[13:]
+    assert receiver.poll() == 1
+    assert mouse.calls == [("move_to", 3, 4, 0)]
+    assert acks(serial.written) == [(0, STATUS_FAILED), (1, STATUS_OK)]
+
+
+
+def test_crc8_check_value():
+    # CRC-8 with polynomial 0x07 and no reflection or final XOR.
+    assert crc8(b"123456789") == 0xF4
+    assert crc8(b"xx123456789", 2) == 0xF4
+    assert crc8(b"") == 0
+
+
+def test_encode_frame_layout():
+    frame = encode_frame(WHEEL, 300, -3, 0x1234, 0x7FFF)
+    assert len(frame) == FRAME_SIZE
+    assert bytes(frame[:8]) == bytes((SYNC, 300 & 0xFF, WHEEL, 0xFD, 0x34, 0x12, 0xFF, 0x7F))
+    assert frame[8] == crc8(frame, 0, 8)
+    buffer = bytearray(2 * FRAME_SIZE)
+    encode_frame(MOVE, 1, 0, 5, 6, buffer, FRAME_SIZE)
+    assert buffer[FRAME_SIZE:] == encode_frame(MOVE, 1, 0, 5, 6)
+
+
+def test_frames_split_across_reads():
+    serial = FakeSerial(frames((MOVE, 0, 1, 2), (WHEEL, 0xFE, 3, 4), (PRESS, 1, 0, 0)), chunk=1)
+    mouse = FakeMouse()
+    receiver = CommandReceiver(serial, mouse, buffer_frames=2)
+    while serial.incoming:
+        receiver.poll()
+    assert mouse.calls == [("move_to", 1, 2, 0), ("move_to", 3, 4, -2), ("press", 1)]
+    assert acks(serial.written) == [(0, STATUS_OK), (1, STATUS_OK), (2, STATUS_OK)]
+    assert receiver.received == 3 and receiver.skipped_bytes == 0
+
+
+def test_bad_crc_in_sync_is_answered():
+    data = frames((MOVE, 0, 1, 2), (MOVE, 0, 3, 4), (MOVE, 0, 5, 6))
+    data[FRAME_SIZE + 8] ^= 0xFF
+    serial = FakeSerial(data)
+    mouse = FakeMouse()
+    receiver = CommandReceiver(serial, mouse)
+    receiver.poll()
+    assert acks(serial.written) == [(0, STATUS_OK), (1, STATUS_BAD_CRC), (2, STATUS_OK)]
+    assert receiver.crc_errors == 1
+    # The bytes of the damaged frame were skipped one by one to the next SYNC.
+    assert receiver.skipped_bytes == FRAME_SIZE - 1
+    assert mouse.calls == [("move_to", 1, 2, 0), ("move_to", 5, 6, 0)]
+
+
+def test_stray_sync_after_garbage_is_not_answered():
+    # Garbage with a SYNC value inside, then a real frame.
+    serial = FakeSerial(b"\x00\x11" + bytes((SYNC,)) + bytes(10) + frames((MOVE, 0, 7, 8)))
+    mouse = FakeMouse()
+    receiver = CommandReceiver(serial, mouse)
+    receiver.poll()
+    assert acks(serial.written) == [(0, STATUS_OK)]
+    assert mouse.calls == [("move_to", 7, 8, 0)]
+    # The stray SYNC counts as a bad frame, the other 12 bytes as skipped.
+    assert receiver.crc_errors == 1 and receiver.skipped_bytes == 12
+
+
+def test_sequence_gaps_wrap_around():
+    data = encode_frame(MOVE, 254) + encode_frame(MOVE, 255) + encode_frame(MOVE, 2)
+    receiver = CommandReceiver(FakeSerial(data), FakeMouse())
+    receiver.poll()
+    assert receiver.sequence_gaps == 2
+
+
+def test_unknown_opcode():
+    serial = FakeSerial(encode_frame(0x7F, 9))
+    receiver = CommandReceiver(serial, FakeMouse())
+    receiver.poll()
+    assert acks(serial.written) == [(9, STATUS_BAD_OPCODE)]
+    assert receiver.unknown == 1
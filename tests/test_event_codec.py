@@ -0,0 +1,119 @@
+"""Round trips through ``lib/event_codec.py`` and seeking in a stored stream."""
+
+import io
+
+import pytest
+
+from event_codec import FOOTER_SIZE, INDEX_MAGIC, EventDecoder, EventEncoder
+from hid_descriptor import ABSOLUTE_MOUSE, CHORD_MOUSE, SCROLL_MOUSE
+
+LAYOUT = ABSOLUTE_MOUSE.layout()
+
+
+def events(count=300):
+    """Moves, held buttons, wheel turns and idle stretches, 1 ms apart."""
+    result = []
+    x, y = 30000, 100
+    for index in range(count):
+        phase = index % 50
+        if phase < 30:
+            x -= 7 * (index % 3)
+            y += index % 5
+        buttons = 1 if 10 <= phase < 20 else 0
+        wheel = -3 if phase == 25 else 2 if phase == 26 else 0
+        result.append((1000 * (index + 1), buttons, x, y, wheel))
+    return result
+
+
+def encode(recorded, keyframe_interval=16):
+    stream = io.BytesIO()
+    encoder = EventEncoder(stream, keyframe_interval)
+    for event in recorded:
+        encoder.add(*event)
+    encoder.close()
+    assert encoder.size == len(stream.getvalue())
+    return stream, encoder
+
+
+def report(buttons, x, y, wheel):
+    return bytes((buttons, x & 0xFF, x >> 8, y & 0xFF, y >> 8, wheel & 0xFF))
+
+
+def test_round_trip():
+    recorded = events()
+    stream, _ = encode(recorded)
+    stream.seek(0)
+    decoder = EventDecoder(stream, chunk_size=7, layout=LAYOUT)
+    previous = 0
+    for time_us, buttons, x, y, wheel in recorded:
+        delay = decoder.next()
+        assert delay == (time_us - previous if previous else 0)
+        previous = time_us
+        assert decoder.time_us == time_us
+        assert bytes(decoder.report) == report(buttons, x, y, wheel)
+    assert decoder.next() is None
+    assert decoder.next() is None
+
+
+def test_runs_are_compact():
+    recorded = [(1000 * (index + 1), 0, 5, 5, 0) for index in range(200)]
+    stream, encoder = encode(recorded, keyframe_interval=1000)
+    events_size = encoder.size - FOOTER_SIZE - 8 * len(encoder.keyframes)
+    assert events_size < 20
+
+
+def test_index_is_stored():
+    stream, encoder = encode(events(), keyframe_interval=16)
+    data = stream.getvalue()
+    assert data[-FOOTER_SIZE:-FOOTER_SIZE + 4] == INDEX_MAGIC
+    # A decoder that never saw the encoder finds the keyframes.
+    decoder = EventDecoder(io.BytesIO(data), layout=LAYOUT)
+    assert decoder.keyframes() == encoder.keyframes
+    assert len(encoder.keyframes) == 300 // 16 + 1
+
+
+@pytest.mark.parametrize("index", [0, 1, 15, 16, 17, 150, 299])
+def test_seek_event_in_stored_stream(index):
+    recorded = events()
+    stream, _ = encode(recorded)
+    decoder = EventDecoder(io.BytesIO(stream.getvalue()), chunk_size=16, layout=LAYOUT)
+    decoder.next()
+    decoder.seek_event(index)
+    time_us, buttons, x, y, wheel = recorded[index]
+    assert decoder.next() is not None
+    assert decoder.time_us == time_us
+    assert bytes(decoder.report) == report(buttons, x, y, wheel)
+
+
+def test_seek_event_without_index_scans():
+    recorded = events(40)
+    stream = io.BytesIO()
+    encoder = EventEncoder(stream, 16)
+    for event in recorded:
+        encoder.add(*event)
+    encoder._flush_run()  # pylint: disable=protected-access
+    decoder = EventDecoder(io.BytesIO(stream.getvalue()), layout=LAYOUT)
+    assert decoder.keyframes() == []
+    decoder.seek_event(33)
+    decoder.next()
+    assert decoder.time_us == recorded[33][0]
+    with pytest.raises(IndexError):
+        decoder.seek_event(41)
+
+
+def test_wide_wheel_is_sign_extended():
+    stream, _ = encode([(1000, 0, 1, 1, -2), (2000, 0, 1, 1, 3)])
+    stream.seek(0)
+    decoder = EventDecoder(stream, layout=SCROLL_MOUSE.layout())
+    decoder.next()
+    assert decoder.report[5:7] == b"\xfe\xff"
+    decoder.next()
+    assert decoder.report[5:7] == b"\x03\x00"
+
+
+def test_chord_layout_keeps_modifiers_zero():
+    stream, _ = encode([(1000, 1, 2, 3, 0)])
+    stream.seek(0)
+    decoder = EventDecoder(stream, layout=CHORD_MOUSE.layout())
+    decoder.next()
+    assert len(decoder.report) == 7 and decoder.report[6] == 0
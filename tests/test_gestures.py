@@ -0,0 +1,94 @@
+"""Reports compiled by ``lib/gestures.py`` and their playback."""
+
+from gestures import LEFT_BUTTON, RIGHT_BUTTON, GestureComposer
+from hid_descriptor import ABSOLUTE_MOUSE, SCROLL_MOUSE
+
+
+class Device:
+    def __init__(self):
+        self.reports = []
+
+    def send_report(self, report, report_id=None):
+        self.reports.append(bytes(report))
+
+
+class Mouse:
+    def __init__(self, descriptor=ABSOLUTE_MOUSE):
+        self.layout = descriptor.layout()
+        self.report = self.layout.new_report()
+        self._mouse_device = Device()
+
+
+def report(buttons, x, y, length=6):
+    return bytes((buttons, x & 0xFF, x >> 8, y & 0xFF, y >> 8)) + bytes(length - 5)
+
+
+def reports(composer, handle):
+    gesture = composer.gestures[handle]
+    step = composer.report_length
+    data = gesture.reports
+    return [bytes(data[start:start + step]) for start in range(0, len(data), step)]
+
+
+def test_click_rides_the_move_on_the_press():
+    composer = GestureComposer(Mouse(), hold_ns=5, gap_ns=7)
+    handle = composer.click(100, 200, count=2)
+    assert reports(composer, handle) == [
+        report(1, 100, 200),
+        report(0, 100, 200),
+        report(1, 100, 200),
+        report(0, 100, 200),
+    ]
+    assert list(composer.gestures[handle].waits) == [5, 7, 5, 0]
+    assert composer.frames_in == 5 and composer.reports_out == 4
+
+
+def test_drag_without_step_wait_is_three_reports():
+    composer = GestureComposer(Mouse(), hold_ns=5)
+    handle = composer.drag(0, 0, 800, 400, steps=4, step_ns=0)
+    # Press, the last move, and the release where the drag ends.
+    assert reports(composer, handle) == [report(1, 0, 0), report(1, 800, 400), report(0, 800, 400)]
+    assert list(composer.gestures[handle].waits) == [5, 0, 0]
+
+
+def test_drag_steps_are_kept_with_a_wait():
+    composer = GestureComposer(Mouse(), hold_ns=5)
+    handle = composer.drag(0, 0, 400, 0, steps=4, step_ns=3)
+    assert [r[1] | r[2] << 8 for r in reports(composer, handle)] == [0, 100, 200, 300, 400, 400]
+    assert composer.gestures[handle].duration_ns == 5 + 4 * 3
+
+
+def test_identical_frames_add_their_waits():
+    composer = GestureComposer(Mouse())
+    handle = composer.compile([(1, 5, 5, 10), (1, 5, 5, 20), (0, 5, 5, 0)])
+    assert reports(composer, handle) == [report(1, 5, 5), report(0, 5, 5)]
+    assert list(composer.gestures[handle].waits) == [30, 0]
+
+
+def test_chord_releases_are_never_merged():
+    composer = GestureComposer(Mouse(), hold_ns=0)
+    handle = composer.chord_drag(0, 0, 10, 10, (LEFT_BUTTON, RIGHT_BUTTON), steps=1, step_ns=0)
+    assert [r[0] for r in reports(composer, handle)] == [1, 3, 3, 1, 0]
+
+
+def test_coordinates_are_clamped():
+    composer = GestureComposer(Mouse())
+    handle = composer.compile([(0, -5, 40000, 0)])
+    assert reports(composer, handle) == [report(0, 0, 32767)]
+
+
+def test_cached_by_arguments():
+    composer = GestureComposer(Mouse())
+    handle = composer.click(1, 2)
+    assert composer.click(1, 2) == handle
+    assert composer.click(1, 3) != handle
+    assert composer.frames_in == 6
+
+
+def test_play_sends_and_follows():
+    mouse = Mouse(SCROLL_MOUSE)
+    composer = GestureComposer(mouse, hold_ns=1, gap_ns=1)
+    handle = composer.click(300, 400)
+    composer.play(handle)
+    assert mouse._mouse_device.reports == [report(1, 300, 400, 9), report(0, 300, 400, 9)]
+    assert mouse.report == bytearray(report(0, 300, 400, 9))
@@ -0,0 +1,224 @@
+"""The generated descriptors against the known bytes, and their layouts against the bytes.
+
+``ABSOLUTE_MOUSE`` must stay identical to the hand-written descriptor that
+``boot.py`` used before ``hid_descriptor``. The layouts the drivers pack
+reports with are checked against a small independent parse of the bytes, so
+a descriptor and its layout cannot drift apart.
+"""
+
+import os
+
+import pytest
+
+from hid_descriptor import ABSOLUTE_MOUSE, CHORD_MOUSE, SCROLL_MOUSE, mouse_descriptor
+
+# fmt: off
+# The hand-written descriptor of lib/absolute_mouse/descriptor.py.py.
+ABSOLUTE_REFERENCE = bytes((
+    0x05, 0x01,        # Usage Page (Generic Desktop)
+    0x09, 0x02,        # Usage (Mouse)
+    0xA1, 0x01,        # Collection (Application)
+    0x09, 0x01,        #   Usage (Pointer)
+    0xA1, 0x00,        #   Collection (Physical)
+    0x85, 0x0B,        #     Report ID (11)
+    0x05, 0x09,        #     Usage Page (Button)
+    0x19, 0x01,        #     Usage Minimum (1)
+    0x29, 0x05,        #     Usage Maximum (5)
+    0x15, 0x00,        #     Logical Minimum (0)
+    0x25, 0x01,        #     Logical Maximum (1)
+    0x95, 0x05,        #     Report Count (5)
+    0x75, 0x01,        #     Report Size (1)
+    0x81, 0x02,        #     Input (Data, Var, Abs)
+    0x75, 0x03,        #     Report Size (3)
+    0x95, 0x01,        #     Report Count (1)
+    0x81, 0x03,        #     Input (Const)
+    0x05, 0x01,        #     Usage Page (Generic Desktop)
+    0x09, 0x30,        #     Usage (X)
+    0x09, 0x31,        #     Usage (Y)
+    0x15, 0x00,        #     Logical Minimum (0)
+    0x26, 0xFF, 0x7F,  #     Logical Maximum (32767)
+    0x75, 0x10,        #     Report Size (16)
+    0x95, 0x02,        #     Report Count (2)
+    0x81, 0x02,        #     Input (Data, Var, Abs)
+    0x09, 0x38,        #     Usage (Wheel)
+    0x15, 0x81,        #     Logical Minimum (-127)
+    0x25, 0x7F,        #     Logical Maximum (127)
+    0x75, 0x08,        #     Report Size (8)
+    0x95, 0x01,        #     Report Count (1)
+    0x81, 0x06,        #     Input (Data, Var, Rel)
+    0xC0,              #   End Collection
+    0xC0,              # End Collection
+))
+
+# ABSOLUTE_REFERENCE with the 8 modifier bits of a keyboard before the end.
+CHORD_REFERENCE = ABSOLUTE_REFERENCE[:-2] + bytes((
+    0x05, 0x07,        #     Usage Page (Keyboard)
+    0x19, 0xE0,        #     Usage Minimum (Left Control)
+    0x29, 0xE7,        #     Usage Maximum (Right GUI)
+    0x15, 0x00,        #     Logical Minimum (0)
+    0x25, 0x01,        #     Logical Maximum (1)
+    0x95, 0x08,        #     Report Count (8)
+    0x75, 0x01,        #     Report Size (1)
+    0x81, 0x02,        #     Input (Data, Var, Abs)
+    0xC0,              #   End Collection
+    0xC0,              # End Collection
+))
+
+# Resolution multiplier of a high resolution wheel or pan: a 2 bit feature
+# field in its own logical collection, padded to a byte.
+_MULTIPLIER = bytes((
+    0xA1, 0x02,        #     Collection (Logical)
+    0x09, 0x48,        #       Usage (Resolution Multiplier)
+    0x15, 0x00,        #       Logical Minimum (0)
+    0x25, 0x01,        #       Logical Maximum (1)
+    0x35, 0x01,        #       Physical Minimum (1)
+    0x45, 0x08,        #       Physical Maximum (8)
+    0x75, 0x02,        #       Report Size (2)
+    0x95, 0x01,        #       Report Count (1)
+    0xB1, 0x02,        #       Feature (Data, Var, Abs)
+    0x35, 0x00,        #       Physical Minimum (0)
+    0x45, 0x00,        #       Physical Maximum (0)
+    0x75, 0x06,        #       Report Size (6)
+    0x95, 0x01,        #       Report Count (1)
+    0xB1, 0x03,        #       Feature (Const)
+))
+_SIGNED_16 = bytes((
+    0x16, 0x01, 0x80,  #       Logical Minimum (-32767)
+    0x26, 0xFF, 0x7F,  #       Logical Maximum (32767)
+    0x75, 0x10,        #       Report Size (16)
+    0x95, 0x01,        #       Report Count (1)
+    0x81, 0x06,        #       Input (Data, Var, Rel)
+))
+
+# The wheel and pan of ABSOLUTE_REFERENCE replaced by high resolution ones.
+SCROLL_REFERENCE = (
+    ABSOLUTE_REFERENCE[:ABSOLUTE_REFERENCE.index(bytes((0x09, 0x38)))]
+    + _MULTIPLIER + bytes((0x09, 0x38)) + _SIGNED_16 + bytes((0xC0,))
+    + _MULTIPLIER + bytes((0x05, 0x0C, 0x0A, 0x38, 0x02)) + _SIGNED_16 + bytes((0xC0,))
+    + bytes((0xC0, 0xC0))
+)
+# fmt: on
+
+
+def _parse(descriptor):
+    """Input and feature report sizes in bits and the balance of the collections.
+
+    Only the items these descriptors use: enough to check the layouts without
+    going through ``hid_descriptor``.
+    """
+    size = count = 0
+    input_bits = feature_bits = 0
+    depth = 0
+    index = 0
+    while index < len(descriptor):
+        prefix = descriptor[index]
+        length = (0, 1, 2, 4)[prefix & 0x03]
+        value = int.from_bytes(descriptor[index + 1:index + 1 + length], "little")
+        tag = prefix & 0xFC
+        if tag == 0x74:
+            size = value
+        elif tag == 0x94:
+            count = value
+        elif tag == 0x80:
+            input_bits += size * count
+        elif tag == 0xB0:
+            feature_bits += size * count
+        elif tag == 0xA0:
+            depth += 1
+        elif tag == 0xC0:
+            depth -= 1
+            assert depth >= 0, "End Collection without a Collection"
+        index += 1 + length
+    return input_bits, feature_bits, depth
+
+
+@pytest.mark.parametrize(
+    "descriptor, reference",
+    [
+        (ABSOLUTE_MOUSE, ABSOLUTE_REFERENCE),
+        (SCROLL_MOUSE, SCROLL_REFERENCE),
+        (CHORD_MOUSE, CHORD_REFERENCE),
+    ],
+    ids=["absolute", "scroll", "chord"],
+)
+def test_descriptor_bytes(descriptor, reference):
+    assert descriptor.report_descriptor == reference
+    assert descriptor.report_ids == (11,)
+
+
+@pytest.mark.parametrize("descriptor", [ABSOLUTE_MOUSE, SCROLL_MOUSE, CHORD_MOUSE], ids=["absolute", "scroll", "chord"])
+def test_layout_matches_bytes(descriptor):
+    input_bits, feature_bits, depth = _parse(descriptor.report_descriptor)
+    layout = descriptor.layout()
+    assert depth == 0
+    assert layout.length * 8 == input_bits
+    assert layout.feature_length * 8 == feature_bits
+    assert descriptor.in_report_lengths == (layout.length,)
+    assert descriptor.feature_report_lengths == (layout.feature_length,)
+
+
+def test_absolute_layout():
+    layout = ABSOLUTE_MOUSE.layout()
+    assert layout.length == 6
+    assert layout.fields == {
+        "buttons": (0, 5, 0, 31),
+        "x": (8, 16, 0, 32767),
+        "y": (24, 16, 0, 32767),
+        "wheel": (40, 8, -127, 127),
+    }
+    assert layout.feature_fields == {}
+
+
+def test_scroll_layout():
+    layout = SCROLL_MOUSE.layout()
+    assert layout.length == 9
+    assert layout.fields["wheel"] == (40, 16, -32767, 32767)
+    assert layout.fields["pan"] == (56, 16, -32767, 32767)
+    assert layout.feature_length == 2
+    assert layout.feature_fields == {
+        "wheel_multiplier": (0, 2, 1, 8),
+        "pan_multiplier": (8, 2, 1, 8),
+    }
+
+
+def test_chord_layout():
+    layout = CHORD_MOUSE.layout()
+    assert layout.length == 7
+    # The first 6 bytes are those of ABSOLUTE_MOUSE.
+    for name, field in ABSOLUTE_MOUSE.layout().fields.items():
+        assert layout.fields[name] == field
+    assert layout.offset("modifiers") == 6
+
+
+def test_packers_write_the_report_bytes():
+    layout = SCROLL_MOUSE.layout()
+    report = layout.new_report()
+    layout.packer("buttons")(report, 0x15)
+    layout.packer("x")(report, 0x1234)
+    layout.packer("y")(report, 32767)
+    layout.packer("wheel")(report, -2)
+    layout.packer("pan")(report, 3)
+    assert report == bytes((0x15, 0x34, 0x12, 0xFF, 0x7F, 0xFE, 0xFF, 0x03, 0x00))
+
+
+@pytest.mark.parametrize(
+    "settings, expected",
+    [
+        ({}, ABSOLUTE_MOUSE),
+        ({"HID_HIGH_RES_SCROLL": "1"}, SCROLL_MOUSE),
+        ({"HID_CHORD_MOUSE": "1"}, CHORD_MOUSE),
+        # Environment variables are strings on a desktop: "0" is off.
+        ({"HID_HIGH_RES_SCROLL": "0", "HID_CHORD_MOUSE": "0"}, ABSOLUTE_MOUSE),
+        ({"HID_HIGH_RES_SCROLL": 0, "HID_CHORD_MOUSE": 1}, CHORD_MOUSE),
+    ],
+)
+def test_mouse_descriptor(monkeypatch, settings, expected):
+    monkeypatch.setattr(os, "getenv", settings.get)
+    assert mouse_descriptor() is expected
+
+
+def test_mouse_descriptor_rejects_both(monkeypatch):
+    settings = {"HID_HIGH_RES_SCROLL": "1", "HID_CHORD_MOUSE": "1"}
+    monkeypatch.setattr(os, "getenv", settings.get)
+    with pytest.raises(ValueError):
+        mouse_descriptor()
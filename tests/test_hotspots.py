@@ -0,0 +1,80 @@
+"""Targets of ``lib/hotspots.py``: moves during a drag and ids after a reload."""
+
+import pytest
+
+from hid_descriptor import ABSOLUTE_MOUSE
+from hotspots import Hotspots
+from screen_mapper import ScreenMapper
+
+
+class Device:
+    def __init__(self):
+        self.reports = []
+
+    def send_report(self, report, report_id=None):
+        self.reports.append(bytes(report))
+
+
+class Mouse:
+    def __init__(self):
+        self.layout = ABSOLUTE_MOUSE.layout()
+        self.report = self.layout.new_report()
+        self._mouse_device = Device()
+
+    def press(self, buttons):
+        self.report[0] |= buttons
+        self._mouse_device.send_report(self.report)
+
+    def release(self, buttons):
+        self.report[0] &= ~buttons
+        self._mouse_device.send_report(self.report)
+
+
+def registry(tmp_path, text):
+    path = tmp_path / "hotspots.txt"
+    path.write_text(text)
+    hotspots = Hotspots(Mouse(), ScreenMapper(1000, 1000))
+    hotspots.load(str(path))
+    return hotspots, path
+
+
+def test_move_keeps_held_buttons(tmp_path):
+    hotspots, _ = registry(tmp_path, "a 0 0\nb 999 999\n")
+    mouse = hotspots.mouse
+    hotspots.move_to_target("a")
+    mouse.press(1)
+    hotspots.move_to_target("b")
+    assert mouse._mouse_device.reports[-1][0] == 1
+    assert mouse.report[0] == 1
+    # The stored report stays released.
+    assert hotspots.report("b")[0] == 0
+    mouse.release(1)
+    assert mouse._mouse_device.reports[-1] == bytes(hotspots.report("b"))
+
+
+def test_click_target(tmp_path):
+    hotspots, _ = registry(tmp_path, "# comment\n\nsubmit 999 0\n")
+    hotspots.click_target("submit")
+    assert [report[0] for report in hotspots.mouse._mouse_device.reports] == [0, 1, 0]
+    assert hotspots.position("submit") == (hotspots.screen.map_x(999), 0)
+
+
+def test_stale_id_after_reload(tmp_path):
+    hotspots, path = registry(tmp_path, "a 1 1\nb 2 2\nc 3 3\n")
+    stale = hotspots.id("c")
+    path.write_text("a 1 1\n# the rest removed, a longer file to change the size\n")
+    assert hotspots.reload()
+    assert len(hotspots) == 1
+    with pytest.raises(IndexError):
+        hotspots.move_to_target(stale)
+    with pytest.raises(KeyError):
+        hotspots.report("c")
+    assert hotspots.mouse._mouse_device.reports == []
+
+
+def test_bad_line_keeps_targets(tmp_path):
+    hotspots, path = registry(tmp_path, "a 1 1\n")
+    path.write_text("a 1\n")
+    with pytest.raises(ValueError):
+        hotspots.load(str(path))
+    assert hotspots.names == ["a"]
@@ -0,0 +1,114 @@
+"""The macro file format of ``lib/macro.py``, written and played back."""
+
+import struct
+
+import pytest
+
+from macro import (
+    HEADER_SIZE,
+    KEYBOARD,
+    MAGIC,
+    MAX_REPORT_LENGTH,
+    MOUSE,
+    RECORD_SIZE,
+    REPORT_OFFSET,
+    VERSION,
+    MacroPlayer,
+    MacroRecorder,
+)
+
+
+class Sink:
+    """Keeps a copy of every report sent to it."""
+
+    def __init__(self):
+        self.reports = []
+
+    def send_report(self, report, report_id=None):
+        self.reports.append(bytes(report))
+
+
+REPORTS = [
+    (MOUSE, bytes((1, 2, 3, 4, 5, 6))),
+    (KEYBOARD, bytes((2, 0, 4, 0, 0, 0, 0, 0))),
+    # SCROLL_MOUSE report: 9 bytes.
+    (MOUSE, bytes((0, 0xFF, 0x7F, 0xFF, 0x7F, 0xFE, 0xFF, 0x03, 0x00))),
+]
+
+
+def record(path, reports=REPORTS):
+    with MacroRecorder(str(path), chunk_records=2) as recorder:
+        for device_index, report in reports:
+            recorder.record(device_index, report)
+
+
+def play(path, speed_percent=100_000):
+    mouse, keyboard = Sink(), Sink()
+    player = MacroPlayer(str(path), (mouse, keyboard), chunk_records=2)
+    player.play(speed_percent)
+    return mouse.reports, keyboard.reports, player.played
+
+
+def test_file_layout(tmp_path):
+    path = tmp_path / "layout.mac"
+    record(path)
+    data = path.read_bytes()
+    assert data[0:4] == MAGIC and data[4] == VERSION and data[5] == RECORD_SIZE
+    assert len(data) == HEADER_SIZE + RECORD_SIZE * len(REPORTS)
+    for index, (device_index, report) in enumerate(REPORTS):
+        offset = HEADER_SIZE + RECORD_SIZE * index
+        _, stored_index, length = struct.unpack_from("<IBB", data, offset)
+        assert (stored_index, length) == (device_index, len(report))
+        stored = data[offset + REPORT_OFFSET : offset + RECORD_SIZE]
+        assert stored == report + bytes(MAX_REPORT_LENGTH - len(report))
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "round.mac"
+    record(path)
+    mouse, keyboard, played = play(path)
+    assert played == len(REPORTS)
+    assert mouse == [report for device, report in REPORTS if device == MOUSE]
+    assert keyboard == [report for device, report in REPORTS if device == KEYBOARD]
+
+
+def test_too_long_report_is_refused(tmp_path):
+    with MacroRecorder(str(tmp_path / "long.mac")) as recorder:
+        with pytest.raises(ValueError):
+            recorder.record(MOUSE, bytes(MAX_REPORT_LENGTH + 1))
+        assert recorder.count == 0
+
+
+def test_version_1_file_plays(tmp_path):
+    path = tmp_path / "v1.mac"
+    record(path, REPORTS[:2])
+    data = bytearray(path.read_bytes())
+    data[4] = 1
+    path.write_bytes(data)
+    assert play(path)[2] == 2
+
+
+@pytest.mark.parametrize(
+    "damage",
+    [
+        lambda data: data[:-3],
+        lambda data: data[:4] + bytes((VERSION + 1,)) + data[5:],
+        lambda data: data[:HEADER_SIZE - 1],
+        lambda data: b"XMAC" + data[4:],
+    ],
+    ids=["cut record", "newer version", "short header", "magic"],
+)
+def test_damaged_file_is_refused(tmp_path, damage):
+    path = tmp_path / "damaged.mac"
+    record(path)
+    path.write_bytes(damage(path.read_bytes()))
+    with pytest.raises(ValueError):
+        play(path)
+
+
+@pytest.mark.parametrize("speed", [0, -50])
+def test_speed_must_be_positive(tmp_path, speed):
+    path = tmp_path / "speed.mac"
+    record(path)
+    with pytest.raises(ValueError):
+        play(path, speed_percent=speed)
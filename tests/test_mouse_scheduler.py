@@ -0,0 +1,52 @@
+"""``AsyncMouse`` clicks of ``lib/mouse_scheduler.py`` under cancellation."""
+
+import asyncio
+
+import pytest
+
+from mouse_scheduler import AsyncMouse
+
+
+class Mouse:
+    def __init__(self):
+        self.calls = []
+
+    def move_to(self, x, y):
+        self.calls.append(("move_to", x, y))
+
+    def press(self, buttons):
+        self.calls.append(("press", buttons))
+
+    def release(self, buttons):
+        self.calls.append(("release", buttons))
+
+
+def cancel_during_hold(action):
+    """Run ``action``, cancel it once the buttons are down, return the driver calls."""
+
+    async def main(mouse):
+        task = asyncio.create_task(action(AsyncMouse(mouse, hold_ns=10_000_000_000, settle_ns=0)))
+        while ("press", 1) not in mouse.calls:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    mouse = Mouse()
+    asyncio.run(main(mouse))
+    return mouse.calls
+
+
+def test_click_releases_when_cancelled():
+    assert cancel_during_hold(lambda mouse: mouse.click(1)) == [("press", 1), ("release", 1)]
+
+
+def test_click_at_releases_when_cancelled():
+    calls = cancel_during_hold(lambda mouse: mouse.click_at(5, 6, 1))
+    assert calls == [("move_to", 5, 6), ("press", 1), ("release", 1)]
+
+
+def test_click_releases_after_hold():
+    mouse = Mouse()
+    asyncio.run(AsyncMouse(mouse, hold_ns=1_000_000).click(2))
+    assert mouse.calls == [("press", 2), ("release", 2)]
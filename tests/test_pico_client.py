@@ -0,0 +1,183 @@
+"""``pico_client.AsyncClient`` end to end over a pty, against a scripted fake board.
+
+The fake board reads the frames on the device end of the pty and answers
+each one as ``answer(opcode, sequence)`` says: a status, or ``None`` for no
+answer at all.
+"""
+
+import asyncio
+import os
+import select
+import struct
+import threading
+import tty
+
+import pytest
+
+from command_protocol import (
+    ACK_SYNC,
+    FRAME_SIZE,
+    MOVE,
+    PRESS,
+    RELEASE,
+    STATS,
+    STATUS_FAILED,
+    STATUS_OK,
+    SYNC,
+    crc8,
+)
+from pico_client import AsyncClient, CommandError
+from pico_client.client import STATS_SIZE
+
+STATS_ANSWER = struct.pack("<IIIIII", 5, 1, 1, 20, 0, 0) + struct.pack("<16I", *range(16))
+
+
+class FakeBoard:
+    """Device end of a pty answering frames from a thread.
+
+    :param answer: ``answer(opcode, sequence)``, the status to answer or ``None``.
+    :param batch: acknowledgements held back until this many frames arrived,
+        so a client that does not pipeline never gets an answer.
+    """
+
+    def __init__(self, answer, batch=1):
+        self.host, self.device = os.openpty()
+        tty.setraw(self.device)
+        self.answer = answer
+        self.batch = batch
+        self.frames = []
+        """``(sequence, opcode)`` of every frame received."""
+        self._held = bytearray()
+        self._held_count = 0
+        self._stop = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.start()
+
+    def acknowledge(self, sequence, status=STATUS_OK):
+        """Write one acknowledgement now."""
+        os.write(self.device, self._ack(sequence, status))
+
+    @staticmethod
+    def _ack(sequence, status):
+        ack = bytearray((ACK_SYNC, sequence, status, 0))
+        ack[3] = crc8(ack, 0, 3)
+        return ack
+
+    def _run(self):
+        buffer = bytearray()
+        while not self._stop:
+            if not select.select([self.device], [], [], 0.01)[0]:
+                continue
+            buffer += os.read(self.device, 4096)
+            while len(buffer) >= FRAME_SIZE:
+                assert buffer[0] == SYNC and crc8(buffer, 0, 8) == buffer[8]
+                sequence, opcode = buffer[1], buffer[2]
+                del buffer[:FRAME_SIZE]
+                self.frames.append((sequence, opcode))
+                status = self.answer(opcode, sequence)
+                if status is None:
+                    continue
+                self._held += self._ack(sequence, status)
+                if opcode == STATS and status == STATUS_OK:
+                    self._held += STATS_ANSWER
+                self._held_count += 1
+                if self._held_count >= self.batch:
+                    os.write(self.device, self._held)
+                    self._held = bytearray()
+                    self._held_count = 0
+
+    def stop(self):
+        self._stop = True
+        self._thread.join()
+        os.close(self.device)
+
+
+def run(board, scenario, **kwargs):
+    """Run ``scenario(client)`` against ``board``, then close both ends."""
+
+    async def main():
+        client = await AsyncClient.open(board.host, **kwargs)
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+
+    try:
+        return asyncio.run(main())
+    finally:
+        board.stop()
+
+
+def test_stats_size_matches_the_board():
+    assert len(STATS_ANSWER) == STATS_SIZE
+
+
+def test_pipelined_acks():
+    # The board answers only once 8 frames are in: a client waiting for each
+    # acknowledgement before sending the next would time out.
+    board = FakeBoard(lambda opcode, sequence: STATUS_OK, batch=8)
+
+    async def scenario(client):
+        futures = [await client.submit(MOVE, 0, index, index) for index in range(32)]
+        assert client.in_flight == 8
+        failed = await client.drain()
+        return failed, [future.result() for future in futures], client.latency.count
+
+    failed, results, count = run(board, scenario, window=8, timeout=2.0)
+    assert failed == 0 and count == 32
+    assert results == [None] * 32
+    assert board.frames == [(sequence, MOVE) for sequence in range(32)]
+
+
+def test_stats_answer():
+    board = FakeBoard(lambda opcode, sequence: STATUS_OK)
+
+    async def scenario(client):
+        await client.move(1, 2)
+        return await client.stats()
+
+    stats = run(board, scenario)
+    assert stats["sent"] == 5 and stats["failed"] == 1 and stats["max_stall_us"] == 20
+    assert stats["histogram"] == list(range(16))
+
+
+def test_error_status_raises_command_error():
+    board = FakeBoard(lambda opcode, sequence: STATUS_FAILED if opcode == PRESS else STATUS_OK)
+
+    async def scenario(client):
+        with pytest.raises(CommandError) as raised:
+            await client.press(1)
+        await client.move(3, 4)
+        return raised.value, await client.drain()
+
+    error, failed = run(board, scenario)
+    assert error.sequence == 0 and error.status == STATUS_FAILED
+    assert failed == 1
+
+
+def test_timed_out_sequence_stays_quarantined():
+    # The release is never answered until the test acknowledges it late.
+    board = FakeBoard(lambda opcode, sequence: None if opcode == RELEASE else STATUS_OK)
+
+    async def scenario(client):
+        await client.move(1, 1)
+        with pytest.raises(asyncio.TimeoutError):
+            await client.release(1)
+        assert client.in_flight == 1
+        # Enough commands to wrap the sequence numbers past the timed out one.
+        for index in range(260):
+            await client.move(index, index)
+        assert client.in_flight == 1
+        board.acknowledge(1)
+        for _ in range(100):
+            if not client.in_flight:
+                break
+            await asyncio.sleep(0.01)
+        return client.in_flight
+
+    in_flight = run(board, scenario, window=4, timeout=1.0)
+    assert in_flight == 0
+    sequences = [sequence for sequence, opcode in board.frames if opcode == MOVE]
+    # Sequence 1 was never given to a newer command while quarantined.
+    assert 1 not in sequences
+    assert len(sequences) == 261
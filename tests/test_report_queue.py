@@ -0,0 +1,108 @@
+"""``ReportQueue`` of ``lib/report_queue.py`` in front of a host that is not ready."""
+
+import time
+
+import pytest
+
+import report_queue
+from report_queue import BLOCK, COALESCE, DROP_OLDEST, ReportQueue
+
+
+class Device:
+    """Takes reports only while ``ready``."""
+
+    usage_page = 0x01
+    usage = 0x02
+
+    def __init__(self):
+        self.ready = True
+        self.reports = []
+
+    def send_report(self, report, report_id=None):
+        if not self.ready:
+            raise OSError("not ready")
+        self.reports.append(bytes(report))
+
+
+def mouse_report(buttons, x=0, wheel=0):
+    return bytes((buttons, x & 0xFF, x >> 8, 0, 0, wheel & 0xFF))
+
+
+def new_queue(policy, capacity=4, **kwargs):
+    kwargs.setdefault("min_backoff_ns", 0)
+    return ReportQueue(
+        Device(), 6, capacity, policy, state_bytes=(0,), relative_bytes=(5,), **kwargs
+    )
+
+
+def fill_with_clicks(queue):
+    """Queue presses and releases until the ring is full, with the host refusing."""
+    queue.device.ready = False
+    for index in range(queue.capacity):
+        queue.enqueue(mouse_report((index + 1) & 1))
+
+
+@pytest.mark.parametrize("policy", [DROP_OLDEST, COALESCE])
+def test_full_of_button_changes_fails_fast(policy, monkeypatch):
+    # With a backoff running, a waiting queue would sleep it out.
+    queue = new_queue(policy, min_backoff_ns=50_000_000)
+    fill_with_clicks(queue)
+
+    def sleep(seconds):
+        raise AssertionError("enqueue slept")
+
+    monkeypatch.setattr(report_queue.time, "sleep", sleep)
+    start = time.monotonic_ns()
+    with pytest.raises(OSError):
+        queue.enqueue(mouse_report(1))
+    assert time.monotonic_ns() - start < 10_000_000
+    assert queue.pending == queue.capacity
+
+
+def test_full_ring_takes_a_report_once_the_host_is_back():
+    queue = new_queue(COALESCE)
+    fill_with_clicks(queue)
+    queue.device.ready = True
+    assert queue.enqueue(mouse_report(1))
+    assert len(queue.device.reports) == queue.capacity
+
+
+def test_block_waits_then_raises():
+    queue = new_queue(BLOCK)
+    queue.block_timeout_ns = 20_000_000
+    fill_with_clicks(queue)
+    start = time.monotonic_ns()
+    with pytest.raises(OSError):
+        queue.enqueue(mouse_report(1))
+    assert time.monotonic_ns() - start >= queue.block_timeout_ns
+
+
+def test_full_ring_drops_moves_not_clicks():
+    queue = new_queue(COALESCE)
+    queue.device.ready = False
+    for report in (mouse_report(0, 1), mouse_report(1, 1), mouse_report(0, 2), mouse_report(0, 3)):
+        queue.enqueue(report)
+    # A wheel turn never merges: the oldest move makes room.
+    assert not queue.enqueue(mouse_report(0, 3, wheel=1))
+    assert queue.dropped == 1
+    queue.device.ready = True
+    queue.drain()
+    assert [report[0] for report in queue.device.reports] == [1, 0, 0, 0]
+
+
+def test_clear_forgets_the_buttons_sent():
+    queue = new_queue(DROP_OLDEST)
+    queue.send_report(mouse_report(1))
+    queue.clear()
+    queue.device.ready = False
+    # The press after a clear is a change, not a move to drop for room.
+    for report in (mouse_report(1, 1), mouse_report(0, 1), mouse_report(1, 1), mouse_report(0, 1)):
+        queue.enqueue(report)
+    with pytest.raises(OSError):
+        queue.enqueue(mouse_report(0, 2))
+    queue.clear()
+    assert queue.pending == 0 and queue.ready
+    queue.enqueue(mouse_report(0, 5))
+    queue.device.ready = True
+    queue.drain()
+    assert queue.device.reports[-1] == mouse_report(0, 5)
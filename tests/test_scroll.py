@@ -0,0 +1,91 @@
+"""The fractional accumulator and report splitting of ``lib/scroll.py``."""
+
+import pytest
+
+from hid_descriptor import ABSOLUTE_MOUSE, SCROLL_MOUSE
+from scroll import WHEEL_DELTA, ScrollEngine
+
+
+class Mouse:
+    """Keeps the ``(wheel, pan)`` of every ``scroll()`` call."""
+
+    def __init__(self, descriptor, resolution=None):
+        self.layout = descriptor.layout()
+        self.scrolls = []
+        if resolution is not None:
+            self.wheel_resolution = lambda: resolution
+
+    def scroll(self, wheel, pan):
+        self.scrolls.append((wheel, pan))
+
+
+def engine(descriptor=SCROLL_MOUSE, **kwargs):
+    mouse = Mouse(descriptor)
+    return ScrollEngine(mouse, rate_hz=100_000, **kwargs), mouse
+
+
+@pytest.mark.parametrize("sign", [1, -1])
+def test_fractions_add_up(sign):
+    scroller, mouse = engine()
+    for _ in range(120):
+        scroller.add(sign * 13)
+    scroller.flush()
+    # 120 * 13 units are 13 detents, whatever the order they came in.
+    assert sum(wheel for wheel, _ in mouse.scrolls) == sign * 13
+    assert scroller.wheel_pending == 0
+
+
+def test_fraction_waits_for_the_next_call():
+    scroller, mouse = engine()
+    scroller.add(WHEEL_DELTA - 1)
+    assert not scroller.pending and scroller.step() == 0
+    scroller.add(1)
+    assert scroller.wheel_pending == 1
+    # Opposite directions cancel in the accumulator.
+    scroller.add(-60)
+    scroller.add(-60)
+    scroller.add(-1)
+    assert scroller.wheel_pending == 0
+    assert mouse.scrolls == []
+
+
+def test_multiplier_scales_counts_and_rest():
+    scroller, _ = engine(multiplier=8)
+    scroller.add(WHEEL_DELTA // 2)
+    assert scroller.wheel_pending == 4
+    scroller.add(10)
+    assert scroller.wheel_pending == 4
+    scroller.refresh(1)
+    # The 10 units left over stay 10 units at one count per detent.
+    scroller.add(WHEEL_DELTA - 11)
+    assert scroller.wheel_pending == 4
+    scroller.add(1)
+    assert scroller.wheel_pending == 5
+
+
+def test_multiplier_read_from_the_mouse():
+    scroller = ScrollEngine(Mouse(SCROLL_MOUSE, resolution=8))
+    assert scroller.multiplier == 8
+
+
+def test_large_scroll_is_split_by_field_width():
+    scroller, mouse = engine(ABSOLUTE_MOUSE)
+    scroller.scroll(-300 * WHEEL_DELTA)
+    assert mouse.scrolls == [(-127, 0), (-127, 0), (-46, 0)]
+    assert scroller.last_reports == 3 and scroller.counts_sent == 300
+
+
+def test_pan_needs_a_pan_field():
+    scroller, mouse = engine(ABSOLUTE_MOUSE)
+    scroller.scroll(0, 5 * WHEEL_DELTA)
+    assert mouse.scrolls == []
+    scroller, mouse = engine()
+    scroller.scroll(WHEEL_DELTA, -2 * WHEEL_DELTA)
+    assert mouse.scrolls == [(1, -2)]
+
+
+def test_smooth_scroll_spreads_the_counts():
+    scroller, mouse = engine()
+    scroller.scroll(7 * WHEEL_DELTA, duration_ns=10 * scroller.period_ns)
+    assert sum(wheel for wheel, _ in mouse.scrolls) == 7
+    assert len(mouse.scrolls) == 7 and set(mouse.scrolls) == {(1, 0)}
@@ -0,0 +1,60 @@
+"""
+Build a CIRCUITPY image with every module in ``lib`` precompiled to ``.mpy``.
+
+Precompiled modules skip parsing and compiling on the board, which is most of
+the import time at boot, and need less RAM to load. ``code.py``, ``boot.py``
+and ``settings.toml`` stay source files, CircuitPython only runs them by name.
+
+Needs ``mpy-cross`` for the firmware version on the board (CircuitPython 9.x),
+from https://adafruit-circuit-python.s3.amazonaws.com/index.html?prefix=bin/mpy-cross/
+or ``pip install mpy-cross``. Usage::
+
+    python tools/build_mpy.py            # image in build/CIRCUITPY
+    python tools/build_mpy.py /media/CIRCUITPY
+
+Then copy the image over the drive. Layout::
+
+    boot.py  code.py  settings.toml  hotspots.txt
+    lib/<module>.mpy                 every lib/*.py
+    lib/absolute_mouse/__init__.mpy  packages keep their directories
+    lib/adafruit_hid/*.mpy           copied as shipped
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOP_LEVEL = ("boot.py", "code.py", "settings.toml", "hotspots.txt")
+
+
+def mpy_cross():
+    """Path of the ``mpy-cross`` executable, from ``MPY_CROSS`` or ``PATH``."""
+    path = os.environ.get("MPY_CROSS") or shutil.which("mpy-cross")
+    if path is None:
+        sys.exit("mpy-cross not found: install it or set MPY_CROSS")
+    return path
+
+
+def build(target):
+    compiler = mpy_cross()
+    lib = os.path.join(ROOT, "lib")
+    for directory, subdirectories, files in os.walk(lib):
+        subdirectories[:] = [name for name in subdirectories if name != "__pycache__"]
+        out = os.path.join(target, "lib", os.path.relpath(directory, lib))
+        os.makedirs(out, exist_ok=True)
+        for name in sorted(files):
+            source = os.path.join(directory, name)
+            if name.endswith(".mpy"):
+                shutil.copy2(source, out)
+            elif name.endswith(".py"):
+                output = os.path.join(out, name[:-3] + ".mpy")
+                subprocess.run([compiler, "-o", output, source], check=True)
+                print(os.path.relpath(output, target))
+    for name in TOP_LEVEL:
+        shutil.copy2(os.path.join(ROOT, name), target)
+
+
+if __name__ == "__main__":
+    build(sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "build", "CIRCUITPY"))